@@ -6,7 +6,7 @@ with the Raspberry Pi emotion detection system.
 Run this on your Raspberry Pi 4 after uploading your emoweb.py file.
 """
 
-from flask import Flask, jsonify, request, Response
+from flask import Flask, jsonify, request, Response, stream_with_context
 from flask_cors import CORS
 import cv2
 import base64
@@ -15,6 +15,11 @@ from datetime import datetime
 import io
 import sys
 import os
+import threading
+import itertools
+import json
+import time
+import zipfile
 
 # Try to import Raspberry Pi specific libraries
 try:
@@ -30,17 +35,41 @@ except ImportError:
 try:
     # Import your emotion detection functions from emoweb.py
     # Adjust these imports based on what functions you have in emoweb.py
-    from emoweb import detect_emotion_from_frame, initialize_camera, initialize_hardware
+    from emoweb import detect_emotion_from_frame, initialize_camera, initialize_hardware, vision, get_engine
+    from emoweb import query_history, analyze_images, emotion_cache
+    from payloads import PayloadCache, payload_response
     EMOTION_MODULE_AVAILABLE = True
 except ImportError:
     print("Warning: emoweb.py not found. Using mock emotion detection.")
     EMOTION_MODULE_AVAILABLE = False
 
+# /api/detect_emotion_batch limits
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+BATCH_MAX_IMAGES = 1000   # per /api/detect_emotion_batch request
+BATCH_MAX_BYTES = 64 * 1024 * 1024        # whole request body, compressed
+BATCH_MAX_IMAGE_BYTES = 16 * 1024 * 1024  # one image, as stored in a zip archive once extracted
+
 app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = BATCH_MAX_BYTES
 CORS(app)
 
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({'error': f"Request larger than {app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)} MB"}), 413
+
+# /debug/profile and /debug/tracemalloc (localhost only unless EMOWEB_DEBUG_TOKEN is set)
+try:
+    from profiling import register_debug_routes
+    register_debug_routes(app, os.environ.get('EMOWEB_DEBUG_TOKEN'))
+except ImportError:
+    print("Warning: profiling.py not found. Debug endpoints disabled.")
+
 # Global variables
 camera = None
+engine = None          # shared emoweb EmotionEngine: one camera owner, one inference stream
+system_ready = False   # set once camera, hardware and model warm-up are done
+init_error = None
+emotion_payloads = PayloadCache() if EMOTION_MODULE_AVAILABLE else None   # per camera, see engine_emotion_payload()
 current_emotion_data = {
     'emotion': None,
     'confidence': 0,
@@ -66,13 +95,19 @@ emotion_to_angle = {
 }
 
 def initialize_system():
-    """Initialize camera and hardware components"""
-    global camera
+    """Initialize camera and hardware components, warming up the models"""
+    global camera, engine, system_ready, init_error
     
     try:
+        # Initialize hardware (servo, OLED, etc.)
+        if EMOTION_MODULE_AVAILABLE and RPI_AVAILABLE:
+            initialize_hardware()
+        
         # Initialize camera
         if EMOTION_MODULE_AVAILABLE:
-            camera = initialize_camera()
+            # Starts the shared engine; endpoints read its snapshots instead of re-capturing
+            camera = initialize_camera(actuators=RPI_AVAILABLE)
+            engine = get_engine()
         else:
             # Fallback to OpenCV camera
             camera = cv2.VideoCapture(0)
@@ -81,16 +116,18 @@ def initialize_system():
                 camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
                 camera.set(cv2.CAP_PROP_FPS, 30)
         
-        # Initialize hardware (servo, OLED, etc.)
-        if EMOTION_MODULE_AVAILABLE and RPI_AVAILABLE:
-            initialize_hardware()
-        
+        system_ready = True
         print("✓ System initialized successfully")
         return True
     except Exception as e:
+        init_error = str(e)
         print(f"✗ Error initializing system: {e}")
         return False
 
+def not_ready_response():
+    """503 returned by camera endpoints until initialize_system has finished"""
+    return jsonify({'error': init_error or 'System is starting', 'ready': False}), 503
+
 def capture_frame():
     """Capture a frame from the camera"""
     global camera
@@ -106,6 +143,17 @@ def capture_frame():
     except Exception as e:
         return None, str(e)
 
+def engine_emotion_data(snap):
+    """An engine snapshot in the current_emotion_data shape, timestamped when it was published"""
+    result = snap.to_dict()
+    result['timestamp'] = datetime.fromtimestamp(snap.timestamp).isoformat()
+    return result
+
+def engine_emotion_payload(camera_id=None):
+    """Latest result of a known camera, built and encoded once per published snapshot"""
+    snap = engine.snapshot(camera_id)
+    return emotion_payloads.get(camera_id, snap, lambda: engine_emotion_data(snap))
+
 def mock_detect_emotion(frame):
     """Mock emotion detection for testing without the actual model"""
     import random
@@ -134,13 +182,31 @@ def get_status():
         'emotionDetection': EMOTION_MODULE_AVAILABLE or True,  # True for mock mode
         'servo': RPI_AVAILABLE,
         'timestamp': datetime.now().isoformat(),
-        'mode': 'production' if EMOTION_MODULE_AVAILABLE else 'simulation'
+        'mode': 'production' if EMOTION_MODULE_AVAILABLE else 'simulation',
+        'ready': system_ready,
+        'warmup': vision.warmup_stats if EMOTION_MODULE_AVAILABLE else {},
+        'emotionCache': emotion_cache.stats() if EMOTION_MODULE_AVAILABLE and emotion_cache is not None else None
     })
 
 @app.route('/api/camera_frame', methods=['GET'])
 def get_camera_frame():
-    """Capture and return current camera frame as JPEG"""
-    frame, error = capture_frame()
+    """Capture and return current camera frame as JPEG (?camera=<id> selects a camera)"""
+    if not system_ready:
+        return not_ready_response()
+    
+    headers = {}
+    if engine is not None:
+        camera_id = request.args.get('camera')
+        if camera_id is not None and engine.context(camera_id) is None:
+            return jsonify({'error': f'Unknown camera {camera_id}'}), 404
+        snap = engine.snapshot(camera_id)
+        # ?annotated=1 draws the preview overlay on a copy; plain frames are never copied
+        annotated = request.args.get('annotated', '').lower() in ('1', 'true', 'yes')
+        frame, error = (snap.annotated() if annotated else snap.image()), None
+        headers = {'X-Frame-Seq': str(snap.frame_seq), 'X-Capture-Ts': str(snap.capture_ts),
+                   'X-Camera-Id': str(snap.camera_id)}
+    else:
+        frame, error = capture_frame()
     
     if error:
         return jsonify({'error': error}), 500
@@ -153,7 +219,7 @@ def get_camera_frame():
         _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
         frame_bytes = buffer.tobytes()
         
-        return Response(frame_bytes, mimetype='image/jpeg')
+        return Response(frame_bytes, mimetype='image/jpeg', headers=headers)
     except Exception as e:
         return jsonify({'error': f'Failed to encode frame: {str(e)}'}), 500
 
@@ -162,6 +228,18 @@ def detect_emotion_endpoint():
     """Detect emotion from current camera frame"""
     global current_emotion_data
     
+    if not system_ready:
+        return not_ready_response()
+    
+    # The engine has already analyzed the latest frame; return its result without re-running inference
+    if engine is not None:
+        camera_id = request.args.get('camera')
+        if camera_id is not None and engine.context(camera_id) is None:
+            return jsonify({'error': f'Unknown camera {camera_id}'}), 404
+        payload = engine_emotion_payload(camera_id)
+        current_emotion_data = payload.to_dict()
+        return payload_response(payload)
+    
     # Capture frame
     frame, error = capture_frame()
     
@@ -191,6 +269,92 @@ def detect_emotion_endpoint():
     except Exception as e:
         return jsonify({'error': f'Emotion detection failed: {str(e)}'}), 500
 
+def is_zip_upload():
+    return request.mimetype in ('application/zip', 'application/x-zip-compressed')
+
+def archive_images(archive):
+    """Image members of an open zip archive"""
+    return [info for info in archive.infolist()
+            if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS)]
+
+def oversized_upload():
+    """
+    Read the request body (413 past MAX_CONTENT_LENGTH) and check the declared size of every
+    zip member, before any image is decoded. Returns the first offending name, or None.
+    """
+    archives = []
+    if is_zip_upload():
+        archives.append(('upload.zip', io.BytesIO(request.get_data())))
+    else:
+        for key in request.files:
+            for upload in request.files.getlist(key):
+                name = upload.filename or key
+                if name.lower().endswith('.zip'):
+                    archives.append((name, upload.stream))
+    for archive_name, stream in archives:
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive_images(archive):
+                if info.file_size > BATCH_MAX_IMAGE_BYTES:
+                    return f"{archive_name}/{info.filename}"
+    return None
+
+def uploaded_images():
+    """Yield (name, bytes) for every image in the request: multipart files and/or zip archives"""
+    def from_archive(stream, archive_name):
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive_images(archive):
+                with archive.open(info) as member:
+                    # file_size was checked, but do not trust it for how much gets inflated
+                    data = member.read(BATCH_MAX_IMAGE_BYTES + 1)
+                if len(data) > BATCH_MAX_IMAGE_BYTES:
+                    raise zipfile.BadZipFile(f"{info.filename} is larger than declared")
+                yield f"{archive_name}/{info.filename}", data
+
+    if is_zip_upload():
+        yield from from_archive(io.BytesIO(request.get_data()), 'upload.zip')
+        return
+    for key in request.files:
+        for upload in request.files.getlist(key):
+            name = upload.filename or key
+            if name.lower().endswith('.zip'):
+                yield from from_archive(upload.stream, name)
+            else:
+                yield name, upload.read()
+
+@app.route('/api/detect_emotion_batch', methods=['POST'])
+def detect_emotion_batch():
+    """
+    Analyze uploaded photos (multipart files or a zip archive) and stream one NDJSON line
+    per image as results complete, then a summary line.
+    """
+    if not EMOTION_MODULE_AVAILABLE:
+        return jsonify({'error': 'Batch analysis requires emoweb.py'}), 503
+    try:
+        oversized = oversized_upload()
+    except zipfile.BadZipFile:
+        return jsonify({'error': 'Invalid zip archive'}), 400
+    if oversized is not None:
+        return jsonify({'error': f'{oversized} is larger than {BATCH_MAX_IMAGE_BYTES // (1024 * 1024)} MB'}), 413
+
+    def generate():
+        started = time.perf_counter()
+        images = faces = 0
+        try:
+            for result in analyze_images(itertools.islice(uploaded_images(), BATCH_MAX_IMAGES)):
+                images += 1
+                faces += len(result['faces'])
+                yield json.dumps(result) + '\n'
+        except zipfile.BadZipFile:
+            yield json.dumps({'error': 'Invalid zip archive'}) + '\n'
+        yield json.dumps({
+            'done': True,
+            'images': images,
+            'faces': faces,
+            'elapsedMs': round((time.perf_counter() - started) * 1000.0, 1)
+        }) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/music_status', methods=['GET'])
 def get_music_status():
     """Return current music playback status"""
@@ -221,15 +385,44 @@ def stop_music():
 def get_current_emotion():
     """Get the last detected emotion"""
     global current_emotion_data
+    if engine is not None:
+        camera_id = request.args.get('camera')
+        if camera_id is not None and engine.context(camera_id) is None:
+            return jsonify({'error': f'Unknown camera {camera_id}'}), 404
+        return payload_response(engine_emotion_payload(camera_id))
     return jsonify(current_emotion_data)
 
+@app.route('/api/cameras', methods=['GET'])
+def get_cameras():
+    """Cameras driven by the shared engine with their latest results"""
+    if engine is None:
+        return jsonify({'cameras': []})
+    cameras = []
+    for stats in engine.camera_stats():
+        stats['state'] = engine_emotion_payload(stats['cameraId']).to_dict()
+        cameras.append(stats)
+    return jsonify({'cameras': cameras, 'workers': engine.workers})
+
+@app.route('/api/emotion_history', methods=['GET'])
+def get_emotion_history():
+    """Emotion history from the shared engine: ?since=&resolution=raw|second|minute&limit="""
+    if not EMOTION_MODULE_AVAILABLE:
+        return jsonify({'error': 'Emotion history requires emoweb.py'}), 503
+    payload, status = query_history(request.args)
+    return jsonify(payload), status
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint - reports "ready" only after initialization and warm-up"""
+    if init_error:
+        status = 'error'
+    else:
+        status = 'ready' if system_ready else 'starting'
     return jsonify({
-        'status': 'healthy',
+        'status': status,
+        'error': init_error,
         'timestamp': datetime.now().isoformat()
-    })
+    }), 200 if system_ready else 503
 
 def cleanup():
     """Cleanup resources on shutdown"""
@@ -258,28 +451,26 @@ if __name__ == '__main__':
     # Register cleanup function
     atexit.register(cleanup)
     
-    # Initialize system
-    if initialize_system():
-        try:
-            print(f"\n✓ Server starting on port 5000")
-            print(f"✓ CORS enabled for all origins")
-            print(f"✓ Mode: {'Production' if EMOTION_MODULE_AVAILABLE else 'Simulation'}")
-            print(f"\n📡 Server URL: http://0.0.0.0:5000")
-            print(f"📡 Network URL: http://<your-pi-ip>:5000")
-            print(f"\nPress Ctrl+C to stop the server\n")
-            
-            # Run Flask server
-            app.run(
-                host='0.0.0.0',
-                port=5000,
-                debug=False,  # Set to True for development
-                threaded=True
-            )
-        except KeyboardInterrupt:
-            print("\n\n✓ Server stopped by user")
-        except Exception as e:
-            print(f"\n✗ Server error: {e}")
-    else:
-        print("\n✗ Failed to initialize system. Check your hardware connections.")
-        sys.exit(1)
+    # Initialize in the background so /api/health can report progress
+    init_thread = threading.Thread(target=initialize_system, daemon=True)
+    init_thread.start()
+    try:
+        print(f"\n✓ Server starting on port 5000")
+        print(f"✓ CORS enabled for all origins")
+        print(f"✓ Mode: {'Production' if EMOTION_MODULE_AVAILABLE else 'Simulation'}")
+        print(f"✓ /api/health reports 'ready' once camera and models are warm")
+        print(f"\n📡 Server URL: http://0.0.0.0:5000")
+        print(f"📡 Network URL: http://<your-pi-ip>:5000")
+        print(f"\nPress Ctrl+C to stop the server\n")
         
+        # Run Flask server
+        app.run(
+            host='0.0.0.0',
+            port=5000,
+            debug=False,  # Set to True for development
+            threaded=True
+        )
+    except KeyboardInterrupt:
+        print("\n\n✓ Server stopped by user")
+    except Exception as e:
+        print(f"\n✗ Server error: {e}")
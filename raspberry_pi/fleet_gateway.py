@@ -0,0 +1,402 @@
+"""
+EMOWEB Fleet Gateway
+Sits between the dashboards and many Raspberry Pi devices running
+emotion_flask_server.py (or emoweb.py). Each device gets one pooled
+keep-alive HTTP session; device responses are cached for a short TTL and
+concurrent requests for the same resource share one upstream call, so the
+load on a Pi stays the same however many dashboards are open.
+
+A poller per device pushes emotion changes to every dashboard connected to
+/ws, and /api/fleet/current_emotion fans out to all devices concurrently.
+
+Run it against real devices:
+    python3 fleet_gateway.py --device pi1=http://192.168.1.20:5000 --device pi2=http://192.168.1.21:5000
+or against local mock devices:
+    python3 fleet_gateway.py --mock 20
+
+Requires: pip3 install aiohttp
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from aiohttp import web, ClientSession, ClientTimeout, TCPConnector, ClientError, WSMsgType
+
+# Cache lifetime per proxied device path, in seconds
+CACHE_TTL = {
+    '/api/status': 2.0,
+    '/api/current_emotion': 0.2,
+    '/api/camera_frame': 0.1,
+    '/api/health': 1.0,
+}
+DEFAULT_TTL = 0.5
+PROXIED_PATHS = tuple(CACHE_TTL)
+
+POLL_INTERVAL = 0.25        # seconds between /api/current_emotion polls per device
+REQUEST_TIMEOUT = 3.0
+SEND_TIMEOUT = 1.0          # seconds a dashboard gets to take one message before it is dropped
+CONNECTIONS_PER_DEVICE = 2
+
+
+#-----------------------------------------------------------------------------------------------
+# Device connection with TTL cache and request coalescing
+#-----------------------------------------------------------------------------------------------
+class DeviceClient:
+    """One device: a keep-alive session, a TTL cache and at most one in-flight request per path"""
+    def __init__(self, device_id, base_url, connections=CONNECTIONS_PER_DEVICE, timeout=REQUEST_TIMEOUT):
+        self.device_id = device_id
+        self.base_url = base_url.rstrip('/')
+        self.connections = connections
+        self.timeout = timeout
+        self.session = None
+        self.cache = {}             # path -> (expires, status, content_type, body, headers)
+        self.inflight = {}          # path -> asyncio.Task shared by concurrent callers
+        self.online = None
+        self.last_error = None
+        self.last_seen = None
+        self.upstream = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def start(self):
+        connector = TCPConnector(limit=self.connections, keepalive_timeout=30)
+        self.session = ClientSession(connector=connector, timeout=ClientTimeout(total=self.timeout))
+        return self
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    async def _fetch(self, path):
+        self.upstream += 1
+        try:
+            async with self.session.get(self.base_url + path) as resp:
+                body = await resp.read()
+                headers = {k: v for k, v in resp.headers.items() if k.startswith('X-')}
+                entry = (time.monotonic() + CACHE_TTL.get(path, DEFAULT_TTL), resp.status,
+                         resp.content_type, body, headers)
+            self.online = True
+            self.last_seen = time.time()
+            self.last_error = None
+        except (ClientError, asyncio.TimeoutError) as e:
+            self.errors += 1
+            self.online = False
+            self.last_error = str(e) or e.__class__.__name__
+            body = json.dumps({'error': f'Device unreachable: {self.last_error}', 'deviceId': self.device_id})
+            # Cache failures too so an offline device is not hammered by every viewer
+            entry = (time.monotonic() + CACHE_TTL.get(path, DEFAULT_TTL), 502, 'application/json',
+                     body.encode(), {})
+        self.cache[path] = entry
+        return entry
+
+    async def get(self, path):
+        """(status, content_type, body, headers) for path, from cache, an in-flight request or upstream"""
+        entry = self.cache.get(path)
+        if entry is not None and entry[0] > time.monotonic():
+            self.cache_hits += 1
+            return entry[1:]
+        task = self.inflight.get(path)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._fetch(path))
+            self.inflight[path] = task
+            task.add_done_callback(lambda _t, p=path: self.inflight.pop(p, None))
+        entry = await asyncio.shield(task)
+        return entry[1:]
+
+    async def get_json(self, path):
+        status, _, body, _ = await self.get(path)
+        try:
+            return status, json.loads(body)
+        except ValueError:
+            return status, None
+
+    def stats(self):
+        return {
+            'deviceId': self.device_id,
+            'url': self.base_url,
+            'online': self.online,
+            'lastSeen': self.last_seen,
+            'lastError': self.last_error,
+            'upstreamRequests': self.upstream,
+            'cacheHits': self.cache_hits,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+        }
+
+
+#-----------------------------------------------------------------------------------------------
+# Gateway
+#-----------------------------------------------------------------------------------------------
+class FleetGateway:
+    """Owns the device clients, the pollers and the dashboard WebSocket fan-out"""
+    def __init__(self, devices, poll_interval=POLL_INTERVAL, connections=CONNECTIONS_PER_DEVICE):
+        self.devices = {device_id: DeviceClient(device_id, url, connections) for device_id, url in devices.items()}
+        self.poll_interval = poll_interval
+        self.clients = set()        # dashboard WebSocketResponses
+        self.latest = {}            # device id -> last emotion payload pushed
+        self.pollers = []
+        self.broadcasts = 0
+        self.started = time.time()
+
+    async def start(self, app=None):
+        for device in self.devices.values():
+            await device.start()
+        self.pollers = [asyncio.ensure_future(self.poll(device)) for device in self.devices.values()]
+
+    async def stop(self, app=None):
+        for task in self.pollers:
+            task.cancel()
+        await asyncio.gather(*self.pollers, return_exceptions=True)
+        for ws in list(self.clients):
+            await ws.close()
+        for device in self.devices.values():
+            await device.close()
+
+    async def poll(self, device):
+        """Watch one device's current emotion and push changes to the dashboards"""
+        # Spread the first polls so devices are not all hit in the same tick
+        await asyncio.sleep(random.uniform(0, self.poll_interval))
+        while True:
+            try:
+                status, data = await device.get_json('/api/current_emotion')
+                if status == 200 and isinstance(data, dict):
+                    key = (data.get('emotion'), data.get('emotionFrameSeq', data.get('timestamp')))
+                    previous = self.latest.get(device.device_id)
+                    if previous is None or previous[0] != key:
+                        self.latest[device.device_id] = (key, data)
+                        await self.broadcast('emotion_update', device.device_id, data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep polling: one bad response must not end this device's feed
+                print(f"✗ Poll of {device.device_id} failed: {e!r}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def broadcast(self, event, device_id, data):
+        if not self.clients:
+            return
+        # Serialize once for all dashboards
+        message = json.dumps({'event': event, 'deviceId': device_id, 'data': data})
+        self.broadcasts += 1
+        # Snapshot: dashboards connect and leave while the sends are awaited
+        clients = list(self.clients)
+        results = await asyncio.gather(*(asyncio.wait_for(ws.send_str(message), SEND_TIMEOUT) for ws in clients),
+                                       return_exceptions=True)
+        for ws, result in zip(clients, results):
+            if isinstance(result, Exception):
+                # Closed, reset or too slow to keep up
+                self.clients.discard(ws)
+                if not ws.closed:
+                    asyncio.ensure_future(ws.close())
+
+    async def fan_out(self, path):
+        """GET path on every device concurrently, {device id: payload}"""
+        ids = list(self.devices)
+        results = await asyncio.gather(*(self.devices[i].get_json(path) for i in ids))
+        return {i: (data if status == 200 else {'error': (data or {}).get('error'), 'status': status})
+                for i, (status, data) in zip(ids, results)}
+
+    def stats(self):
+        devices = [device.stats() for device in self.devices.values()]
+        return {
+            'devices': len(devices),
+            'online': sum(1 for d in devices if d['online']),
+            'dashboardClients': len(self.clients),
+            'broadcasts': self.broadcasts,
+            'upstreamRequests': sum(d['upstreamRequests'] for d in devices),
+            'cacheHits': sum(d['cacheHits'] for d in devices),
+            'coalesced': sum(d['coalesced'] for d in devices),
+            'uptime': round(time.time() - self.started, 1),
+            'perDevice': devices,
+        }
+
+    #-------------------------------------------------------------------------------------------
+    # HTTP handlers
+    #-------------------------------------------------------------------------------------------
+    async def handle_devices(self, request):
+        return web.json_response({'devices': [device.stats() for device in self.devices.values()]})
+
+    async def handle_proxy(self, request):
+        """/api/devices/{device}/{endpoint} -> the device's /api/{endpoint}, via the cache"""
+        device = self.devices.get(request.match_info['device'])
+        if device is None:
+            return web.json_response({'error': 'Unknown device'}, status=404)
+        path = '/api/' + request.match_info['endpoint']
+        if path not in PROXIED_PATHS:
+            return web.json_response({'error': f'{path} is not proxied'}, status=404)
+        status, content_type, body, headers = await device.get(path)
+        return web.Response(body=body, status=status, content_type=content_type, headers=headers)
+
+    async def handle_fleet_emotions(self, request):
+        return web.json_response({'timestamp': time.time(), 'devices': await self.fan_out('/api/current_emotion')})
+
+    async def handle_fleet_status(self, request):
+        return web.json_response({'timestamp': time.time(), 'devices': await self.fan_out('/api/status')})
+
+    async def handle_stats(self, request):
+        return web.json_response(self.stats())
+
+    async def handle_ws(self, request):
+        """Dashboard feed: latest state on connect, then emotion_update events from every device"""
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        self.clients.add(ws)
+        try:
+            for device_id, (_, data) in list(self.latest.items()):
+                await ws.send_str(json.dumps({'event': 'emotion_update', 'deviceId': device_id, 'data': data}))
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT and msg.data == 'ping':
+                    await ws.send_str('pong')
+        finally:
+            self.clients.discard(ws)
+        return ws
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_get('/api/devices', self.handle_devices)
+        app.router.add_get('/api/devices/{device}/{endpoint}', self.handle_proxy)
+        app.router.add_get('/api/fleet/current_emotion', self.handle_fleet_emotions)
+        app.router.add_get('/api/fleet/status', self.handle_fleet_status)
+        app.router.add_get('/api/gateway/stats', self.handle_stats)
+        app.router.add_get('/ws', self.handle_ws)
+        app.on_startup.append(self.start)
+        app.on_cleanup.append(self.stop)
+        return app
+
+
+#-----------------------------------------------------------------------------------------------
+# Mock device (stand-in for emotion_flask_server.py when testing without hardware)
+#-----------------------------------------------------------------------------------------------
+class MockDevice:
+    """Serves the device endpoints the gateway proxies, with random emotions and request counting"""
+    emotions = ['happy', 'sad', 'angry', 'surprised', 'neutral', 'disgust', 'fear']
+
+    def __init__(self, device_id, latency_ms=5.0, change_interval=1.0):
+        self.device_id = device_id
+        self.latency_ms = latency_ms
+        self.change_interval = change_interval
+        self.requests = 0
+        self.frame_seq = 0
+        self.emotion = 'neutral'
+        self.confidence = 0.0
+        self.changed = 0.0
+        self.frame = None
+
+    def current(self):
+        now = time.time()
+        if now - self.changed > self.change_interval:
+            self.changed = now
+            self.emotion = random.choice(self.emotions)
+            self.confidence = round(random.uniform(60.0, 99.0), 2)
+        self.frame_seq += 1
+        return {
+            'cameraId': 'cam0',
+            'emotion': self.emotion,
+            'confidence': self.confidence,
+            'emotionFrameSeq': int(self.changed * 1000),
+            'faceDetected': True,
+            'servoAngle': 90,
+            'frameSeq': self.frame_seq,
+            'timestamp': now,
+        }
+
+    async def handle(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.latency_ms / 1000.0)
+        path = request.path
+        if path == '/api/current_emotion':
+            return web.json_response(self.current())
+        if path == '/api/status':
+            return web.json_response({'connected': True, 'deviceId': self.device_id, 'mode': 'mock',
+                                      'ready': True, 'requests': self.requests})
+        if path == '/api/health':
+            return web.json_response({'status': 'ready'})
+        if path == '/api/camera_frame':
+            if self.frame is None:
+                import cv2
+                import numpy as np
+                _, buffer = cv2.imencode('.jpg', np.zeros((480, 640, 3), dtype=np.uint8))
+                self.frame = buffer.tobytes()
+            return web.Response(body=self.frame, content_type='image/jpeg',
+                                headers={'X-Frame-Seq': str(self.frame_seq)})
+        return web.json_response({'error': 'Not found'}, status=404)
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', self.handle)
+        return app
+
+
+async def start_mock_devices(count, host='127.0.0.1', base_port=5100, latency_ms=5.0):
+    """Start count mock devices on consecutive ports, return ({device id: url}, mocks, runners)"""
+    devices, mocks, runners = {}, [], []
+    for i in range(count):
+        mock = MockDevice(f'mock{i}', latency_ms=latency_ms)
+        runner = web.AppRunner(mock.make_app())
+        await runner.setup()
+        await web.TCPSite(runner, host, base_port + i).start()
+        devices[mock.device_id] = f'http://{host}:{base_port + i}'
+        mocks.append(mock)
+        runners.append(runner)
+    return devices, mocks, runners
+
+
+#-----------------------------------------------------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='EMOWEB fleet gateway')
+    parser.add_argument('--device', action='append', default=[], metavar='ID=URL',
+                        help='device to proxy, repeatable (e.g. pi1=http://192.168.1.20:5000)')
+    parser.add_argument('--devices-file', help='JSON file mapping device ids to base URLs')
+    parser.add_argument('--mock', type=int, default=0, metavar='N', help='start N local mock devices')
+    parser.add_argument('--mock-latency-ms', type=float, default=5.0)
+    parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL)
+    parser.add_argument('--connections', type=int, default=CONNECTIONS_PER_DEVICE,
+                        help='keep-alive connections per device')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8080)
+    return parser.parse_args(argv)
+
+
+async def serve(args):
+    devices = {}
+    if args.devices_file:
+        with open(args.devices_file) as f:
+            devices.update(json.load(f))
+    for item in args.device:
+        device_id, _, url = item.partition('=')
+        devices[device_id] = url
+    runners = []
+    if args.mock:
+        mock_devices, _, runners = await start_mock_devices(args.mock, latency_ms=args.mock_latency_ms)
+        devices.update(mock_devices)
+    if not devices:
+        raise SystemExit('No devices given (use --device, --devices-file or --mock)')
+
+    gateway = FleetGateway(devices, args.poll_interval, args.connections)
+    runner = web.AppRunner(gateway.make_app())
+    await runner.setup()
+    await web.TCPSite(runner, args.host, args.port).start()
+    print(f"✓ Gateway for {len(devices)} device(s) on http://{args.host}:{args.port}")
+    print(f"✓ Dashboard feed: ws://<gateway-ip>:{args.port}/ws")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        for mock_runner in runners:
+            await mock_runner.cleanup()
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("EMOWEB Fleet Gateway")
+    print("=" * 60)
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        print("\n✓ Gateway stopped by user")
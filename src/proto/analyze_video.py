@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+"""
+analyze_video - offline emotion timeline for a recorded session
+
+Splits a video into frame ranges and analyzes each range in its own process
+with the same face_detect -> validate_face -> detect_emotion chain as the
+live loop. Every worker loads its own cascades and interpreter. Finished
+ranges are checkpointed as part files next to the output, so an interrupted
+run resumes where it stopped, and are merged into one ordered CSV or
+Parquet timeline at the end.
+
+Frames are analyzed independently (no cross-frame smoothing), so the
+result does not depend on how the video was split.
+
+Examples:
+    python analyze_video.py session.mp4 -o session.csv
+    python analyze_video.py session.mp4 -o session.parquet --stride 5 --workers 8
+    python analyze_video.py session.mp4 -o session.csv --resume
+    python analyze_video.py clip.mp4 -o clip.csv --stub      # stub interpreter, no model needed
+"""
+
+import argparse
+import contextlib
+import csv
+import glob
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+COLUMNS = ('frame', 'time_s', 'face_detected', 'x', 'y', 'w', 'h', 'emotion_idx', 'emotion', 'confidence')
+
+# Set in each worker process by init_worker()
+_emoweb = None
+
+
+#-----------------------------------------------------------------------------------------------
+# Worker side
+#-----------------------------------------------------------------------------------------------
+def init_worker(model_path=None, stub=False, invoke_ms=0.0):
+    """Import emoweb and load its models once per worker process"""
+    global _emoweb
+    cv2.setNumThreads(1)    # parallelism comes from the processes
+    # emoweb prints its banner and model loading; keep worker stdout quiet
+    with contextlib.redirect_stdout(sys.stderr if os.environ.get('ANALYZE_VERBOSE') else open(os.devnull, 'w')):
+        if stub:
+            import hw_stubs
+            _emoweb = hw_stubs.load_emoweb(invoke_ms=invoke_ms)
+        else:
+            import emoweb
+            if model_path:
+                emoweb.vision.model_path = model_path
+            emoweb.vision.load()
+            _emoweb = emoweb
+
+
+def analyze_range(path, start, end, stride, fps):
+    """Rows for frames start, start + stride, ... below end"""
+    em = _emoweb
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video {path}")
+    rows = []
+    try:
+        if start > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        index = start
+        while index < end:
+            if (index - start) % stride:
+                # grab() skips the colour conversion and copy of frames we do not analyze
+                if not cap.grab():
+                    break
+                index += 1
+                continue
+            ok, frame = cap.read()
+            if not ok:
+                break
+            height, width = frame.shape[:2]
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            face = em.face_detect(gray)
+            row = [index, round(index / fps, 4), 0, None, None, None, None, None, None, None]
+            if em.validate_face(face, width, height):
+                fx, fy, fw, fh = (int(v) for v in face)
+                emotion_idx, confidence = em.detect_emotion(frame[fy:fy + fh, fx:fx + fw])
+                row[2:] = [1, fx, fy, fw, fh, int(emotion_idx), em.emotion_mapper[int(emotion_idx)],
+                           round(float(confidence), 2)]
+            rows.append(row)
+            index += 1
+    finally:
+        cap.release()
+    return rows
+
+
+def run_shard(path, start, end, stride, fps, part_path):
+    """Analyze one range and write it to its part file, return (start, rows, seconds)"""
+    t0 = time.perf_counter()
+    rows = analyze_range(path, start, end, stride, fps)
+    tmp_path = part_path + '.tmp'
+    with open(tmp_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(rows)
+    # Rename last so a part file only exists once it is complete
+    os.replace(tmp_path, part_path)
+    return start, len(rows), time.perf_counter() - t0
+
+
+#-----------------------------------------------------------------------------------------------
+# Driver side
+#-----------------------------------------------------------------------------------------------
+def video_info(path):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video {path}")
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    return frames, fps
+
+
+def plan_shards(start, end, shard_frames, stride):
+    """Contiguous [start, end) ranges, each a multiple of stride long so sampling stays on one grid"""
+    shard_frames = max(stride, shard_frames - shard_frames % stride)
+    return [(s, min(s + shard_frames, end)) for s in range(start, end, shard_frames)]
+
+
+def part_file(parts_dir, start):
+    return os.path.join(parts_dir, f"part_{start:09d}.csv")
+
+
+def read_parts(parts_dir, shards):
+    """Merged rows from the part files, in frame order"""
+    for start, _ in shards:
+        with open(part_file(parts_dir, start), newline='') as f:
+            reader = csv.reader(f)
+            next(reader)
+            for row in reader:
+                yield row
+
+
+def write_output(output, rows):
+    if output.lower().endswith('.parquet'):
+        try:
+            import pyarrow as pa #type: ignore
+            import pyarrow.parquet as pq #type: ignore
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow), or use a .csv output")
+        columns = {name: [] for name in COLUMNS}
+        for row in rows:
+            for name, value in zip(COLUMNS, row):
+                columns[name].append(value if value != '' else None)
+        types = {'frame': pa.int64(), 'time_s': pa.float64(), 'face_detected': pa.bool_(), 'x': pa.int32(),
+                 'y': pa.int32(), 'w': pa.int32(), 'h': pa.int32(), 'emotion_idx': pa.int8(),
+                 'emotion': pa.string(), 'confidence': pa.float32()}
+        arrays = []
+        for name in COLUMNS:
+            values = columns[name]
+            if name == 'face_detected':
+                values = [v == '1' for v in values]
+            elif name != 'emotion':
+                values = [None if v is None else float(v) if name in ('time_s', 'confidence') else int(v)
+                          for v in values]
+            arrays.append(pa.array(values, type=types[name]))
+        pq.write_table(pa.Table.from_arrays(arrays, names=list(COLUMNS)), output)
+        return
+    with open(output, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(rows)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Offline emotion timeline for a video file')
+    parser.add_argument('video', help='video file to analyze')
+    parser.add_argument('-o', '--output', required=True, help='timeline file, .csv or .parquet')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--stride', type=int, default=1, help='analyze every Nth frame')
+    parser.add_argument('--shard-frames', type=int, default=900,
+                        help='frames per work unit (and checkpoint granularity)')
+    parser.add_argument('--start', type=int, default=0, help='first frame')
+    parser.add_argument('--end', type=int, default=None, help='stop before this frame')
+    parser.add_argument('--resume', action='store_true', help='reuse finished part files from an earlier run')
+    parser.add_argument('--keep-parts', action='store_true', help='keep the part files after merging')
+    parser.add_argument('--model', help='TFLite model (default: emoweb MODEL_PATH)')
+    parser.add_argument('--stub', action='store_true', help='use the stub interpreter from hw_stubs.py')
+    parser.add_argument('--invoke-ms', type=float, default=0.0, help='simulated cost per invoke with --stub')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.stride < 1:
+        raise SystemExit('--stride must be at least 1')
+    total_frames, fps = video_info(args.video)
+    end = min(args.end, total_frames) if args.end else total_frames
+    shards = plan_shards(args.start, end, args.shard_frames, args.stride)
+
+    parts_dir = args.output + '.parts'
+    manifest_path = os.path.join(parts_dir, 'manifest.json')
+    manifest = {'video': os.path.abspath(args.video), 'start': args.start, 'end': end,
+                'stride': args.stride, 'shard_frames': args.shard_frames}
+    if args.resume and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            if json.load(f) != manifest:
+                raise SystemExit(f"{manifest_path} was written with different options; rerun without --resume")
+    else:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+    os.makedirs(parts_dir, exist_ok=True)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    for stale in glob.glob(os.path.join(parts_dir, '*.tmp')):
+        os.remove(stale)
+
+    pending = [(s, e) for s, e in shards if not os.path.exists(part_file(parts_dir, s))]
+    print(f"{args.video}: {total_frames} frames at {fps:.2f} fps, analyzing [{args.start}, {end}) "
+          f"stride {args.stride} in {len(shards)} shards ({len(shards) - len(pending)} already done), "
+          f"{args.workers} workers", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    done = len(shards) - len(pending)
+    analyzed = 0
+    if pending:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                                 initargs=(args.model, args.stub, args.invoke_ms)) as pool:
+            futures = [pool.submit(run_shard, args.video, s, e, args.stride, fps, part_file(parts_dir, s))
+                       for s, e in pending]
+            for future in as_completed(futures):
+                start, rows, seconds = future.result()
+                done += 1
+                analyzed += rows
+                print(f"  shard {start:>9} {rows:>6} frames {seconds:7.1f}s  [{done}/{len(shards)}]", file=sys.stderr)
+
+    write_output(args.output, read_parts(parts_dir, shards))
+    if not args.keep_parts:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+    elapsed = time.perf_counter() - t0
+    rate = analyzed / elapsed if elapsed > 0 else 0.0
+    print(f"Wrote {args.output}: {analyzed} frames analyzed this run in {elapsed:.1f}s ({rate:.1f} frames/s)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
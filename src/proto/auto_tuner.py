@@ -0,0 +1,149 @@
+"""
+auto_tuner - closed-loop detection tuning against an FPS budget
+
+DetectionParams holds the knobs face detection runs with. AutoTuner watches
+per-frame processing and detection time and moves along a ladder of
+parameter sets, from the most accurate (level 0: finest scale steps, small
+faces, full-size detection image, every frame) to the cheapest. It steps
+one level towards cheaper settings when the measured rate falls below the
+target, and one level back when there is clear headroom, waiting a full
+measurement window after every change so each step can take effect. Cost
+is far from linear along the ladder, so a level that was measured too slow
+is not retried for retry_after seconds (no oscillating around the budget).
+"""
+
+import time
+from collections import deque
+
+
+#-----------------------------------------------------------------------------------------------
+class DetectionParams:
+    """Face detection settings for one camera"""
+    __slots__ = ('scale_factor', 'min_neighbors', 'min_size', 'detect_scale', 'detect_every')
+
+    def __init__(self, scale_factor=1.1, min_neighbors=5, min_size=30, detect_scale=1.0, detect_every=1):
+        self.scale_factor = scale_factor    # detectMultiScale pyramid step
+        self.min_neighbors = min_neighbors  # detectMultiScale grouping threshold
+        self.min_size = min_size            # smallest face searched, in pixels of the image handed to face_detect
+        self.detect_scale = detect_scale    # detection image is resized by this factor
+        self.detect_every = detect_every    # run the face search on every Nth processed frame
+
+    def to_dict(self):
+        return {
+            'scaleFactor': round(self.scale_factor, 3),
+            'minNeighbors': self.min_neighbors,
+            'minSize': self.min_size,
+            'detectScale': round(self.detect_scale, 3),
+            'detectEvery': self.detect_every,
+        }
+
+
+# (most accurate, cheapest) for each knob; the defaults in DetectionParams sit between them
+DEFAULT_BOUNDS = {
+    'scale_factor': (1.05, 1.3),
+    'min_neighbors': (4, 6),
+    'min_size': (24, 60),
+    'detect_scale': (1.0, 0.5),
+    'detect_every': (1, 4),
+}
+
+
+def build_ladder(bounds=None, levels=8):
+    """levels parameter sets interpolated from the accurate to the cheap end of every bound"""
+    bounds = dict(DEFAULT_BOUNDS, **(bounds or {}))
+    ladder = []
+    for i in range(levels):
+        t = i / float(levels - 1)
+        lerp = lambda key: bounds[key][0] + (bounds[key][1] - bounds[key][0]) * t
+        ladder.append(DetectionParams(
+            scale_factor=round(lerp('scale_factor'), 3),
+            min_neighbors=int(round(lerp('min_neighbors'))),
+            min_size=int(round(lerp('min_size'))),
+            detect_scale=round(lerp('detect_scale'), 3),
+            detect_every=int(round(lerp('detect_every'))),
+        ))
+    return ladder
+
+
+class AutoTuner:
+    """
+    Steps through a parameter ladder to keep the processing rate near target_fps.
+    Slower than target * (1 - tolerance): one level cheaper; faster than target * (1 + headroom): one level finer.
+    """
+    def __init__(self, target_fps, bounds=None, levels=8, window=30, tolerance=0.1, headroom=0.3,
+                 retry_after=60.0, start_params=None, name='', log_size=50, verbose=True):
+        self.target_fps = float(target_fps)
+        self.ladder = build_ladder(bounds, levels)
+        self.level = self._closest_level(start_params or DetectionParams())
+        self.window = window
+        self.tolerance = tolerance
+        self.headroom = headroom
+        self.name = name
+        self.verbose = verbose
+        self.loop_ms = deque(maxlen=window)
+        self.detect_ms = deque(maxlen=window)
+        self.since_change = 0
+        self.retry_after = retry_after
+        self.too_slow = {}      # level -> time it was last measured below target
+        self.log = deque(maxlen=log_size)
+
+    def _closest_level(self, params):
+        """Ladder level nearest the configured scale factor, so tuning starts from today's behaviour"""
+        return min(range(len(self.ladder)), key=lambda i: abs(self.ladder[i].scale_factor - params.scale_factor))
+
+    @property
+    def params(self):
+        return self.ladder[self.level]
+
+    def record(self, loop_ms, detect_ms=None):
+        """Add one processed frame's timings; returns True when the parameters changed"""
+        self.loop_ms.append(loop_ms)
+        if detect_ms is not None:
+            self.detect_ms.append(detect_ms)
+        self.since_change += 1
+        if self.since_change < self.window or len(self.loop_ms) < self.window:
+            return False
+        mean_ms = sum(self.loop_ms) / len(self.loop_ms)
+        fps = 1000.0 / mean_ms if mean_ms > 0 else float('inf')
+        if fps < self.target_fps * (1.0 - self.tolerance):
+            self.too_slow[self.level] = time.monotonic()
+            if self.level < len(self.ladder) - 1:
+                return self._move(+1, fps, 'below target')
+        elif fps > self.target_fps * (1.0 + self.headroom) and self.level > 0:
+            slow_at = self.too_slow.get(self.level - 1)
+            if slow_at is None or time.monotonic() - slow_at > self.retry_after:
+                return self._move(-1, fps, 'headroom')
+        return False
+
+    def _move(self, step, fps, reason):
+        before = self.params.to_dict()
+        self.level += step
+        after = self.params.to_dict()
+        detect_mean = sum(self.detect_ms) / len(self.detect_ms) if self.detect_ms else None
+        entry = {
+            'timestamp': time.time(),
+            'reason': reason,
+            'fps': round(fps, 2),
+            'detectMs': round(detect_mean, 2) if detect_mean is not None else None,
+            'level': self.level,
+            'changed': {key: [before[key], value] for key, value in after.items() if before[key] != value},
+        }
+        self.log.append(entry)
+        if self.verbose:
+            changes = ', '.join(f"{key} {old} -> {new}" for key, (old, new) in entry['changed'].items())
+            print(f"auto_tuner {self.name}: {reason} ({fps:.1f} fps, target {self.target_fps:.1f}) "
+                  f"level {self.level - step} -> {self.level}: {changes}")
+        # Measure the new settings from scratch
+        self.loop_ms.clear()
+        self.detect_ms.clear()
+        self.since_change = 0
+        return True
+
+    def stats(self):
+        return {
+            'targetFps': self.target_fps,
+            'level': self.level,
+            'levels': len(self.ladder),
+            'params': self.params.to_dict(),
+            'log': list(self.log),
+        }
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+"""
+bench_pipeline - offline throughput benchmark for the emoweb.py vision pipeline
+
+Replays a video file, an image directory or synthetic frames through the real
+face_detect -> validate_face -> smooth_face_detection -> detect_emotion chain
+with hardware and the TFLite interpreter stubbed out (see hw_stubs.py).
+Reports FPS and p50/p95/p99 stage latencies as JSON and can compare a run
+against a saved baseline report.
+
+Examples:
+    python bench_pipeline.py --video session.mp4 --output run.json
+    python bench_pipeline.py --images faces/ --invoke-ms 12 --baseline base.json
+    python bench_pipeline.py --synthetic 300
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+import hw_stubs
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# Stages reported individually; 'loop' is the whole per-frame iteration
+STAGES = ('gray', 'face_detect', 'validate_face', 'smooth_face_detection', 'detect_emotion')
+
+
+#-----------------------------------------------------------------------------------------------
+# Frame sources - all yield RGB frames at the requested size, like PiVideoStream
+#-----------------------------------------------------------------------------------------------
+def video_frames(path, size, limit=None):
+    """Yield frames from a video file"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video {path}")
+    count = 0
+    try:
+        while limit is None or count < limit:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            yield cv2.cvtColor(cv2.resize(frame, size), cv2.COLOR_BGR2RGB)
+            count += 1
+    finally:
+        cap.release()
+
+
+def image_dir_frames(path, size, limit=None, loops=1):
+    """Yield frames from every image in a directory, optionally looping over the set"""
+    files = sorted(f for f in glob.glob(os.path.join(path, '*')) if f.lower().endswith(IMAGE_EXTENSIONS))
+    if not files:
+        raise IOError(f"No images found in {path}")
+    images = []
+    for f in files:
+        img = cv2.imread(f)
+        if img is not None:
+            images.append(cv2.cvtColor(cv2.resize(img, size), cv2.COLOR_BGR2RGB))
+    count = 0
+    for _ in range(loops):
+        for img in images:
+            if limit is not None and count >= limit:
+                return
+            yield img
+            count += 1
+
+
+def synthetic_frames(size, count, seed=0):
+    """Yield noisy frames with a drifting bright ellipse, reproducible for a given seed"""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    base = rng.integers(40, 120, size=(h, w, 3), dtype=np.uint8)
+    for i in range(count):
+        frame = base.copy()
+        cx = int(w / 2 + (w / 4) * np.sin(i / 15.0))
+        cy = int(h / 2 + (h / 6) * np.cos(i / 20.0))
+        cv2.ellipse(frame, (cx, cy), (w // 10, h // 7), 0, 0, 360, (200, 170, 150), -1)
+        cv2.circle(frame, (cx - w // 30, cy - h // 30), w // 80, (30, 30, 30), -1)
+        cv2.circle(frame, (cx + w // 30, cy - h // 30), w // 80, (30, 30, 30), -1)
+        yield frame
+
+
+#-----------------------------------------------------------------------------------------------
+def summarize(samples_ms):
+    """Count, mean and percentiles of a list of millisecond samples"""
+    if not samples_ms:
+        return {'count': 0}
+    arr = np.asarray(samples_ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        'count': int(arr.size),
+        'mean_ms': round(float(arr.mean()), 4),
+        'p50_ms': round(float(p50), 4),
+        'p95_ms': round(float(p95), 4),
+        'p99_ms': round(float(p99), 4),
+        'max_ms': round(float(arr.max()), 4),
+    }
+
+
+def run_pipeline(emoweb, frames, warmup=0, always_infer=False):
+    """
+    Drive frames through the real emoweb vision functions the same way
+    emotion_track() does and collect per-stage timings in milliseconds.
+    """
+    timings = {name: [] for name in STAGES}
+    timings['loop'] = []
+    history = []
+    faces = 0
+    inferences = 0
+    measured = 0
+    width, height = emoweb.CAMERA_WIDTH, emoweb.CAMERA_HEIGHT
+    perf = time.perf_counter
+    wall_start = None
+
+    for index, frame in enumerate(frames):
+        record = index >= warmup
+        if record and wall_start is None:
+            wall_start = perf()
+        stage = {}
+
+        t_loop = perf()
+        t = perf()
+        gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        stage['gray'] = perf() - t
+
+        t = perf()
+        face = emoweb.face_detect(gray)
+        stage['face_detect'] = perf() - t
+
+        t = perf()
+        valid = emoweb.validate_face(face, width, height)
+        stage['validate_face'] = perf() - t
+
+        roi = None
+        if valid:
+            t = perf()
+            smoothed, history = emoweb.smooth_face_detection(face, history)
+            stage['smooth_face_detection'] = perf() - t
+            if smoothed is not None:
+                (cx, cy, fw, fh) = smoothed
+                fx, fy = max(0, int(cx - fw / 2)), max(0, int(cy - fh / 2))
+                roi = frame[fy:min(height, fy + fh), fx:min(width, fx + fw)]
+        else:
+            history = []
+        if roi is None and always_infer:
+            roi = frame[height // 4:3 * height // 4, width // 4:3 * width // 4]
+
+        if roi is not None and roi.size > 0:
+            t = perf()
+            emoweb.detect_emotion(roi)
+            stage['detect_emotion'] = perf() - t
+            if record:
+                inferences += 1
+        stage['loop'] = perf() - t_loop
+
+        if record:
+            measured += 1
+            if valid:
+                faces += 1
+            for name, seconds in stage.items():
+                timings[name].append(seconds * 1000.0)
+
+    elapsed = (perf() - wall_start) if wall_start is not None else 0.0
+    return {
+        'frames': measured,
+        'faces': faces,
+        'inferences': inferences,
+        'elapsed_s': round(elapsed, 4),
+        'fps': round(measured / elapsed, 3) if elapsed > 0 else 0.0,
+        'loop': summarize(timings.pop('loop')),
+        'stages': {name: summarize(samples) for name, samples in timings.items()},
+    }
+
+
+def compare(report, baseline):
+    """Percent change of the headline numbers against a baseline report"""
+    def delta(new, old):
+        if old in (None, 0) or new is None:
+            return None
+        return round((new - old) / old * 100.0, 2)
+
+    keys = ('p50_ms', 'p95_ms', 'p99_ms')
+    result = {
+        'fps_pct': delta(report.get('fps'), baseline.get('fps')),
+        'loop': {k: delta(report['loop'].get(k), baseline.get('loop', {}).get(k)) for k in keys},
+        'stages': {},
+    }
+    for name, stats in report['stages'].items():
+        old = baseline.get('stages', {}).get(name, {})
+        result['stages'][name] = {k: delta(stats.get(k), old.get(k)) for k in keys}
+    return result
+
+
+#-----------------------------------------------------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Offline emoweb vision pipeline benchmark')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--video', help='video file to replay')
+    source.add_argument('--images', help='directory of images to replay')
+    source.add_argument('--synthetic', type=int, metavar='N', help='generate N synthetic frames (default 300)')
+    parser.add_argument('--width', type=int, default=hw_stubs.DEFAULT_CONFIG['CAMERA_WIDTH'])
+    parser.add_argument('--height', type=int, default=hw_stubs.DEFAULT_CONFIG['CAMERA_HEIGHT'])
+    parser.add_argument('--limit', type=int, default=None, help='stop after N frames')
+    parser.add_argument('--loops', type=int, default=1, help='times to loop over an image directory')
+    parser.add_argument('--warmup', type=int, default=10, help='frames excluded from the statistics')
+    parser.add_argument('--seed', type=int, default=0, help='synthetic frame seed')
+    parser.add_argument('--invoke-ms', type=float, default=0.0, help='simulated interpreter cost per invoke')
+    parser.add_argument('--model', help='use the real TFLite interpreter with this model file')
+    parser.add_argument('--always-infer', action='store_true',
+                        help='run detect_emotion on a center crop when no face is found')
+    parser.add_argument('--detector', default='haar', help='face detector backend (see face_detectors.py)')
+    parser.add_argument('--no-cache', action='store_true', help='disable the perceptual-hash emotion cache')
+    parser.add_argument('--label', default=None, help='free-form label stored in the report')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    size = (args.width, args.height)
+    # emoweb prints its startup banner; keep stdout clean for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        emoweb = hw_stubs.load_emoweb({'CAMERA_WIDTH': args.width, 'CAMERA_HEIGHT': args.height,
+                                       'FACE_DETECTOR': args.detector},
+                                      invoke_ms=args.invoke_ms, model_path=args.model)
+    if args.no_cache:
+        emoweb.emotion_cache = None
+
+    if args.video:
+        frames, source = video_frames(args.video, size, args.limit), f"video:{args.video}"
+    elif args.images:
+        frames, source = image_dir_frames(args.images, size, args.limit, args.loops), f"images:{args.images}"
+    else:
+        count = args.synthetic or 300
+        if args.limit is not None:
+            count = min(count, args.limit)
+        frames, source = synthetic_frames(size, count, args.seed), f"synthetic:{count}"
+
+    report = run_pipeline(emoweb, frames, warmup=args.warmup, always_infer=args.always_infer)
+    report['emotion_cache'] = emoweb.emotion_cache.stats() if emoweb.emotion_cache is not None else None
+    report['meta'] = {
+        'label': args.label,
+        'source': source,
+        'resolution': list(size),
+        'warmup': args.warmup,
+        'invoke_ms': args.invoke_ms,
+        'model': args.model,
+        'detector': args.detector,
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'timestamp': time.time(),
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['comparison'] = compare(report, json.load(f))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
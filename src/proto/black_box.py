@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+"""
+black_box - memory-mapped flight recorder for the vision loop
+
+BlackBoxRecorder keeps the last N processed frames of a camera, raw as
+captured, with their sequence number, timestamp, face box, emotion and
+stage timings, in a ring of fixed-size slots inside one preallocated file
+mapped with np.memmap. Recording a frame is a copy into the next slot; no
+buffers are allocated and nothing is encoded. freeze() stops recording
+for a moment and exports the ring in chronological order as a clip: a
+file with the same layout, written with os.sendfile straight from the
+page cache.
+
+A ring file or clip is replayed with BlackBoxReplay (a frame source, type
+'blackbox' in CAMERAS) or frame by frame through the vision functions
+with the CLI:
+
+    python black_box.py info clips/cam0-1700000000-face-lost.bbx
+    python black_box.py replay clips/cam0-1700000000-face-lost.bbx --stub
+    python black_box.py video clips/cam0-1700000000-face-lost.bbx -o clip.mp4
+"""
+
+import argparse
+import os
+import sys
+import time
+from threading import Lock
+
+import numpy as np
+
+from frame_sources import FrameSource
+
+MAGIC = b'EMOBBX1'
+VERSION = 1
+HEADER_BYTES = 4096     # header page; slots start page aligned
+HEADER = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('slots', '<u4'),
+    ('height', '<u4'),
+    ('width', '<u4'),
+    ('channels', '<u4'),
+    ('format', 'S8'),
+    ('fps', '<f4'),
+    ('written', '<u8'),         # frames recorded since creation; the next slot is written % slots
+    ('frozen_at', '<f8'),
+    ('reason', 'S32'),
+    ('camera', 'S32'),
+])
+
+
+def slot_dtype(frame_shape):
+    return np.dtype([
+        ('seq', '<u8'),
+        ('ts', '<f8'),
+        ('face', '<i4', (4,)),          # x, y, w, h in main-stream pixels, w == 0 when no face
+        ('emotion', '<i2'),             # -1 when not classified on this frame
+        ('confidence', '<f4'),
+        ('loop_ms', '<f4'),
+        ('detect_ms', '<f4'),
+        ('frame', 'u1', tuple(frame_shape)),
+    ])
+
+
+def _frame_shape(header):
+    height, width, channels = int(header['height']), int(header['width']), int(header['channels'])
+    return (height, width) if channels == 1 else (height, width, channels)
+
+
+#-----------------------------------------------------------------------------------------------
+class BlackBoxRecorder:
+    """Ring of the last `slots` frames in a preallocated memory-mapped file"""
+    def __init__(self, path, slots, frame_shape, format='RGB888', fps=0.0, camera=''):
+        self.path = path
+        self.slots = int(slots)
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = slot_dtype(self.frame_shape)
+        size = HEADER_BYTES + self.slots * self.dtype.itemsize
+        with open(path, 'wb') as f:
+            f.truncate(size)
+        self.header = np.memmap(path, dtype=HEADER, mode='r+', shape=(1,))
+        h = self.header
+        h['magic'] = MAGIC
+        h['version'] = VERSION
+        h['slots'] = self.slots
+        h['height'] = self.frame_shape[0]
+        h['width'] = self.frame_shape[1]
+        h['channels'] = self.frame_shape[2] if len(self.frame_shape) == 3 else 1
+        h['format'] = format.encode()
+        h['fps'] = fps
+        h['camera'] = camera.encode()[:32]
+        self.ring = np.memmap(path, dtype=self.dtype, mode='r+', offset=HEADER_BYTES, shape=(self.slots,))
+        # Field views taken once, so record() only copies into existing memory
+        self._seq = self.ring['seq']
+        self._ts = self.ring['ts']
+        self._face = self.ring['face']
+        self._emotion = self.ring['emotion']
+        self._confidence = self.ring['confidence']
+        self._loop_ms = self.ring['loop_ms']
+        self._detect_ms = self.ring['detect_ms']
+        self._frames = self.ring['frame']
+        self.written = 0
+        self.frozen = False
+        self.dropped = 0            # frames not recorded while a freeze was exporting
+        self.exports = 0
+        self._lock = Lock()
+
+    def record(self, frame, seq, ts, face=None, emotion=None, loop_ms=0.0, detect_ms=0.0):
+        """Copy one frame and its results into the next slot; False while frozen or on a shape mismatch"""
+        if frame.shape != self.frame_shape:
+            self.dropped += 1
+            return False
+        with self._lock:
+            if self.frozen:
+                self.dropped += 1
+                return False
+            i = self.written % self.slots
+            np.copyto(self._frames[i], frame)
+            self._seq[i] = seq
+            self._ts[i] = ts or 0.0
+            if face is not None and len(face) == 4:
+                self._face[i] = face
+            else:
+                self._face[i] = 0
+            if emotion is not None:
+                self._emotion[i], self._confidence[i] = emotion
+            else:
+                self._emotion[i], self._confidence[i] = -1, 0.0
+            self._loop_ms[i] = loop_ms
+            self._detect_ms[i] = detect_ms or 0.0
+            self.written += 1
+            self.header['written'] = self.written
+        return True
+
+    def runs(self):
+        """(first slot, count) ranges holding the recorded frames, oldest first"""
+        if self.written <= self.slots:
+            return [(0, self.written)] if self.written else []
+        start = self.written % self.slots
+        return [(start, self.slots - start)] + ([(0, start)] if start else [])
+
+    def freeze(self, out_path, reason='trigger'):
+        """Export the ring in order to out_path (same file layout); recording pauses meanwhile"""
+        with self._lock:
+            self.frozen = True
+        try:
+            runs = self.runs()
+            count = sum(n for _, n in runs)
+            header = np.array(self.header)
+            header['slots'] = count
+            header['written'] = count
+            header['frozen_at'] = time.time()
+            header['reason'] = reason.encode()[:32]
+            # No msync: the shared mapping's dirty pages are already what sendfile reads
+            item = self.dtype.itemsize
+            with open(out_path, 'wb') as out, open(self.path, 'rb') as src:
+                out.write(header.tobytes().ljust(HEADER_BYTES, b'\0'))
+                out.flush()
+                for first, n in runs:
+                    offset, remaining = HEADER_BYTES + first * item, n * item
+                    if hasattr(os, 'sendfile'):
+                        # Kernel copies page cache to page cache, nothing passes through Python
+                        while remaining > 0:
+                            sent = os.sendfile(out.fileno(), src.fileno(), offset, remaining)
+                            if sent == 0:
+                                break
+                            offset += sent
+                            remaining -= sent
+                    else:
+                        out.write(self.ring[first:first + n].data)
+            self.exports += 1
+            seqs = [int(self._seq[first + k]) for first, n in runs for k in (0, n - 1)] if runs else []
+            return {'path': out_path, 'frames': count, 'reason': reason,
+                    'firstSeq': seqs[0] if seqs else None, 'lastSeq': seqs[-1] if seqs else None}
+        finally:
+            self.frozen = False
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'slots': self.slots,
+            'frameShape': list(self.frame_shape),
+            'written': self.written,
+            'dropped': self.dropped,
+            'exports': self.exports,
+            'sizeMB': round((HEADER_BYTES + self.slots * self.dtype.itemsize) / 1e6, 1),
+        }
+
+    def close(self):
+        self.ring.flush()
+        self.header.flush()
+
+
+class BlackBoxReader:
+    """Read-only view of a ring file or exported clip, records in chronological order"""
+    def __init__(self, path):
+        self.path = path
+        header = np.fromfile(path, dtype=HEADER, count=1)
+        if len(header) == 0 or header[0]['magic'] != MAGIC:
+            raise ValueError(f"{path} is not a black box file")
+        self.header = header[0]
+        self.format = self.header['format'].decode()
+        self.fps = float(self.header['fps'])
+        self.camera = self.header['camera'].decode()
+        self.reason = self.header['reason'].decode()
+        self.frame_shape = _frame_shape(self.header)
+        slots = int(self.header['slots'])
+        self.ring = np.memmap(path, dtype=slot_dtype(self.frame_shape), mode='r', offset=HEADER_BYTES, shape=(slots,))
+        written = int(self.header['written'])
+        if written <= slots:
+            self.order = np.arange(written)
+        else:
+            self.order = (np.arange(slots) + written) % slots
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, index):
+        """Record number index (0 = oldest); fields are views into the mapped file"""
+        return self.ring[self.order[index]]
+
+    def __iter__(self):
+        for i in self.order:
+            yield self.ring[i]
+
+
+class BlackBoxReplay(FrameSource):
+    """
+    Frame source over a ring file or clip. Frames keep their recorded sequence numbers;
+    realtime=True paces them at the recorded intervals.
+    """
+    kind = 'blackbox'
+
+    def __init__(self, path, realtime=True, loop=False, speed=1.0):
+        super().__init__()
+        self.reader = BlackBoxReader(path)
+        self.format = self.reader.format
+        self.framerate = self.reader.fps or None
+        self.realtime = realtime
+        self.loop = loop
+        self.speed = speed
+        self.index = 0
+        self._recorded_seq = 0
+        self._last_ts = None
+        self._next = None
+
+    def _grab(self):
+        if self.index >= len(self.reader):
+            if not self.loop or len(self.reader) == 0:
+                return None
+            self.index = 0
+            self._last_ts = None
+        record = self.reader[self.index]
+        self.index += 1
+        ts = float(record['ts'])
+        if self.realtime:
+            now = time.perf_counter()
+            step = (ts - self._last_ts) / self.speed if self._last_ts is not None else 0.0
+            self._next = now if self._next is None else self._next + max(0.0, step)
+            if self._next > now:
+                time.sleep(self._next - now)
+        self._last_ts = ts
+        self._recorded_seq = int(record['seq'])
+        return record['frame']
+
+    def _next_seq(self):
+        return self._recorded_seq
+
+
+#-----------------------------------------------------------------------------------------------
+# CLI
+#-----------------------------------------------------------------------------------------------
+def describe(reader):
+    records = list(reader)
+    faces = sum(1 for r in records if r['face'][2] > 0)
+    loop_ms = np.array([r['loop_ms'] for r in records]) if records else np.zeros(0)
+    print(f"{reader.path}: camera {reader.camera or '?'}, {len(reader)} frames "
+          f"{reader.frame_shape} {reader.format}, reason {reader.reason or '-'}")
+    if records:
+        span = float(records[-1]['ts'] - records[0]['ts'])
+        print(f"  seq {int(records[0]['seq'])}..{int(records[-1]['seq'])} over {span:.2f}s, faces in {faces} frames")
+        print(f"  loop ms: mean {loop_ms.mean():.1f}  p95 {np.percentile(loop_ms, 95):.1f}  max {loop_ms.max():.1f}")
+
+
+def replay(reader, em):
+    """
+    Run every recorded frame through face_detect -> validate_face -> detect_emotion and compare.
+    Recorded boxes are the smoothed track the loop published, replayed ones are raw detections.
+    """
+    replay_source = FrameSource()
+    replay_source.format = reader.format
+    changed = 0
+    for record in reader:
+        frame = record['frame']
+        gray = replay_source.gray(frame)
+        image = replay_source.roi_image(frame)
+        height, width = image.shape[:2]
+        t0 = time.perf_counter()
+        face = em.face_detect(gray)
+        detect_ms = (time.perf_counter() - t0) * 1000.0
+        emotion = -1
+        if em.validate_face(face, width, height):
+            x, y, w, h = (int(v) for v in face)
+            emotion = int(em.detect_emotion(image[y:y + h, x:x + w])[0])
+        recorded_face = tuple(int(v) for v in record['face']) if record['face'][2] > 0 else ()
+        found = tuple(int(v) for v in face) if len(face) else ()
+        differs = bool(recorded_face) != bool(found)
+        changed += differs
+        print(f"{int(record['seq']):>8}  recorded face {str(recorded_face):<22} emotion {int(record['emotion']):>2} "
+              f"detect {float(record['detect_ms']):6.1f} ms | replay face {str(found):<22} emotion {emotion:>2} "
+              f"detect {detect_ms:6.1f} ms{'  *' if differs else ''}")
+    print(f"{changed} of {len(reader)} frames changed face/no-face outcome")
+
+
+def export_video(reader, output, fps=None):
+    import cv2
+    source = FrameSource()
+    source.format = reader.format
+    height, width = reader.frame_shape[:2]
+    if reader.format == 'YUV420':
+        height = height * 2 // 3
+    writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*'mp4v'), fps or reader.fps or 10.0, (width, height))
+    for record in reader:
+        writer.write(source.color(record['frame']))
+    writer.release()
+    print(f"Wrote {output}: {len(reader)} frames")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Inspect, replay or convert black box recordings')
+    parser.add_argument('command', choices=('info', 'replay', 'video'))
+    parser.add_argument('path', help='ring file or exported clip (.bbx)')
+    parser.add_argument('-o', '--output', help='video file for the video command')
+    parser.add_argument('--fps', type=float, help='video frame rate (default: recorded rate)')
+    parser.add_argument('--stub', action='store_true', help='replay with the stub interpreter from hw_stubs.py')
+    args = parser.parse_args(argv)
+
+    reader = BlackBoxReader(args.path)
+    if args.command == 'info':
+        describe(reader)
+    elif args.command == 'video':
+        if not args.output:
+            parser.error('video needs -o/--output')
+        export_video(reader, args.output, args.fps)
+    else:
+        if args.stub:
+            import hw_stubs
+            em = hw_stubs.load_emoweb()
+        else:
+            import emoweb as em
+            em.vision.load()
+        replay(reader, em)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+emotion_cache - perceptual-hash memoization of emotion results
+
+A still subject produces nearly the same face crop frame after frame. The
+cache keys results by a 64-bit difference hash (dHash) of the downsampled
+gray crop and answers lookups within a small Hamming distance, so steady
+interactions skip most interpreter calls. Entries expire after max_age
+seconds so a slowly changing expression is re-classified regularly.
+"""
+
+import time
+from collections import OrderedDict
+from threading import Lock
+
+import cv2
+import numpy as np
+
+
+def dhash(face_roi, hash_size=8):
+    """64-bit difference hash of a face crop (gray or BGR-ordered 3-channel)"""
+    small = cv2.resize(face_roi, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+#-----------------------------------------------------------------------------------------------
+class EmotionCache:
+    """LRU of dhash -> (emotion_idx, confidence, stored_at) with Hamming tolerance and max age"""
+    def __init__(self, capacity=64, max_distance=4, max_age=2.0):
+        self.capacity = capacity
+        self.max_distance = max_distance
+        self.max_age = max_age
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.near_hits = 0      # hits that were not an exact hash match
+        self.misses = 0
+        self.expired = 0
+        self._lock = Lock()
+
+    def lookup(self, key, now=None):
+        """(emotion_idx, confidence) for a hash within max_distance of a fresh entry, else None"""
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            match = self.entries.get(key)
+            near = False
+            if match is None and self.max_distance > 0:
+                best = self.max_distance + 1
+                for other, entry in self.entries.items():
+                    distance = hamming(key, other)
+                    if distance < best:
+                        best, key, match, near = distance, other, entry, True
+            if match is not None and now - match[2] > self.max_age:
+                del self.entries[key]
+                self.expired += 1
+                match = None
+            if match is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            if near:
+                self.near_hits += 1
+            return match[0], match[1]
+
+    def store(self, key, emotion_idx, confidence, now=None):
+        with self._lock:
+            self.entries[key] = (emotion_idx, confidence, time.monotonic() if now is None else now)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'capacity': self.capacity,
+            'maxDistance': self.max_distance,
+            'maxAge': self.max_age,
+            'hits': self.hits,
+            'nearHits': self.near_hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'hitRate': round(self.hits / lookups, 4) if lookups else None,
+        }
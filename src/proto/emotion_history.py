@@ -0,0 +1,159 @@
+"""
+emotion_history - bounded in-process time-series store for emotion results
+
+Records (timestamp, face_id, emotion_idx, confidence, pan, tilt, camera,
+capture_ts) into a preallocated NumPy structured ring, and keeps per-second and per-minute
+emotion histograms up to date on every append so trend queries never scan
+the raw records. Memory is fixed at construction, whatever the uptime.
+"""
+
+import time
+from threading import Lock
+
+import numpy as np
+
+HISTORY_DTYPE = np.dtype([
+    ('timestamp', 'f8'),
+    ('face_id', 'i4'),
+    ('emotion_idx', 'i1'),
+    ('confidence', 'f4'),
+    ('pan', 'f4'),
+    ('tilt', 'f4'),
+    ('camera', 'i2'),
+    ('capture_ts', 'f8'),
+])
+
+RESOLUTIONS = ('raw', 'second', 'minute')
+MAX_LIMIT = 1000        # raw records per request at most
+
+
+#-----------------------------------------------------------------------------------------------
+class _BucketRing:
+    """Fixed number of time buckets, each an emotion histogram, indexed by bucket number modulo size"""
+    def __init__(self, width_s, size, num_emotions):
+        self.width_s = width_s
+        self.keys = np.full(size, -1, dtype=np.int64)
+        self.counts = np.zeros((size, num_emotions), dtype=np.int32)
+
+    def add(self, timestamp, emotion_idx):
+        key = int(timestamp // self.width_s)
+        slot = key % len(self.keys)
+        if self.keys[slot] != key:
+            self.keys[slot] = key
+            self.counts[slot] = 0
+        self.counts[slot, emotion_idx] += 1
+
+    def since(self, timestamp):
+        """(bucket start times, counts) for buckets at or after timestamp, oldest first"""
+        first_key = int(timestamp // self.width_s)
+        mask = self.keys >= max(first_key, 0)
+        keys = self.keys[mask]
+        order = np.argsort(keys, kind='stable')
+        return keys[order] * self.width_s, self.counts[mask][order]
+
+
+class EmotionHistory:
+    """
+    Ring store of emotion results plus incrementally maintained histograms.
+    Appends are O(1); range queries binary-search the two sorted halves of the ring.
+    'timestamp' is the append time, kept non-decreasing so the search holds when several
+    cameras append out of capture order; 'capture_ts' is when the frame was taken and is
+    what the histograms bucket by.
+    """
+    def __init__(self, capacity=100000, num_emotions=7, second_buckets=3600, minute_buckets=1440):
+        self.capacity = capacity
+        self.num_emotions = num_emotions
+        self.records = np.zeros(capacity, dtype=HISTORY_DTYPE)
+        self.head = 0       # next slot to write
+        self.count = 0      # valid records, at most capacity
+        self.total = 0      # records ever appended
+        self.last_ts = 0.0  # newest append timestamp
+        self.seconds = _BucketRing(1, second_buckets, num_emotions)
+        self.minutes = _BucketRing(60, minute_buckets, num_emotions)
+        self._lock = Lock()
+
+    def append(self, emotion_idx, confidence, face_id=0, pan=0.0, tilt=0.0, capture_ts=None, camera=0):
+        emotion_idx = int(emotion_idx)
+        with self._lock:
+            # Never step back, even if the wall clock does
+            timestamp = self.last_ts = max(time.time(), self.last_ts)
+            if capture_ts is None:
+                capture_ts = timestamp
+            self.records[self.head] = (timestamp, face_id, emotion_idx, confidence, pan, tilt, camera, capture_ts)
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            self.total += 1
+            self.seconds.add(capture_ts, emotion_idx)
+            self.minutes.add(capture_ts, emotion_idx)
+
+    def _segments(self):
+        """Oldest-first views of the valid records, as at most two contiguous slices"""
+        if self.count < self.capacity:
+            return (self.records[:self.count],)
+        return (self.records[self.head:], self.records[:self.head])
+
+    def since(self, timestamp=0.0, limit=None):
+        """Copy of the records with timestamp >= the given one, oldest first, newest limit kept"""
+        with self._lock:
+            parts = []
+            for seg in self._segments():
+                start = np.searchsorted(seg['timestamp'], timestamp, side='left')
+                if start < len(seg):
+                    parts.append(seg[start:])
+            if not parts:
+                return np.zeros(0, dtype=HISTORY_DTYPE)
+            out = np.concatenate(parts) if len(parts) > 1 else parts[0].copy()
+        if limit is not None and len(out) > limit:
+            out = out[-limit:]
+        return out
+
+    def oldest_timestamp(self):
+        """Timestamp of the oldest record still in memory, None when empty"""
+        with self._lock:
+            if self.count == 0:
+                return None
+            return float(self._segments()[0]['timestamp'][0])
+
+    def histogram(self, resolution='second', timestamp=0.0):
+        """(bucket start times, counts[n, num_emotions]) at 'second' or 'minute' resolution"""
+        ring = self.seconds if resolution == 'second' else self.minutes
+        with self._lock:
+            return ring.since(timestamp)
+
+    def query(self, since=0.0, resolution='raw', limit=1000, labels=None):
+        """JSON-ready columnar slice used by the /api/emotion_history endpoints"""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+        result = {
+            'resolution': resolution,
+            'since': since,
+            'labels': labels,
+            'stored': self.count,
+            'total': self.total,
+        }
+        if resolution == 'raw':
+            rows = self.since(since, limit)
+            result['records'] = {name: rows[name].tolist() for name in HISTORY_DTYPE.names}
+        else:
+            starts, counts = self.histogram(resolution, since)
+            result['buckets'] = {'start': starts.tolist(), 'counts': counts.tolist()}
+        return result
+
+    def stats(self):
+        return {
+            'capacity': self.capacity,
+            'stored': self.count,
+            'total': self.total,
+            'bytes': int(self.records.nbytes + self.seconds.counts.nbytes + self.minutes.counts.nbytes),
+        }
+
+
+def parse_history_args(args):
+    """Read since/resolution/limit from a Flask request.args-like mapping"""
+    since = float(args.get('since', 0) or 0)
+    if since < 0:
+        # Negative values are relative: since=-300 means the last five minutes
+        since = time.time() + since
+    resolution = args.get('resolution', 'raw') or 'raw'
+    limit = max(1, min(int(args.get('limit', MAX_LIMIT) or MAX_LIMIT), MAX_LIMIT))
+    return since, resolution, limit
@@ -1,38 +1,44 @@
 #!/usr/bin/env python
 progname = "emotion_track.py"
-ver = "ver 1.4-threaded"
+ver = "ver 1.5-lazy"
 
 """
 emotion-track combines face detection, emotion recognition, and pan/tilt tracking.
 Detects emotions in real-time and tracks the face using servo motors.
 Displays corresponding emotion expressions on OLED screen.
 Uses pigpio for servo control with THREADED scanning for smooth movement.
-"""
 
-print("===================================")
-print("%s %s using python3 and OpenCV" % (progname, ver))
-print("Loading Libraries  Please Wait ....")
+Importing this module has no hardware side effects: GPIO, pigpio, the Arduino
+link, the OLED, the Haar cascades and the TFLite interpreter are created on
+first use through the `hardware` and `vision` objects, so tools and
+emotion_flask_server.py can import it on any machine.
+"""
 
 import os
 import sys
 import time
 import cv2
 import numpy as np
-import tflite_runtime.interpreter as tflite #type: ignore
-from threading import Thread
-import RPi.GPIO as GPIO
-import pigpio #type: ignore
-from luma.core.interface.serial import i2c #type: ignore
-from luma.oled.device import sh1106 #type: ignore
-from PIL import Image, ImageDraw
-from flask import Flask, Response
+from threading import Thread, Lock, Event, Condition, current_thread
+from concurrent.futures import ThreadPoolExecutor
+import socket
+from contextlib import contextmanager
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
 import base64
-
-# controllers
-from arduino_anim_controller import ArduinoAnimController
-from music_controller import MusicController
+from collections import deque
+from emotion_history import EmotionHistory, parse_history_args
+from event_store import EventStore
+from emotion_cache import EmotionCache, dhash
+from face_detectors import create_detector, DEFAULT_PATHS as FACE_DETECTOR_DEFAULTS
+from auto_tuner import AutoTuner, DetectionParams
+from power_governor import PowerGovernor, clamp_detect_every
+from black_box import BlackBoxRecorder
+from oled_display import OledDisplay, render_frames, load_sprite_sheet
+from profiling import register_debug_routes
+from search_strategies import create_strategy
+from payloads import EmotionUpdate, ServoPosition, CameraFrame, Payload, PayloadCache, SocketIOJSON, payload_response
+from frame_sources import PiVideoStream, create_source
 
 
 mypath = os.path.abspath(__file__)
@@ -40,22 +46,115 @@ baseDir = mypath[0:mypath.rfind("/")+1]
 baseFileName = mypath[mypath.rfind("/")+1:mypath.rfind(".")]
 progName = os.path.basename(__file__)
 
-# music dir init
-music = MusicController(music_dir=baseDir + "musics")
+#-------------------------------------------------------------------------------------------
+# Startup phase timing
+#-------------------------------------------------------------------------------------------
+startup_phases = {}   # phase name -> seconds, in the order phases finished
+startup_t0 = time.time()
+
+@contextmanager
+def timed_phase(name):
+    """Record how long one startup phase takes"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_phases[name] = round(time.perf_counter() - t0, 4)
+        if verbose:
+            print(f"startup - {name} took {startup_phases[name] * 1000:.1f} ms")
+
+def print_startup_summary():
+    """Print per-phase startup cost"""
+    print("Startup phases:")
+    for name, seconds in startup_phases.items():
+        print(f"  {name:<14} {seconds * 1000:8.1f} ms")
+    print(f"  {'total':<14} {(time.time() - startup_t0) * 1000:8.1f} ms")
+
+# Startup readiness - /api/health reports "ready" only once every entry is True
+readiness = {'models': False, 'server': False, 'camera': False}
+warmup_runs = 3            # warm calls timed per model after the cold call
+server_start_timeout = 10  # seconds to wait for the WebSocket port to accept connections
+first_frame_timeout = 10   # seconds to wait for the first camera frame
+
+def is_ready():
+    return all(readiness.values())
+
+# Defaults for config.py settings so tools can import this module without one
+CAMERA_WIDTH = 640
+CAMERA_HEIGHT = 480
+CAMERA_FRAMERATE = 30
+CAMERA_ROTATION = 0
+CAMERA_HFLIP = False
+CAMERA_VFLIP = False
+GPIOZERO_PAN_PIN = 17
+GPIOZERO_TILT_PIN = 18
+WINDOW_BIGGER = 1
+window_on = False
+debug = False
+verbose = False
+timer_face = 1.0
+EVENT_DB_PATH = None           # e.g. baseDir + "emotion_events.db" to persist events in SQLite
+EVENT_DB_RETENTION_DAYS = 30
+CAMERAS = None                 # list of frame source dicts, see frame_sources.create_source (None = one Pi camera)
+ENGINE_WORKERS = 1             # vision worker threads shared by all cameras
+CAMERA_FORMAT = 'RGB888'       # 'YUV420' detects on the luma plane and converts colour only when needed
+CAMERA_LORES = None            # e.g. (320, 240): detect faces on a camera-scaled stream, crop from main
+MOTION_GATE_THRESHOLD = 0      # mean gray-level change below which an empty, still scene is not searched (0 = off)
+EMOTION_CACHE_SIZE = 64        # perceptual-hash result cache entries (0 disables)
+EMOTION_CACHE_MAX_DISTANCE = 4 # Hamming distance (of 64 bits) still treated as the same crop
+EMOTION_CACHE_MAX_AGE = 2.0    # seconds before a cached result is re-classified
+_haar_dir = getattr(getattr(cv2, 'data', None), 'haarcascades', '/usr/share/opencv4/haarcascades/')
+fface1_haar_path = os.path.join(_haar_dir, 'haarcascade_frontalface_default.xml')
+fface2_haar_path = os.path.join(_haar_dir, 'haarcascade_frontalface_alt2.xml')
+pface1_haar_path = os.path.join(_haar_dir, 'haarcascade_profileface.xml')
+FACE_DETECTOR = 'haar'         # haar | lbp | yunet | tflite, see face_detectors.py (pick one with its benchmark)
+LBP_CASCADE_PATH = FACE_DETECTOR_DEFAULTS['lbp']
+YUNET_MODEL_PATH = FACE_DETECTOR_DEFAULTS['yunet']
+FACE_TFLITE_MODEL_PATH = FACE_DETECTOR_DEFAULTS['tflite']
+AUTO_TUNE = False              # adjust detection parameters per camera to hold AUTO_TUNE_TARGET_FPS
+AUTO_TUNE_TARGET_FPS = 10      # processing-rate budget (a camera's own 'fps' target wins when set)
+AUTO_TUNE_BOUNDS = None        # e.g. {'scale_factor': (1.05, 1.2)}, overrides auto_tuner.DEFAULT_BOUNDS
+POWER_GOVERNOR = False         # idle-scan / acquiring / locked profiles plus thermal derating, see power_governor.py
+POWER_IDLE_AFTER = 120.0       # seconds without a face before a scanning camera drops to idle-scan
+POWER_PROFILES = None          # e.g. {'idle-scan': {'fps': 3}}, overrides power_governor.DEFAULT_PROFILES
+POWER_MAX_SEARCH_GAP = None    # seconds between face searches at most under any profile (None = 3/4 of timer_face)
+THERMAL_TEMP_PATH = '/sys/class/thermal/thermal_zone0/temp'
+THERMAL_THROTTLE_PATH = '/sys/devices/platform/soc/soc:firmware/get_throttled'
+THERMAL_WARM_C = 68.0          # first derating step (firmware soft-throttles at 80 C)
+THERMAL_HOT_C = 75.0           # second derating step
+DEBUG_TOKEN = None             # /debug/* profiling endpoints: None = localhost only, else X-Debug-Token
+PREVIEW_MAX_FPS = 15           # window_on preview refresh cap (its own thread, never slows tracking)
+STREAM_ANNOTATED = False       # draw the preview overlay on frames sent to WebSocket clients
+OLED_SPRITE_SHEET = None       # PNG with the expression frames side by side (None = drawn at startup)
+OLED_MAX_FPS = 8               # panel updates per second at most
+BLACKBOX = False               # keep the last BLACKBOX_SECONDS of processed frames per camera, see black_box.py
+BLACKBOX_SECONDS = 10
+BLACKBOX_RING_DIR = '/dev/shm' # ring files are rewritten constantly: keep them on tmpfs, not the SD card
+BLACKBOX_CLIP_DIR = None       # where frozen clips go (default baseDir + 'blackbox')
+BLACKBOX_ON_FACE_LOST = False  # freeze a clip whenever a tracked face is lost
+BLACKBOX_TRIGGER_INTERVAL = 30.0  # minimum seconds between automatic freezes per camera
+SEARCH_STRATEGY = 'raster'     # raster | grid | last-seen | motion, see search_strategies.py
+SEARCH_OVERLAP = 0.15          # share of a search view repeated by its neighbour (grid, last-seen, motion)
+SEARCH_DWELL = 0.4             # seconds a search view is held once the servos arrive
+SEARCH_MEMORY = 30.0           # seconds a lost face's position is searched around first (last-seen)
 
 # Read Configuration variables from config.py file
 configFilePath = baseDir + "config.py"
-if not os.path.exists(configFilePath):
-    print("ERROR - Missing config.py file")
-    sys.exit(1)
-
-from config import *
+with timed_phase('config'):
+    try:
+        from config import *
+        config_loaded = True
+    except ImportError:
+        config_loaded = False
 
 # --- EMOTION DETECTION CONFIGURATION ---
 MODEL_PATH = os.path.join(baseDir, 'Emotion_Detector/emotion_quarter_size.tflite')
-if not os.path.exists(MODEL_PATH):
-    print(f"ERROR: Model not found at {MODEL_PATH}")
-    sys.exit(1)
+FACE_DETECTOR_PATHS = {
+    'haar': (fface1_haar_path, pface1_haar_path, fface2_haar_path),
+    'lbp': LBP_CASCADE_PATH,
+    'yunet': YUNET_MODEL_PATH,
+    'tflite': FACE_TFLITE_MODEL_PATH
+}
 
 
 
@@ -75,45 +174,53 @@ stabilization_delay = 0.05
 # LED setup
 RED_LED = 27
 GREEN_LED = 22
-GPIO.setmode(GPIO.BCM)
-GPIO.setup(RED_LED, GPIO.OUT)
-GPIO.setup(GREEN_LED, GPIO.OUT)
-GPIO.output(RED_LED, GPIO.LOW)
-GPIO.output(GREEN_LED, GPIO.LOW)
-
-
-# Pigpio setup for servo control
-print("Initializing pigpio...")
-try:
-    pi = pigpio.pi()
-    if not pi.connected:
-        print("ERROR: Could not connect to pigpio daemon")
-        print("Make sure pigpiod is running: sudo systemctl start pigpiod")
-        sys.exit(1)
-    print("pigpio connected successfully")
-except Exception as e:
-    print(f"ERROR: Failed to initialize pigpio: {e}")
-    print("Make sure pigpiod is running: sudo systemctl start pigpiod")
-    sys.exit(1)
 
 ARDUINO_PORT = '/dev/ttyUSB0'
 ARDUINO_BAUD = 115200
-anim_controller = ArduinoAnimController(port=ARDUINO_PORT, baud=ARDUINO_BAUD)
 
-# Flask and WebSocket setup
+# Flask and WebSocket setup (SocketIO is created on first use, see get_socketio)
 app = Flask(__name__)
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+socketio = None
+register_debug_routes(app, DEBUG_TOKEN)
 
 # WebSocket state
 websocket_clients = 0
-latest_frame = None
-latest_emotion_data = {
+latest_frame = None          # CameraFrame payload (see payloads.py), encoded once for every client
+latest_frames = {}           # latest CameraFrame per camera id
+latest_emotions = {}         # latest EmotionUpdate per camera id
+latest_emotion_data = Payload({
     'emotion': None,
     'confidence': 0,
     'servoAngle': 90,
-    'timestamp': None
-}
+    'timestamp': None,
+    'frameSeq': None,
+    'captureTs': None,
+    'latencyMs': None
+})
+status_max_age = 0.25        # seconds a status payload is reused while the camera snapshot is unchanged
+status_payloads = PayloadCache(max_age=status_max_age)
+
+# Emotion history (bounded ring, see emotion_history.py)
+history_capacity = 100000   # raw records kept, about 2.3 MB
+emotion_history = EmotionHistory(capacity=history_capacity, num_emotions=len(emotion_mapper))
+event_store = None          # EventStore when EVENT_DB_PATH is set, see start_event_store()
+
+# Skips inference for near-identical face crops (see emotion_cache.py)
+emotion_cache = EmotionCache(EMOTION_CACHE_SIZE, EMOTION_CACHE_MAX_DISTANCE, EMOTION_CACHE_MAX_AGE) \
+    if EMOTION_CACHE_SIZE else None
+
+# Glass-to-glass latency tracing
+latency_window = 300      # number of recent payloads kept per event type
+stale_frame_ms = 250      # payloads older than this (capture -> emit) count as stale
+
+motion_thumb_size = (64, 48)  # detection image is reduced to this for motion gating
+
+# Picks per-camera work profiles from tracking state and CPU temperature (see power_governor.py)
+power_governor = PowerGovernor(THERMAL_TEMP_PATH, THERMAL_THROTTLE_PATH, THERMAL_WARM_C, THERMAL_HOT_C,
+                               idle_after=POWER_IDLE_AFTER, profiles=POWER_PROFILES,
+                               max_search_gap=POWER_MAX_SEARCH_GAP or 0.75 * timer_face, verbose=debug) \
+    if POWER_GOVERNOR else None
 
 # Setup servo pins for pigpio
 pan_pin = GPIOZERO_PAN_PIN
@@ -134,22 +241,19 @@ current_pan = 90.0
 current_tilt = 20.0
 is_scanning = True
 program_running = True
+scan_interval = 0.02   # seconds between scanner servo writes (the power governor slows this down)
 
 FOV_H = 62.2  # Horizontal Field of View in degrees
 FOV_V = 48.8  # Vertical Field of View in degrees
 
-# OLED Setup
-try:
-    print("Initializing OLED Display...")
-    serial = i2c(port=1, address=0x3C)
-    oled = sh1106(serial, rotate=0)
-    oled.contrast(255)
-    oled_ready = True
-    print("OLED Display Ready")
-except Exception as e:
-    print(f"WARNING: OLED not available: {e}")
-    oled_ready = False
-    oled = None
+# Where the head looks while no face is tracked, with time-to-acquire stats (see search_strategies.py)
+search_options = {'pan_range': (pan_min_angle, pan_max_angle), 'tilt_range': (tilt_min_angle, tilt_max_angle),
+                  'fov': (FOV_H, FOV_V)}
+if SEARCH_STRATEGY != 'raster':
+    search_options.update(overlap=SEARCH_OVERLAP, dwell=SEARCH_DWELL)
+if SEARCH_STRATEGY == 'last-seen':
+    search_options['memory'] = SEARCH_MEMORY
+searcher = create_strategy(SEARCH_STRATEGY, **search_options)
 
 # Create Calculated Variables
 cam_cx = CAMERA_WIDTH / 2
@@ -157,11 +261,6 @@ cam_cy = CAMERA_HEIGHT / 2
 big_w = int(CAMERA_WIDTH * WINDOW_BIGGER)
 big_h = int(CAMERA_HEIGHT * WINDOW_BIGGER)
 
-# Setup haar_cascade variables
-face_cascade = cv2.CascadeClassifier(fface1_haar_path)
-frontalface = cv2.CascadeClassifier(fface2_haar_path)
-profileface = cv2.CascadeClassifier(pface1_haar_path)
-
 # Color data for OpenCV Markings
 blue = (255, 0, 0)
 green = (0, 255, 0)
@@ -169,24 +268,348 @@ red = (0, 0, 255)
 white = (255, 255, 255)
 yellow = (0, 255, 255)
 
-# Load TFLite model
-try:
-    print("Loading TFLite Emotion Model...")
-    interpreter = tflite.Interpreter(model_path=MODEL_PATH)
-    interpreter.allocate_tensors()
-    input_details = interpreter.get_input_details()
-    output_details = interpreter.get_output_details()
-    INPUT_SHAPE = input_details[0]['shape'][1:3]
-    print(f"Model Loaded. Input shape: {INPUT_SHAPE}")
-except Exception as e:
-    print(f"ERROR: Failed to load TFLite model: {e}")
-    sys.exit(1)
-
 # FPS calculation
 freq = cv2.getTickFrequency()
 font = cv2.FONT_HERSHEY_SIMPLEX
 frame_rate_calc = 0
 
+#-------------------------------------------------------------------------------------------
+class HardwareError(RuntimeError):
+    """A required hardware component could not be initialized"""
+
+#-------------------------------------------------------------------------------------------
+class Hardware:
+    """
+    GPIO LEDs, pigpio servos, Arduino animations, OLED and music player.
+    Each device is initialized (and its library imported) on first access.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._gpio = None
+        self._pi = None
+        self._anim = None
+        self._music = None
+        self._oled = None
+        self._oled_tried = False
+        self._display = None
+
+    @property
+    def gpio(self):
+        if self._gpio is None:
+            with self._lock, timed_phase('gpio'):
+                if self._gpio is None:
+                    import RPi.GPIO as GPIO
+                    GPIO.setmode(GPIO.BCM)
+                    GPIO.setup(RED_LED, GPIO.OUT)
+                    GPIO.setup(GREEN_LED, GPIO.OUT)
+                    GPIO.output(RED_LED, GPIO.LOW)
+                    GPIO.output(GREEN_LED, GPIO.LOW)
+                    self._gpio = GPIO
+        return self._gpio
+
+    @property
+    def pi(self):
+        if self._pi is None:
+            with self._lock, timed_phase('pigpio'):
+                if self._pi is None:
+                    print("Initializing pigpio...")
+                    try:
+                        import pigpio #type: ignore
+                        pi = pigpio.pi()
+                    except Exception as e:
+                        raise HardwareError(f"Failed to initialize pigpio: {e}")
+                    if not pi.connected:
+                        raise HardwareError("Could not connect to pigpio daemon")
+                    print("pigpio connected successfully")
+                    self._pi = pi
+        return self._pi
+
+    @property
+    def anim(self):
+        if self._anim is None:
+            with self._lock, timed_phase('arduino'):
+                if self._anim is None:
+                    from arduino_anim_controller import ArduinoAnimController
+                    self._anim = ArduinoAnimController(port=ARDUINO_PORT, baud=ARDUINO_BAUD)
+        return self._anim
+
+    @property
+    def music(self):
+        if self._music is None:
+            with self._lock, timed_phase('music'):
+                if self._music is None:
+                    from music_controller import MusicController
+                    self._music = MusicController(music_dir=baseDir + "musics")
+        return self._music
+
+    @property
+    def oled(self):
+        """OLED device, or None when the display is not available"""
+        if not self._oled_tried:
+            with self._lock, timed_phase('oled'):
+                if not self._oled_tried:
+                    try:
+                        print("Initializing OLED Display...")
+                        from luma.core.interface.serial import i2c #type: ignore
+                        from luma.oled.device import sh1106 #type: ignore
+                        serial = i2c(port=1, address=0x3C)
+                        self._oled = sh1106(serial, rotate=0)
+                        self._oled.contrast(255)
+                        print("OLED Display Ready")
+                    except Exception as e:
+                        print(f"WARNING: OLED not available: {e}")
+                        self._oled = None
+                    self._oled_tried = True
+        return self._oled
+
+    @property
+    def oled_ready(self):
+        return self.oled is not None
+
+    @property
+    def display(self):
+        """Background OLED updater with the pre-rendered expressions, None without an OLED"""
+        if self._display is None and self.oled is not None:
+            with self._lock, timed_phase('oled_frames'):
+                if self._display is None:
+                    size = getattr(self._oled, 'size', (128, 64))
+                    frames = load_sprite_sheet(OLED_SPRITE_SHEET, size) if OLED_SPRITE_SHEET else render_frames(size)
+                    self._display = OledDisplay(self._oled, frames, OLED_MAX_FPS).start()
+        return self._display
+
+    def show_expression(self, name):
+        """Queue an expression for the OLED (never blocks on I2C)"""
+        display = self.display
+        if display is not None:
+            display.show(name)
+
+    def initialize(self):
+        """Bring up every device now (raises HardwareError if servos are unavailable)"""
+        self.gpio
+        self.pi
+        self.anim
+        self.music
+        self.oled
+        self.display
+        return self
+
+    def cleanup(self):
+        """Release only the devices that were actually initialized"""
+        if self._pi is not None:
+            self._pi.set_servo_pulsewidth(pan_pin, 0)
+            self._pi.set_servo_pulsewidth(tilt_pin, 0)
+            self._pi.stop()
+            self._pi = None
+        if self._gpio is not None:
+            self._gpio.cleanup()
+            self._gpio = None
+        if self._display is not None:
+            self._display.stop()
+            self._display = None
+        if self._oled is not None:
+            self._oled.clear()
+
+hardware = Hardware()
+
+#-------------------------------------------------------------------------------------------
+class VisionModels:
+    """Haar cascades and the TFLite emotion interpreter, loaded on first use"""
+    def __init__(self, model_path=MODEL_PATH):
+        self.model_path = model_path
+        self._lock = Lock()
+        self.loaded = False
+        self.detector = None            # face_detectors backend chosen by FACE_DETECTOR
+        self.interpreter = None
+        self.input_details = None
+        self.output_details = None
+        self.input_shape = None
+        self.warmed_up = False
+        self.warmup_stats = {}
+        self.tflite = None
+        # The live loop's interpreter is shared by the engine workers; calls are serialized
+        self.infer_lock = Lock()
+        # Batched classification gets its own interpreter so resizing never touches the live one
+        self.batch_interpreter = None
+        self.batch_size = None
+        self.batch_resizable = True
+        self._batch_lock = Lock()
+
+    def load(self):
+        """Load the face detector and interpreter once; safe to call from several threads"""
+        if self.loaded:
+            return self
+        with self._lock:
+            if self.loaded:
+                return self
+            with timed_phase('tflite_import'):
+                try:
+                    import tflite_runtime.interpreter as tflite #type: ignore
+                except ImportError:
+                    from tensorflow import lite as tflite #type: ignore
+                self.tflite = tflite
+
+            with timed_phase('face_detector'):
+                try:
+                    self.detector = create_detector(FACE_DETECTOR, FACE_DETECTOR_PATHS.get(FACE_DETECTOR),
+                                                    **({'tflite': tflite} if FACE_DETECTOR == 'tflite' else {}))
+                except (IOError, ValueError) as e:
+                    raise HardwareError(f"Face detector {FACE_DETECTOR}: {e}")
+
+            with timed_phase('interpreter'):
+                print("Loading TFLite Emotion Model...")
+                if not os.path.exists(self.model_path):
+                    raise HardwareError(f"Model not found at {self.model_path}")
+                self.interpreter = tflite.Interpreter(model_path=self.model_path)
+                self.interpreter.allocate_tensors()
+                self.input_details = self.interpreter.get_input_details()
+                self.output_details = self.interpreter.get_output_details()
+                # cv2.resize wants (width, height) as plain ints
+                height, width = (int(v) for v in self.input_details[0]['shape'][1:3])
+                self.input_shape = (width, height)
+                print(f"Model Loaded. Input shape: {self.input_shape}")
+            self.loaded = True
+        return self
+
+    def warm_up(self, frame_size=None, runs=warmup_runs):
+        """
+        Run every cascade and the interpreter on dummy inputs of the real shapes
+        so first-call costs are paid before the first real face.
+        Records cold (first call) and warm (median of later calls) latency in ms.
+        """
+        self.load()
+        if self.warmed_up:
+            return self.warmup_stats
+        width, height = frame_size or (CAMERA_WIDTH, CAMERA_HEIGHT)
+        # Noise rather than zeros so the cascades evaluate more than their first stage
+        dummy_gray = np.random.default_rng(0).integers(0, 256, (height, width), dtype=np.uint8)
+        detail = self.input_details[0]
+        dummy_input = np.zeros(tuple(int(v) for v in detail['shape']), dtype=detail['dtype'])
+
+        def timed(call):
+            t0 = time.perf_counter()
+            call()
+            return (time.perf_counter() - t0) * 1000.0
+
+        def run_interpreter():
+            with self.infer_lock:
+                self.interpreter.set_tensor(detail['index'], dummy_input)
+                self.interpreter.invoke()
+                self.interpreter.get_tensor(self.output_details[0]['index'])
+
+        calls = {
+            'face_detector': lambda: self.detector.detect(dummy_gray),
+            'interpreter': run_interpreter
+        }
+        with timed_phase('warmup'):
+            for name, call in calls.items():
+                cold = timed(call)
+                warm = sorted(timed(call) for _ in range(max(1, runs)))
+                self.warmup_stats[name] = {
+                    'coldMs': round(cold, 2),
+                    'warmMs': round(warm[len(warm) // 2], 2)
+                }
+                if verbose:
+                    print(f"warm_up - {name} cold {cold:.1f} ms, warm {warm[len(warm) // 2]:.1f} ms")
+        self.warmed_up = True
+        return self.warmup_stats
+
+    def _resize_batch(self, size):
+        """Give the batch interpreter a batch dimension of size (falls back to 1 for fixed-shape models)"""
+        if self.batch_interpreter is None:
+            self.batch_interpreter = self.tflite.Interpreter(model_path=self.model_path)
+            self.batch_interpreter.allocate_tensors()
+            self.batch_size = int(self.batch_interpreter.get_input_details()[0]['shape'][0])
+        if not self.batch_resizable or size == self.batch_size:
+            return
+        detail = self.batch_interpreter.get_input_details()[0]
+        try:
+            self.batch_interpreter.resize_tensor_input(detail['index'], [size] + [int(v) for v in detail['shape'][1:]])
+            self.batch_interpreter.allocate_tensors()
+            self.batch_size = size
+        except (ValueError, RuntimeError) as e:
+            if debug:
+                print(f"batch interpreter - model has a fixed batch size, running one at a time: {e}")
+            self.batch_resizable = False
+            self.batch_interpreter.resize_tensor_input(detail['index'], [1] + [int(v) for v in detail['shape'][1:]])
+            self.batch_interpreter.allocate_tensors()
+            self.batch_size = 1
+
+    def classify(self, batch):
+        """Class probabilities (N, classes) for a preprocessed (N, h, w, 1) float32 stack"""
+        self.load()
+        with self._batch_lock:
+            self._resize_batch(len(batch))
+            interpreter = self.batch_interpreter
+            input_index = interpreter.get_input_details()[0]['index']
+            output_index = interpreter.get_output_details()[0]['index']
+            if self.batch_size == len(batch):
+                interpreter.set_tensor(input_index, batch)
+                interpreter.invoke()
+                return np.array(interpreter.get_tensor(output_index))
+            outputs = []
+            for sample in batch:
+                interpreter.set_tensor(input_index, sample[np.newaxis])
+                interpreter.invoke()
+                outputs.append(np.array(interpreter.get_tensor(output_index))[0])
+            return np.stack(outputs)
+
+vision = VisionModels()
+
+#-------------------------------------------------------------------------------------------
+class LatencyTracker:
+    """Rolling capture-to-emit latency summary for one payload type"""
+    def __init__(self, window=latency_window, stale_ms=stale_frame_ms):
+        self.samples = deque(maxlen=window)
+        self.stale_ms = stale_ms
+        self.total = 0
+        self.stale = 0
+        self.last_seq = None
+        self._lock = Lock()     # the vision workers record concurrently
+
+    def record(self, capture_ts, frame_seq=None, now=None):
+        """Record one emitted payload, return its latency in ms (None if untimed)"""
+        if capture_ts is None:
+            return None
+        if now is None:
+            now = time.time()
+        latency_ms = (now - capture_ts) * 1000.0
+        with self._lock:
+            self.samples.append(latency_ms)
+            self.total += 1
+            if latency_ms > self.stale_ms:
+                self.stale += 1
+            self.last_seq = frame_seq
+        return latency_ms
+
+    def summary(self):
+        """Return count, mean and percentile latencies over the rolling window"""
+        with self._lock:
+            ordered = sorted(self.samples)
+            total, stale, last_seq = self.total, self.stale, self.last_seq
+        if not ordered:
+            return {'count': 0, 'total': total, 'stale': stale, 'lastFrameSeq': last_seq}
+        n = len(ordered)
+        def pct(p):
+            return round(ordered[min(n - 1, int(p / 100.0 * n))], 2)
+        return {
+            'count': n,
+            'total': total,
+            'stale': stale,
+            'staleThresholdMs': self.stale_ms,
+            'meanMs': round(sum(ordered) / n, 2),
+            'p50Ms': pct(50),
+            'p95Ms': pct(95),
+            'p99Ms': pct(99),
+            'maxMs': round(ordered[-1], 2),
+            'lastFrameSeq': last_seq
+        }
+
+latency_trackers = {
+    'emotion_update': LatencyTracker(),
+    'camera_frame': LatencyTracker(),
+    'servo_position': LatencyTracker()
+}
+
 #-------------------------------------------------------------------------------------------
 def angle_to_pulse(angle, min_angle=0, max_angle=180, min_pulse=MIN_PULSE, max_pulse=MAX_PULSE):
     """Convert angle (0-180) to servo pulse width in microseconds"""
@@ -202,7 +625,7 @@ def set_servo_angle(pin, angle, min_angle=0, max_angle=180):
         # Convert angle to pulse width
         pulse = angle_to_pulse(angle)
         # Set servo pulse using pigpio
-        pi.set_servo_pulsewidth(pin, pulse)
+        hardware.pi.set_servo_pulsewidth(pin, pulse)
         
         return angle
     except Exception as e:
@@ -227,97 +650,34 @@ def get_servo_offset(target_pixel, center_pixel, fov_degrees, total_pixels):
 def scanning_thread_func():
     global current_pan, current_tilt, is_scanning, program_running
     
-    pan_step = 0.5   # Small steps for smoothness
-    tilt_step = 5.0  # Step size for tilt when pan completes
     pan_direction = 1 # 1 for right, -1 for left
     
-    print("Starting Background Scanning Thread...")
+    print(f"Starting Background Scanning Thread ({searcher.name} search)...")
     
     while program_running:
         if is_scanning:
-            # Update Pan
-            current_pan += (pan_step * pan_direction)
+            # Next target from the search strategy (raster: one small step of the sweep)
+            target_pan, target_tilt, hold = searcher.next(current_pan, current_tilt)
             
-            # Check Limits and Reverse
-            if current_pan >= pan_max_angle:
-                current_pan = pan_max_angle
-                pan_direction = -1
-                anim_controller.set_scan_anim("A2")
-                
-                # Move Tilt when pan hits edge
-                current_tilt += tilt_step
-                if current_tilt > tilt_max_angle:
-                    current_tilt = tilt_min_angle
-                    
-            elif current_pan <= pan_min_angle:
-                current_pan = pan_min_angle
-                pan_direction = 1
-                anim_controller.set_scan_anim("A3")
-                
-                # Move Tilt when pan hits edge
-                current_tilt += tilt_step
-                if current_tilt > tilt_max_angle:
-                    current_tilt = tilt_min_angle
+            # Scan animation follows the pan direction
+            if target_pan != current_pan:
+                direction = 1 if target_pan > current_pan else -1
+                if direction != pan_direction:
+                    pan_direction = direction
+                    hardware.anim.set_scan_anim("A3" if direction > 0 else "A2")
+            current_pan, current_tilt = target_pan, target_tilt
 
             # Apply to Servos
             set_servo_angle(pan_pin, current_pan, pan_min_angle, pan_max_angle)
             set_servo_angle(tilt_pin, current_tilt, tilt_min_angle, tilt_max_angle)
             print("Scanning - Pan: %.1f°, Tilt: %.1f°" % (current_pan, current_tilt))
-            # Short sleep for smooth movement (50Hz updates approx)
-            time.sleep(0.02) 
+            # Short sleep for smooth movement (50Hz updates approx, slower when idle or hot),
+            # or the view's hold, cut short when the strategy steers elsewhere
+            searcher.wait(max(scan_interval, hold))
         else:
             # If not scanning (face found), sleep longer to save CPU
             time.sleep(0.1)
 
-#-------------------------------------------------------------------------------------------
-class PiVideoStream:
-    def __init__(self, resolution=(CAMERA_WIDTH, CAMERA_HEIGHT), framerate=CAMERA_FRAMERATE, 
-                 rotation=0, hflip=False, vflip=False):
-        from picamera2 import Picamera2 #type: ignore
-        self.picam2 = Picamera2()
-        
-        config = self.picam2.create_video_configuration(
-            main={"format": "RGB888", "size": resolution}
-        )
-        self.picam2.configure(config)
-        self.picam2.start()
-        
-        self.rotation = rotation
-        self.hflip = hflip
-        self.vflip = vflip
-        
-        self.frame = None
-        self.stopped = False
-
-    def start(self):
-        t = Thread(target=self.update, args=())
-        t.daemon = True
-        t.start()
-        return self
-
-    def update(self):
-        while not self.stopped:
-            frame = self.picam2.capture_array()
-            
-            if self.rotation != 0:
-                frame = cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE if self.rotation == 90 else cv2.ROTATE_180)
-            
-            if self.hflip:
-                frame = cv2.flip(frame, 1)
-            if self.vflip:
-                frame = cv2.flip(frame, 0)
-            
-            self.frame = frame
-        
-        self.picam2.stop()
-
-    def read(self):
-        return self.frame
-
-    def stop(self):
-        self.stopped = True
-        time.sleep(0.1)
-
 #-----------------------------------------------------------------------------------------------
 def check_timer(start_time, duration):
     return time.time() - start_time <= duration
@@ -345,28 +705,27 @@ def pan_goto(pan_target, tilt_target):
     return pan_target, tilt_target
 
 #-----------------------------------------------------------------------------------------------
-def face_detect(image):
-    """Detect face using multiple cascade classifiers"""
-    ffaces = face_cascade.detectMultiScale(image, 1.1, 5)
-    if len(ffaces) > 0:
-        face = ffaces[0]
-        if verbose:
-            print("face_detect - Found Frontal Face using face_cascade")
+def face_detect(image, params=None):
+    """Detect one face (x, y, w, h) with the configured backend, () when there is none"""
+    models = vision if vision.loaded else vision.load()
+    if params is None:
+        faces = models.detector.detect(image)
     else:
-        pfaces = profileface.detectMultiScale(image, 1.1, 5)
-        if len(pfaces) > 0:
-            face = pfaces[0]
-            if verbose:
-                print("face_detect - Found Profile Face")
-        else:
-            ffaces = frontalface.detectMultiScale(image, 1.1, 5)
-            if len(ffaces) > 0:
-                face = ffaces[0]
-                if verbose:
-                    print("face_detect - Found Frontal Face using frontalface")
-            else:
-                face = ()
-    return face
+        # Tuned settings: optionally search a downscaled image, boxes come back in image coordinates
+        scale = params.detect_scale
+        small = image
+        if scale < 1.0:
+            small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        faces = models.detector.detect(small, params.scale_factor, params.min_neighbors,
+                                       max(1, int(params.min_size * scale)))
+        if scale < 1.0:
+            faces = [(int(x / scale), int(y / scale), int(w / scale), int(h / scale), score)
+                     for x, y, w, h, score in faces]
+    if not faces:
+        return ()
+    if verbose:
+        print(f"face_detect - Found {len(faces)} face(s) using {models.detector.name}, score {faces[0][4]:.2f}")
+    return faces[0][:4]
 
 #-----------------------------------------------------------------------------------------------
 def validate_face(face_data, image_width, image_height):
@@ -423,23 +782,34 @@ def pixel_to_servo_angle(pixel_pos, max_pixels, min_angle=0, max_angle=180):
 
 #-----------------------------------------------------------------------------------------------
 def detect_emotion(face_roi):
-    """Detect emotion from face ROI using TFLite model"""
+    """Detect emotion from face ROI using TFLite model (or the cached result for a near-identical crop)"""
     try:
+        models = vision if vision.loaded else vision.load()
+        if emotion_cache is not None:
+            key = dhash(face_roi)
+            cached = emotion_cache.lookup(key)
+            if cached is not None:
+                return cached
+
         # Resize to model input shape
-        face_resized = cv2.resize(face_roi, INPUT_SHAPE)
-        face_gray = cv2.cvtColor(face_resized, cv2.COLOR_RGB2GRAY) if len(face_resized.shape) == 3 else face_resized
+        face_resized = cv2.resize(face_roi, models.input_shape)
+        # Colour crops are BGR-ordered: Picamera2's RGB888, cv2.imdecode and VideoCapture frames alike
+        face_gray = cv2.cvtColor(face_resized, cv2.COLOR_BGR2GRAY) if len(face_resized.shape) == 3 else face_resized
         
         # Normalize and prepare for model
         face_expanded = np.expand_dims(face_gray / 255.0, axis=2).astype('float32')
         face_expanded = np.expand_dims(face_expanded, axis=0)
         
         # Run inference
-        interpreter.set_tensor(input_details[0]['index'], face_expanded)
-        interpreter.invoke()
-        output_data = interpreter.get_tensor(output_details[0]['index'])
+        with models.infer_lock:
+            models.interpreter.set_tensor(models.input_details[0]['index'], face_expanded)
+            models.interpreter.invoke()
+            output_data = models.interpreter.get_tensor(models.output_details[0]['index'])
         
         confidence = np.max(output_data[0]) * 100
         emotion_idx = np.argmax(output_data[0])
+        if emotion_cache is not None:
+            emotion_cache.store(key, emotion_idx, confidence)
         
         return emotion_idx, confidence
     except Exception as e:
@@ -450,23 +820,21 @@ def detect_emotion(face_roi):
 #-----------------------------------------------------------------------------------------------
 # WebSocket Helper Functions
 #-----------------------------------------------------------------------------------------------
-def broadcast_emotion_update(emotion_name, confidence, servo_angle):
-    """Broadcast emotion update to all connected WebSocket clients"""
+def broadcast_emotion_update(emotion_name, confidence, servo_angle, frame_seq=None, capture_ts=None,
+                             camera_id=None):
+    """Broadcast emotion update to all connected WebSocket clients (servo_angle None for fixed cameras)"""
     global latest_emotion_data
     
-    latest_emotion_data = {
-        'emotion': emotion_name,
-        'confidence': round(float(confidence), 2),
-        'servoAngle': int(servo_angle),
-        'timestamp': time.time(),
-        'panAngle': round(float(current_pan), 1),
-        'tiltAngle': round(float(current_tilt), 1)
-    }
+    now = time.time()
+    latency_ms = latency_trackers['emotion_update'].record(capture_ts, frame_seq, now)
+    latest_emotion_data = EmotionUpdate(camera_id, emotion_name, confidence, servo_angle, current_pan, current_tilt,
+                                        frame_seq, capture_ts, latency_ms, now)
+    latest_emotions[camera_id] = latest_emotion_data
     
     if websocket_clients > 0:
         socketio.emit('emotion_update', latest_emotion_data)
 
-def broadcast_frame(frame):
+def broadcast_frame(frame, frame_seq=None, capture_ts=None, camera_id=None):
     """Broadcast camera frame to all connected WebSocket clients"""
     global latest_frame
     
@@ -475,70 +843,229 @@ def broadcast_frame(frame):
             # Encode frame as JPEG
             _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
             frame_base64 = base64.b64encode(buffer).decode('utf-8')
-            latest_frame = frame_base64
-            socketio.emit('camera_frame', {'frame': frame_base64})
+            now = time.time()
+            latency_ms = latency_trackers['camera_frame'].record(capture_ts, frame_seq, now)
+            latest_frame = CameraFrame(camera_id, frame_base64, frame_seq, capture_ts, latency_ms, now)
+            latest_frames[camera_id] = latest_frame
+            socketio.emit('camera_frame', latest_frame)
         except Exception as e:
             if debug:
                 print(f"Frame broadcast error: {e}")
 
-def broadcast_servo_position():
-    """Broadcast current servo position"""
+def broadcast_servo_position(frame_seq=None, capture_ts=None):
+    """Broadcast current servo position and the frame that caused the move"""
     if websocket_clients > 0:
-        socketio.emit('servo_position', {
-            'pan': round(float(current_pan), 1),
-            'tilt': round(float(current_tilt), 1)
-        })
+        now = time.time()
+        latency_ms = latency_trackers['servo_position'].record(capture_ts, frame_seq, now)
+        socketio.emit('servo_position', ServoPosition(current_pan, current_tilt, frame_seq, capture_ts, latency_ms, now))
+
+def latency_summary():
+    """Rolling end-to-end latency summary per emitted event type"""
+    return {name: tracker.summary() for name, tracker in latency_trackers.items()}
 
 #-----------------------------------------------------------------------------------------------
 # WebSocket Event Handlers
 #-----------------------------------------------------------------------------------------------
-@socketio.on('connect')
-def handle_connect():
-    global websocket_clients
-    websocket_clients += 1
-    print(f'WebSocket client connected. Total clients: {websocket_clients}')
-    emit('connection_response', {
-        'status': 'connected',
-        'message': 'Connected to EMOWEB Emotion Tracker'
-    })
-    
-    # Send latest data to new client
-    if latest_emotion_data['emotion']:
-        emit('emotion_update', latest_emotion_data)
-    if latest_frame:
-        emit('camera_frame', {'frame': latest_frame})
-
-@socketio.on('disconnect')
-def handle_disconnect():
-    global websocket_clients
-    websocket_clients = max(0, websocket_clients - 1)
-    print(f'WebSocket client disconnected. Total clients: {websocket_clients}')
-
-@socketio.on('get_status')
-def handle_get_status():
-    emit('status', {
+def get_socketio():
+    """Create the SocketIO server and register its handlers on first use"""
+    global socketio
+    if socketio is None:
+        with timed_phase('socketio'):
+            from flask_socketio import SocketIO #type: ignore
+            # Payload arguments are sent as their cached JSON text, see payloads.py
+            sio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', json=SocketIOJSON)
+            register_socketio_handlers(sio)
+            socketio = sio
+    return socketio
+
+def register_socketio_handlers(sio):
+    from flask_socketio import emit #type: ignore
+
+    @sio.on('connect')
+    def handle_connect():
+        global websocket_clients
+        websocket_clients += 1
+        print(f'WebSocket client connected. Total clients: {websocket_clients}')
+        emit('connection_response', {
+            'status': 'connected',
+            'message': 'Connected to EMOWEB Emotion Tracker'
+        })
+        
+        # Send latest data to new client, one update per camera
+        for payload in list(latest_emotions.values()):
+            emit('emotion_update', payload)
+        for payload in list(latest_frames.values()):
+            emit('camera_frame', payload)
+
+    @sio.on('disconnect')
+    def handle_disconnect():
+        global websocket_clients
+        websocket_clients = max(0, websocket_clients - 1)
+        print(f'WebSocket client disconnected. Total clients: {websocket_clients}')
+
+    @sio.on('get_status')
+    def handle_get_status():
+        emit('status', cached_status('socket', None, socket_status))
+
+    @sio.on('request_frame')
+    def handle_request_frame(data=None):
+        # Optional {'cameraId': ...}; without it the most recent frame from any camera
+        camera_id = data.get('cameraId') if isinstance(data, dict) else None
+        payload = latest_frames.get(camera_id) if camera_id is not None else latest_frame
+        if payload:
+            emit('camera_frame', payload)
+
+#-----------------------------------------------------------------------------------------------
+# REST Endpoints
+#-----------------------------------------------------------------------------------------------
+def status_version(camera_id=None):
+    """What a cached status depends on besides time: the camera's latest snapshot and the client count"""
+    return (engine.snapshot(camera_id) if engine is not None else None, websocket_clients)
+
+def cached_status(kind, camera_id, build):
+    """Status payload of one kind, rebuilt when the snapshot changes or after status_max_age (None for an unknown camera)"""
+    if engine is not None and camera_id is not None and engine.context(camera_id) is None:
+        # Checked before caching, so unknown ids cannot grow the cache
+        return None
+    return status_payloads.get((kind, camera_id), status_version(camera_id), lambda: build(camera_id))
+
+def socket_status(camera_id=None):
+    status = tracking_status(camera_id)
+    status['latency'] = latency_summary()
+    return status
+
+def tracking_status(camera_id=None):
+    """Tracking state from a camera's engine snapshot, or from the globals before the engine exists"""
+    if engine is not None:
+        return engine.snapshot(camera_id).to_dict()
+    return {
         'emotion': latest_emotion_data.get('emotion'),
         'confidence': latest_emotion_data.get('confidence'),
         'servoAngle': latest_emotion_data.get('servoAngle'),
         'pan': round(float(current_pan), 1),
         'tilt': round(float(current_tilt), 1),
         'scanning': is_scanning
-    })
+    }
 
-@socketio.on('request_frame')
-def handle_request_frame():
-    if latest_frame:
-        emit('camera_frame', {'frame': latest_frame})
+@app.route('/api/status', methods=['GET'])
+def api_status():
+    """Device status (?camera=<id> for a camera other than the primary) with the latency summary"""
+    camera_id = request.args.get('camera')
+    payload = cached_status('rest', camera_id, device_status)
+    if payload is None:
+        return jsonify({'error': f"Unknown camera {camera_id}"}), 404
+    return payload_response(payload)
+
+def device_status(camera_id=None):
+    status = tracking_status(camera_id)
+    status.update({
+        'connected': True,
+        'clients': websocket_clients,
+        'timestamp': time.time(),
+        'latency': latency_summary(),
+        'startup': startup_phases,
+        'ready': is_ready(),
+        'readiness': readiness,
+        'warmup': vision.warmup_stats,
+        'history': emotion_history.stats(),
+        'eventStore': event_store.stats() if event_store is not None else None,
+        'emotionCache': emotion_cache.stats() if emotion_cache is not None else None,
+        'power': power_governor.stats() if power_governor is not None else None,
+        'search': searcher.stats(),
+        'cameras': engine.camera_stats() if engine is not None else [],
+        'payloadCache': status_payloads.stats()
+    })
+    return status
+
+@app.route('/api/cameras', methods=['GET'])
+def api_cameras():
+    """Per-camera scheduling stats and latest tracking state"""
+    if engine is None:
+        return jsonify({'cameras': [], 'workers': ENGINE_WORKERS})
+    cameras = []
+    for stats in engine.camera_stats():
+        stats['state'] = engine.snapshot(stats['cameraId']).to_dict()
+        cameras.append(stats)
+    return jsonify({'cameras': cameras, 'workers': engine.workers})
+
+@app.route('/api/blackbox', methods=['GET'])
+def api_blackbox():
+    """Black box recorders per camera"""
+    cameras = engine.camera_stats() if engine is not None else []
+    return jsonify({'enabled': BLACKBOX, 'recorders': {c['cameraId']: c['blackbox'] for c in cameras}})
+
+@app.route('/api/blackbox/freeze', methods=['POST'])
+def api_blackbox_freeze():
+    """Freeze the last BLACKBOX_SECONDS of a camera (?camera=<id>, primary by default) into a clip"""
+    camera_id = request.args.get('camera')
+    if engine is None or engine.context(camera_id) is None:
+        return jsonify({'error': f"Unknown camera {camera_id}"}), 404
+    info = engine.freeze_blackbox(camera_id, request.args.get('reason', 'api'))
+    if info is None:
+        return jsonify({'error': 'Black box recording is off (BLACKBOX = False) or has no frames yet'}), 409
+    return jsonify(info)
+
+def query_history(args):
+    """
+    Serve an emotion history request, returns (payload, http status).
+    Raw requests reaching back past the in-memory ring (or before this run) are
+    answered from SQLite when it is enabled.
+    """
+    try:
+        since, resolution, limit = parse_history_args(args)
+        labels = list(emotion_mapper.values())
+        # The 'camera' column of raw records indexes this list
+        cameras = engine.camera_ids() if engine is not None else None
+        if resolution == 'raw' and event_store is not None:
+            oldest = emotion_history.oldest_timestamp()
+            if oldest is None or since < oldest:
+                result = {'resolution': 'raw', 'since': since, 'labels': labels, 'cameras': cameras,
+                          'source': 'sqlite', 'records': event_store.query(since, limit=limit)}
+                return result, 200
+        result = emotion_history.query(since, resolution, limit, labels=labels)
+        result['cameras'] = cameras
+        result['source'] = 'memory'
+        return result, 200
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+@app.route('/api/emotion_history', methods=['GET'])
+def api_emotion_history():
+    """Slice of emotion history: ?since=<epoch or -seconds>&resolution=raw|second|minute&limit=N"""
+    payload, status = query_history(request.args)
+    return jsonify(payload), status
+
+@app.route('/api/health', methods=['GET'])
+def api_health():
+    """Readiness probe - 503 until models are warm, the server is up and frames flow"""
+    ready = is_ready()
+    return jsonify({
+        'status': 'ready' if ready else 'starting',
+        'readiness': readiness,
+        'timestamp': time.time()
+    }), 200 if ready else 503
 
 #-----------------------------------------------------------------------------------------------
+def wait_for_port(port, timeout, host='127.0.0.1'):
+    """Poll until something accepts TCP connections on port, return False on timeout"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
 def run_websocket_server():
     """Run Flask-SocketIO server in a separate thread"""
     print("Starting WebSocket server on port 5000...")
-    socketio.run(app, host='0.0.0.0', port=5000, debug=False, use_reloader=False, allow_unsafe_werkzeug=True)
+    get_socketio().run(app, host='0.0.0.0', port=5000, debug=False, use_reloader=False, allow_unsafe_werkzeug=True)
 
 #-----------------------------------------------------------------------------------------------
 def update_leds(emotion_idx):
     """Update LEDs based on emotion"""
+    GPIO = hardware.gpio
     GPIO.output(RED_LED, GPIO.LOW)
     GPIO.output(GREEN_LED, GPIO.LOW)
     
@@ -548,256 +1075,943 @@ def update_leds(emotion_idx):
         GPIO.output(RED_LED, GPIO.HIGH)
 
 #-----------------------------------------------------------------------------------------------
-def emotion_track():
-    global is_scanning, current_pan, current_tilt
-    
-    # Start WebSocket server in background thread
-    websocket_thread = Thread(target=run_websocket_server, daemon=True)
-    websocket_thread.start()
-    print("WebSocket server started on http://0.0.0.0:5000")
-    time.sleep(2)  # Give server time to start
-    
-    print("Initializing Pi Camera ....")
-    if window_on:
-        print("press q to quit opencv window display")
+# Flask server integration (emotion_flask_server.py)
+#-----------------------------------------------------------------------------------------------
+class VideoCaptureAdapter:
+    """cv2.VideoCapture-style read()/isOpened()/release() over the shared engine's snapshots"""
+    def __init__(self, source_engine):
+        self.engine = source_engine
+
+    def read(self):
+        frame = self.engine.snapshot().image()  # primary camera
+        return frame is not None, frame
+
+    def isOpened(self):
+        return self.engine.running
+
+    def release(self):
+        self.engine.stop()
+
+def initialize_camera(actuators=True):
+    """Start the shared engine (camera + vision loop) and return a cv2.VideoCapture-like view of it"""
+    return VideoCaptureAdapter(get_engine(show_window=False, actuators=actuators).start())
+
+def initialize_hardware():
+    """Bring up servos, LEDs, Arduino, OLED and load and warm up the vision models"""
+    hardware.initialize()
+    vision.warm_up()
+    readiness['models'] = True
+    return hardware
+
+def detect_emotion_from_frame(frame):
+    """Run face detection and emotion recognition on one frame, return a result dict"""
+    if frame.ndim == 3:
+        frame_gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
     else:
-        print("press ctrl-c to quit SSH or terminal session")
+        frame_gray = frame
+    height, width = frame_gray.shape[:2]
+    face_data = face_detect(frame_gray)
+    if not validate_face(face_data, width, height):
+        return {'emotion': None, 'confidence': 0, 'servoAngle': int(current_pan), 'faceDetected': False}
+
+    (fx, fy, fw, fh) = (int(v) for v in face_data)
+    emotion_idx, confidence = detect_emotion(frame[fy:fy + fh, fx:fx + fw])
+    return {
+        'emotion': emotion_mapper[int(emotion_idx)],
+        'confidence': round(float(confidence), 2),
+        'servoAngle': int(current_pan),
+        'faceDetected': True,
+        'face': [fx, fy, fw, fh]
+    }
 
+#-----------------------------------------------------------------------------------------------
+# Batch analysis of still images (/api/detect_emotion_batch)
+#-----------------------------------------------------------------------------------------------
+batch_max_size = 32             # face crops per batched interpreter call
+batch_group_images = 16         # images decoded and classified together before results are emitted
+batch_detect_max_side = 1280    # photos are downscaled to this for face detection only
+
+def detect_faces(frame_gray, max_side=batch_detect_max_side):
+    """Every face in a still image as (x, y, w, h) in the image's own coordinates"""
+    models = vision if vision.loaded else vision.load()
+    height, width = frame_gray.shape[:2]
+    scale = min(1.0, max_side / float(max(height, width)))
+    small = cv2.resize(frame_gray, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA) \
+        if scale < 1.0 else frame_gray
+    faces = [face[:4] for face in models.detector.detect(small)
+             if face[2] >= min_face_size[0] and face[3] >= min_face_size[1]]
+    return [tuple(int(round(v / scale)) for v in face) for face in faces]
+
+def preprocess_faces(face_rois, input_shape):
+    """Resize crops to the model input and normalize them as one float32 stack (N, h, w, 1)"""
+    width, height = input_shape
+    stack = np.empty((len(face_rois), height, width), dtype=np.uint8)
+    for i, roi in enumerate(face_rois):
+        if roi.ndim == 3:
+            roi = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+        stack[i] = cv2.resize(roi, input_shape)
+    return (stack.astype(np.float32) * np.float32(1.0 / 255.0))[..., np.newaxis]
+
+def detect_emotions_batch(face_rois, batch_size=batch_max_size):
+    """[(emotion_idx, confidence)] for a list of face crops, batch_size crops per interpreter call"""
+    models = vision if vision.loaded else vision.load()
+    results = []
+    for start in range(0, len(face_rois), batch_size):
+        probs = models.classify(preprocess_faces(face_rois[start:start + batch_size], models.input_shape))
+        results.extend(zip(probs.argmax(axis=1).tolist(), (probs.max(axis=1) * 100).tolist()))
+    return results
+
+def analyze_images(images, group_size=batch_group_images, batch_size=batch_max_size):
+    """
+    Detect and classify every face in an iterable of (name, encoded image bytes).
+    Yields one result dict per image, group_size images at a time, so callers can stream
+    results while later images are still being read.
+    """
+    def run_group(group):
+        crops, owners = [], []
+        results = []
+        for name, data in group:
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                results.append({'name': name, 'error': 'Cannot decode image', 'faces': []})
+                continue
+            height, width = image.shape[:2]
+            result = {'name': name, 'width': width, 'height': height, 'faces': []}
+            for (fx, fy, fw, fh) in detect_faces(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)):
+                crops.append(image[fy:fy + fh, fx:fx + fw])
+                owners.append((result, [fx, fy, fw, fh]))
+            results.append(result)
+        for (result, box), (emotion_idx, confidence) in zip(owners, detect_emotions_batch(crops, batch_size)):
+            result['faces'].append({
+                'face': box,
+                'emotion': emotion_mapper[int(emotion_idx)],
+                'confidence': round(float(confidence), 2)
+            })
+        return results
+
+    group = []
+    for item in images:
+        group.append(item)
+        if len(group) >= group_size:
+            yield from run_group(group)
+            group = []
+    if group:
+        yield from run_group(group)
+
+#-----------------------------------------------------------------------------------------------
+# Shared Emotion Engine
+#-----------------------------------------------------------------------------------------------
+def draw_overlay(snap, frame):
+    """Draw the preview annotation of a snapshot onto frame (a private colour image) and return it"""
+    frame_height = frame.shape[0]
+    emotion_text, face_detected_time, stabilizing, stable_idx, repeats = snap.overlay or ("", None, False, 6, 0)
+    if snap.face is not None:
+        fx, fy, fw, fh = snap.face
+        cv2.rectangle(frame, (fx, fy), (fx+fw, fy+fh), blue, 2)
+        cv2.putText(frame, emotion_text, (fx, fy - 10), font, 0.7, white, 2, cv2.LINE_AA)
+        if stabilizing and face_detected_time is not None:
+            remaining = stabilization_delay - (snap.timestamp - face_detected_time)
+            cv2.putText(frame, f"STABILIZING... {remaining:.2f}s", (fx, fy + fh + 25),
+                        font, 0.6, yellow, 2, cv2.LINE_AA)
+        elif snap.locked:
+            cv2.putText(frame, "LOCKED", (fx, fy + fh + 25), font, 0.7, green, 2, cv2.LINE_AA)
+            cv2.putText(frame, f"Stable: {emotion_mapper[stable_idx]} x{repeats}",
+                        (10, frame_height - 10), font, 0.6, yellow, 2)
+    else:
+        cv2.putText(frame, "SEARCHING...", (10, 30), font, 0.8, red, 2)
+    cv2.putText(frame, f"FPS: {snap.fps:.2f}", (10, 60), font, 0.7, yellow, 2)
+
+    # Servo status for cameras on the pan/tilt head
+    if snap.pan is not None:
+        servo_status = "SERVOS LOCKED" if snap.locked else ("SCANNING" if snap.scanning else "TRACKING")
+        cv2.putText(frame, servo_status, (10, frame_height - 40),
+                    font, 0.6, green if snap.locked else yellow, 2, cv2.LINE_AA)
+        cv2.putText(frame, f"Pan: {snap.pan:.0f}° Tilt: {snap.tilt:.0f}°", (10, frame_height - 20),
+                    font, 0.6, yellow, 2, cv2.LINE_AA)
+    return frame
+
+class EngineSnapshot:
+    """
+    Latest frame and tracking results for one camera, published whole after every processed frame.
+    frame is the camera's buffer in its capture format, shared by every reader and read-only;
+    image() gives the colour image, converted at most once per snapshot, and annotated() a
+    copy with the preview overlay, drawn only for readers that ask for it.
+    """
+    __slots__ = ('camera_id', 'frame', 'to_color', '_image', '_annotated', 'frame_seq', 'capture_ts', 'face',
+                 'emotion_result', 'pan', 'tilt', 'scanning', 'locked', 'fps', 'timestamp', 'overlay')
+
+    def __init__(self, camera_id=None, frame=None, frame_seq=0, capture_ts=None, face=None, emotion_result=None,
+                 pan=None, tilt=None, scanning=True, locked=False, fps=0.0, to_color=None, overlay=None):
+        self.camera_id = camera_id
+        self.frame = frame
+        self.to_color = to_color
+        self._image = None
+        self.frame_seq = frame_seq
+        self.capture_ts = capture_ts
+        self.face = face                        # (x, y, w, h) of the tracked face or None
+        self.emotion_result = emotion_result    # (emotion_idx, confidence, frame_seq, capture_ts) or None
+        self.pan = pan                          # None for cameras without a pan/tilt head
+        self.tilt = tilt
+        self.scanning = scanning
+        self.locked = locked
+        self.fps = fps
+        self.timestamp = time.time()
+        # Overlay text state at this frame: (emotion_text, face_detected_time, stabilizing, stable_idx, repeats)
+        self.overlay = overlay
+        self._annotated = None
+
+    def image(self):
+        """Colour (BGR) image of the frame, None before the first frame"""
+        if self._image is None and self.frame is not None:
+            self._image = self.to_color(self.frame) if self.to_color is not None else self.frame
+        return self._image
+
+    def annotated(self):
+        """Colour image with boxes, emotion and status drawn on a copy, None before the first frame"""
+        if self._annotated is None and self.frame is not None:
+            image = self._image
+            if image is None and self.to_color is not None:
+                image = self.to_color(self.frame)   # not cached in _image: the overlay draws on it
+            if image is None:
+                image = self.frame
+            if image is self._image or not image.flags.writeable:
+                # Shared with image() readers or the camera buffer itself
+                image = image.copy()
+            self._annotated = draw_overlay(self, image)
+        return self._annotated
+
+    def to_dict(self):
+        """JSON-ready view without the frame itself"""
+        if self.emotion_result is not None:
+            emotion_idx, confidence, emotion_seq, emotion_ts = self.emotion_result
+            emotion = emotion_mapper[emotion_idx]
+        else:
+            emotion, confidence, emotion_seq, emotion_ts = None, 0, None, None
+        return {
+            'cameraId': self.camera_id,
+            'emotion': emotion,
+            'confidence': round(float(confidence), 2),
+            'emotionFrameSeq': emotion_seq,
+            'emotionCaptureTs': emotion_ts,
+            'faceDetected': self.face is not None,
+            'face': list(self.face) if self.face is not None else None,
+            'servoAngle': int(self.pan) if self.pan is not None else None,
+            'pan': round(float(self.pan), 1) if self.pan is not None else None,
+            'tilt': round(float(self.tilt), 1) if self.tilt is not None else None,
+            'scanning': self.scanning,
+            'locked': self.locked,
+            'fps': round(float(self.fps), 2),
+            'frameSeq': self.frame_seq,
+            'captureTs': self.capture_ts,
+            'timestamp': self.timestamp
+        }
+
+class CameraContext:
+    """
+    Tracking state for one frame source (what emotion_track() used to keep in locals and globals).
+    Only the context with servo=True drives the pan/tilt head, LEDs, Arduino and music,
+    and its scanning flag is the shared is_scanning global the scanning thread reads.
+    """
+    def __init__(self, camera_id, source, index=0, servo=False, fps_target=None):
+        self.camera_id = camera_id
+        self.index = index              # small integer id stored with history records
+        self.source = source
+        self.servo = servo
+        self.min_interval = 1.0 / fps_target if fps_target else 0.0
+        self.fps_target = fps_target
+
+        # Scheduling
+        self.last_seq = 0
+        self.next_due = 0.0
+        self.busy = False
+        self.processed = 0
+        self.skipped = 0                # frames captured but never processed (camera faster than target)
+
+        # Tracking
+        self.fps_counter = 0
+        self.face_start = time.time()
+        self.face_history = []
+        self.last_valid_cx = None
+        self.last_valid_cy = None
+        self.prev_emotion_idx = 6  # neutral
+        self.emotion_repeats = 0
+        self.current_emotion_text = "Analyzing..."
+        self.face_detected_time = None
+        self.is_stabilizing = False
+        self.face_locked = False
+        self._scanning = True
+        # Last confident emotion: (emotion_idx, confidence, frame_seq, capture_ts)
+        self.emotion_result = None
+        self.face_id = 0  # increments every time a new face is acquired
+        self.loop_fps = 0.0
+        self.motion_thumb = None        # detection image thumbnail at the last face search
+        self.gated = 0                  # face searches skipped because the scene was still
+
+        # Detection settings, moved by the auto-tuner when AUTO_TUNE is on
+        self.detect_params = DetectionParams(min_size=min_face_size[0])
+        self.tuner = None
+        if AUTO_TUNE:
+            self.tuner = AutoTuner(fps_target or AUTO_TUNE_TARGET_FPS, bounds=AUTO_TUNE_BOUNDS,
+                                   start_params=self.detect_params, name=camera_id)
+            self.detect_params = self.tuner.params
+        self.detect_skipped = 0         # frames the tuned detection interval left unsearched
+
+        # Power governor state
+        self.last_face_time = time.time()   # startup counts as activity, so idle-scan starts after POWER_IDLE_AFTER
+        self.power = None                   # settings of the current power profile
+        self.power_detect_every = 1
+        self.base_min_interval = self.min_interval
+
+        # Black box recorder, created on the first frame once its shape is known
+        self.blackbox = None
+        self.last_freeze = 0.0
+
+        self.snapshot = EngineSnapshot(camera_id=camera_id)
+
+    @property
+    def scanning(self):
+        return is_scanning if self.servo else self._scanning
+
+    @scanning.setter
+    def scanning(self, value):
+        global is_scanning
+        if self.servo:
+            if value and not is_scanning:
+                searcher.start(current_pan, current_tilt, 'lost')
+            elif not value and is_scanning:
+                seconds = searcher.acquired()
+                if debug and seconds is not None:
+                    print(f"Face acquired [{self.camera_id}] after {seconds:.2f}s ({searcher.name} search)")
+            is_scanning = value
+        else:
+            self._scanning = value
+
+    def motion_gated(self, frame_gray):
+        """True when no face is tracked and the scene has not changed since the last face search"""
+        if not MOTION_GATE_THRESHOLD or self.face_detected_time is not None:
+            self.motion_thumb = None
+            return False
+        thumb = cv2.resize(frame_gray, motion_thumb_size, interpolation=cv2.INTER_AREA)
+        if self.motion_thumb is not None and cv2.absdiff(thumb, self.motion_thumb).mean() < MOTION_GATE_THRESHOLD:
+            self.gated += 1
+            return True
+        self.motion_thumb = thumb
+        return False
+
+    def stats(self):
+        return {
+            'cameraId': self.camera_id,
+            'type': self.source.kind,
+            'servo': self.servo,
+            'fpsTarget': self.fps_target,
+            'fps': round(self.loop_fps, 2),
+            'processed': self.processed,
+            'skipped': self.skipped,
+            'gated': self.gated,
+            'detectSkipped': self.detect_skipped,
+            'detection': self.detect_params.to_dict(),
+            'autoTune': self.tuner.stats() if self.tuner is not None else None,
+            'power': self.power,
+            'blackbox': self.blackbox.stats() if self.blackbox is not None else None,
+            'lores': list(self.source.lores) if self.source.lores else None,
+            'lastFrameSeq': self.last_seq,
+            'finished': self.source.finished
+        }
+
+class PreviewWindow:
+    """
+    window_on preview in its own thread: shows the primary camera's newest snapshot with its
+    overlay at most max_fps times a second, and turns 'q' into an engine stop. Resizing,
+    imshow and waitKey (display and X forwarding latency) never run on the vision thread.
+    """
+    title = 'Emotion Track - q quits'
+
+    def __init__(self, source_engine, max_fps=None):
+        self.engine = source_engine
+        max_fps = PREVIEW_MAX_FPS if max_fps is None else max_fps
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.shown = 0
+        self.skipped = 0            # frames (by sequence number) published but never shown
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        self._thread = Thread(target=self._run, name='preview', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        if self._thread is not None and self._thread is not current_thread():
+            self._thread.join(timeout=1)
+
+    def _run(self):
+        last_seq = 0
+        next_show = 0.0
+        try:
+            while not self._stopped and self.engine.running:
+                snap = self.engine.wait_for_snapshot(last_seq, timeout=0.1)
+                if snap.frame is None or snap.frame_seq == last_seq:
+                    # Keep the window responsive while no new frames arrive
+                    if self.shown and self._quit_pressed():
+                        break
+                    continue
+                wait = next_show - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                    snap = self.engine.snapshot()
+                if last_seq:
+                    self.skipped += max(0, snap.frame_seq - last_seq - 1)
+                last_seq = snap.frame_seq
+                next_show = time.monotonic() + self.min_interval
+                frame = snap.annotated()
+                if WINDOW_BIGGER > 1:
+                    frame = cv2.resize(frame, (int(frame.shape[1] * WINDOW_BIGGER), int(frame.shape[0] * WINDOW_BIGGER)))
+                cv2.imshow(self.title, frame)
+                self.shown += 1
+                if self._quit_pressed():
+                    break
+        finally:
+            cv2.destroyAllWindows()
+
+    def _quit_pressed(self):
+        if cv2.waitKey(1) & 0xFF != ord('q'):
+            return False
+        print("emotion_track - End Emotion Tracking")
+        # Let the scheduler loop end the run the way it always has
+        self.engine.running = False
+        self.engine._frame_event.set()
+        return True
+
+class EmotionEngine:
+    """
+    Owns the cameras and the vision loop and publishes an EngineSnapshot per camera after every frame.
+    SocketIO handlers and REST endpoints read snapshot() instead of touching a camera,
+    so there is one owner per camera and one inference stream however many readers there are.
+
+    With several cameras, the run() thread schedules the newest unprocessed frame of each
+    camera round-robin (respecting per-camera FPS targets, one frame in flight per camera)
+    onto a shared pool of `workers` threads; cv2 and the interpreter release the GIL.
+    """
+    def __init__(self, show_window=None, actuators=True, cameras=None, workers=None):
+        self.show_window = window_on if show_window is None else show_window
+        self.actuators = actuators     # drive servos, LEDs, Arduino and music
+        self.camera_specs = cameras if cameras is not None else CAMERAS
+        self.workers = max(1, workers if workers is not None else ENGINE_WORKERS)
+        self.cameras = []
+        self.primary = None
+        self.vs = None                 # primary camera source
+        self.running = False
+        self.thread = None
+        self._cond = Condition()
+        self._frame_event = Event()
+        self._rr = 0
+        self._inflight = 0
+        self._inflight_lock = Lock()
+
+    def snapshot(self, camera_id=None):
+        """Latest published snapshot for a camera, the primary one by default (never blocks)"""
+        ctx = self.context(camera_id)
+        return ctx.snapshot if ctx is not None else EngineSnapshot(camera_id=camera_id)
+
+    def context(self, camera_id=None):
+        if camera_id is None:
+            return self.primary
+        for ctx in self.cameras:
+            if ctx.camera_id == camera_id:
+                return ctx
+        return None
+
+    def camera_ids(self):
+        return [ctx.camera_id for ctx in self.cameras]
+
+    def camera_stats(self):
+        return [ctx.stats() for ctx in self.cameras]
+
+    def wait_for_snapshot(self, after_seq, timeout=None, camera_id=None):
+        """Block until a snapshot newer than frame after_seq is published, return it (or the latest on timeout)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.snapshot(camera_id).frame_seq > after_seq, timeout)
+            return self.snapshot(camera_id)
+
+    def _publish(self, ctx, snap):
+        with self._cond:
+            ctx.snapshot = snap
+            self._cond.notify_all()
+
+    def _open_cameras(self):
+        specs = self.camera_specs or [{'id': 'cam0', 'type': 'picamera2', 'servo': True}]
+        servo_assigned = any(spec.get('servo') for spec in specs)
+        for index, spec in enumerate(specs):
+            spec = dict(spec)
+            camera_id = str(spec.get('id', f'cam{index}'))
+            servo = bool(spec.get('servo')) if servo_assigned else index == 0
+            if spec.get('type', 'picamera2') == 'picamera2':
+                spec.setdefault('format', CAMERA_FORMAT)
+                spec.setdefault('lores', CAMERA_LORES)
+                spec.setdefault('rotation', CAMERA_ROTATION)
+                spec.setdefault('hflip', CAMERA_HFLIP)
+                spec.setdefault('vflip', CAMERA_VFLIP)
+            with timed_phase(f'camera:{camera_id}'):
+                source = create_source(spec, (CAMERA_WIDTH, CAMERA_HEIGHT), CAMERA_FRAMERATE)
+                source.frame_event = self._frame_event
+                source.start()
+            ctx = CameraContext(camera_id, source, index, servo and self.actuators, spec.get('fps'))
+            self.cameras.append(ctx)
+        self.primary = next((ctx for ctx in self.cameras if ctx.servo), self.cameras[0])
+        self.vs = self.primary.source
+
+    def prepare(self):
+        """Warm up the models while the cameras start, then wait for the first frames"""
+        start_event_store()
+        model_errors = []
+        def load_models():
+            try:
+                vision.warm_up()
+                readiness['models'] = True
+            except Exception as e:
+                model_errors.append(e)
+        model_thread = Thread(target=load_models, name='model-warmup', daemon=True)
+        model_thread.start()
+
+        print("Initializing Pi Camera ....")
+        if self.actuators:
+            hardware.anim.connect()
+            hardware.show_expression('scanning')
+
+        self._open_cameras()
+        print("Reading Stream from Picamera2... Wait ...")
+        with timed_phase('first_frame'):
+            for ctx in self.cameras:
+                if not ctx.source.wait_for_frame(first_frame_timeout):
+                    self._stop_sources()
+                    raise HardwareError(f"No frame from camera {ctx.camera_id} within {first_frame_timeout}s")
+        readiness['camera'] = True
+
+        model_thread.join()
+        if model_errors:
+            self._stop_sources()
+            raise model_errors[0]
+        if verbose:
+            print(f"Model warm-up: {vision.warmup_stats}")
+        return self
+
+    def start(self):
+        """Prepare and run the vision loop in a background thread (for servers that only read)"""
+        if self.thread is None:
+            self.prepare()
+            self.thread = Thread(target=self.run, name='vision-loop', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self._frame_event.set()
+        if self.thread is not None and self.thread is not current_thread():
+            self.thread.join(timeout=2)
+
+    def _stop_sources(self):
+        for ctx in self.cameras:
+            ctx.source.stop()
+
+    def _next_job(self):
+        """Round-robin pick of a camera with a new frame that is due and not already in flight"""
+        now = time.time()
+        n = len(self.cameras)
+        for k in range(n):
+            ctx = self.cameras[(self._rr + k) % n]
+            if ctx.busy or now < ctx.next_due:
+                continue
+            frame, frame_seq, capture_ts = ctx.source.read_stamped()
+            if frame is None or frame_seq == ctx.last_seq:
+                continue
+            ctx.skipped += max(0, frame_seq - ctx.last_seq - 1)
+            ctx.last_seq = frame_seq
+            ctx.next_due = now + ctx.min_interval
+            self._rr = (self._rr + k + 1) % n
+            return ctx, frame, frame_seq, capture_ts
+        return None
+
+    def _job_done(self, ctx):
+        ctx.busy = False
+        with self._inflight_lock:
+            self._inflight -= 1
+        self._frame_event.set()
+
+    def _run_job(self, ctx, frame, frame_seq, capture_ts):
+        try:
+            self.process_frame(ctx, frame, frame_seq, capture_ts)
+        except Exception as e:
+            print(f"ERROR: camera {ctx.camera_id} frame {frame_seq}: {e}")
+        finally:
+            self._job_done(ctx)
+
+    def run(self):
+        """Scheduler loop: hand new frames to the worker pool (or process inline) until stopped"""
+        if self.primary.servo:
+            print("Position pan/tilt to center (90°, 20°)")
+            pan_goto(90, 20)
+        
+            # START THE SCANNING THREAD
+            searcher.start(current_pan, current_tilt, 'startup')
+            scan_thread = Thread(target=scanning_thread_func, name='scanner')
+            scan_thread.daemon = True
+            scan_thread.start()
     
-    anim_controller.connect()
-
-    vs = PiVideoStream(
-        resolution=(CAMERA_WIDTH, CAMERA_HEIGHT),
-        framerate=CAMERA_FRAMERATE,
-        rotation=CAMERA_ROTATION,
-        hflip=CAMERA_HFLIP,
-        vflip=CAMERA_VFLIP
-    ).start()
-    print("Reading Stream from Picamera2... Wait ...")
-    time.sleep(2)
-
-    # Position start
-    # current_pan = 90.0
-    # current_tilt = 90.0
-    # pan_goto(90, 90)
-    
-    fps_counter = 0
-    fps_start = time.time()
-    face_start = time.time()
-    
-    face_history = []
-    last_valid_cx = cam_cx
-    last_valid_cy = cam_cy
-    
-    # Emotion state tracking
-    prev_emotion_idx = 6  # neutral
-    emotion_repeats = 0
-    current_emotion_text = "Analyzing..."
-    
-    # Stabilization tracking
-    face_detected_time = None
-    is_stabilizing = False
-    face_locked = False
-
-    img_frame = vs.read()
-    print("Position pan/tilt to center (90°, 20°)")
-    pan_goto(90, 20)
-    
-    # START THE SCANNING THREAD
-    scan_thread = Thread(target=scanning_thread_func)
-    scan_thread.daemon = True
-    scan_thread.start()
-    
-    print("===================================")
-    print("Start Emotion Tracking ....")
-    print("")
-    
-    still_scanning = True
-    t1 = time.time()
+        print_startup_summary()
+        print("===================================")
+        print(f"Start Emotion Tracking .... cameras: {', '.join(self.camera_ids())}, workers: {self.workers}")
+        print("")
     
-    while still_scanning:
-        face_found = False
-        Nav_LR = 0
-        Nav_UD = 0
-        
+        # The face search window starts with the loop, not when the cameras were opened
+        for ctx in self.cameras:
+            ctx.face_start = time.time()
+        self.running = True
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='vision') if self.workers > 1 else None
+        preview = PreviewWindow(self).start() if self.show_window else None
+        try:
+            while self.running and program_running:
+                self._frame_event.clear()
+                job = None
+                if pool is None or self._inflight < self.workers:
+                    job = self._next_job()
+                if job is None:
+                    if all(ctx.source.finished for ctx in self.cameras) and self._inflight == 0:
+                        break
+                    self._frame_event.wait(0.05)
+                elif pool is None:
+                    self.process_frame(*job)
+                else:
+                    ctx = job[0]
+                    ctx.busy = True
+                    with self._inflight_lock:
+                        self._inflight += 1
+                    pool.submit(self._run_job, *job)
+        finally:
+            if preview is not None:
+                preview.stop()
+            if pool is not None:
+                pool.shutdown(wait=True)
+            self._stop_sources()
+            self.running = False
+
+    def _apply_power(self, ctx, settings):
+        """Apply a power profile: camera rate (falling back to processing rate), search interval, sweep rate"""
+        global scan_interval
+        ctx.power = settings
+        base_fps = ctx.source.framerate
+        fps = settings['fps'] or (base_fps * settings['fpsFactor'] if base_fps else None)
+        if fps and base_fps:
+            fps = min(fps, base_fps)
+        # Searches stay close together at the rate actually applied, not just the profile's
+        ctx.power_detect_every = clamp_detect_every(settings['detectEvery'], fps, power_governor.max_search_gap)
+        ctx.min_interval = ctx.base_min_interval
+        # Restoring full rate goes back to the configured capture rate; sources that cannot
+        # change rate are throttled by the scheduler instead
+        if fps and not ctx.source.set_framerate(fps):
+            ctx.min_interval = max(ctx.base_min_interval, 1.0 / fps)
+        if ctx.servo:
+            scan_interval = settings['scanInterval']
+
+    def _record_blackbox(self, ctx, img_frame, frame_seq, capture_ts, face_box, emotion, loop_ms, detect_ms):
+        # Dual-stream frames are recorded as their main stream, in the captured format
+        raw = img_frame[0] if ctx.source.lores is not None else img_frame
+        if ctx.blackbox is None:
+            fps = ctx.fps_target or ctx.source.framerate or CAMERA_FRAMERATE
+            path = os.path.join(BLACKBOX_RING_DIR, f"emoweb-{ctx.camera_id}.bbx")
+            ctx.blackbox = BlackBoxRecorder(path, max(1, int(BLACKBOX_SECONDS * fps)), raw.shape,
+                                            ctx.source.format, fps, ctx.camera_id)
+            if debug: print(f"Black box [{ctx.camera_id}]: {ctx.blackbox.stats()}")
+        ctx.blackbox.record(raw, frame_seq, capture_ts, face_box, emotion, loop_ms, detect_ms)
+
+    def freeze_blackbox(self, camera_id=None, reason='api'):
+        """Export a camera's black box ring as a clip, returns its summary (None when not recording)"""
+        ctx = self.context(camera_id)
+        if ctx is None or ctx.blackbox is None:
+            return None
+        reason = ''.join(c for c in reason if c.isalnum() or c in '-_')[:32] or 'api'
+        clip_dir = BLACKBOX_CLIP_DIR or os.path.join(baseDir, 'blackbox')
+        os.makedirs(clip_dir, exist_ok=True)
+        path = os.path.join(clip_dir, f"{ctx.camera_id}-{int(time.time())}-{reason}.bbx")
+        info = ctx.blackbox.freeze(path, reason)
+        print(f"Black box [{ctx.camera_id}]: froze {info['frames']} frames ({reason}) to {path}")
+        return info
+
+    def process_frame(self, ctx, img_frame, frame_seq, capture_ts):
+        """Detect, track, classify and publish one frame for one camera"""
+        global current_pan, current_tilt
         t1 = cv2.getTickCount()
+        face_box = None
+        frame_emotion = None
+        face_lost = False
+        source = ctx.source
+        # Y plane view for YUV420 sources (the small lores one for dual-stream), a gray conversion for RGB888
+        frame_gray = source.gray(img_frame)
+        # Tracking, servo maths and crops are in main-stream coordinates
+        frame_height, frame_width = source.roi_image(img_frame).shape[:2]
+        cam_cx, cam_cy = frame_width / 2, frame_height / 2
+        if ctx.last_valid_cx is None:
+            ctx.last_valid_cx, ctx.last_valid_cy = cam_cx, cam_cy
+        drive = ctx.servo and self.actuators
+    
+        params = ctx.detect_params
+        detect_ms = None
+        detect_every = max(params.detect_every, ctx.power_detect_every)
+        in_window = check_timer(ctx.face_start, timer_face)
+        search_now = in_window
+        if search_now and detect_every > 1 and ctx.processed % detect_every:
+            # Tuned or power-saving detection interval: keep the current track and search on a later frame
+            ctx.detect_skipped += 1
+            search_now = False
+        elif search_now and ctx.motion_gated(frame_gray):
+            # Still, empty scene: nothing to search for until it changes
+            search_now = False
+        if in_window and not search_now:
+            # A deliberately skipped search keeps the window open, however far apart searches are
+            ctx.face_start = time.time()
+        if search_now:
+            # Search for Face (boxes mapped from the detection stream to main coordinates)
+            t_detect = cv2.getTickCount()
+            face_data = source.to_main(face_detect(frame_gray, params if ctx.tuner is not None else None))
+            detect_ms = (cv2.getTickCount() - t_detect) * 1000.0 / freq
         
-        img_frame = vs.read()
-        if img_frame is None:
-            continue
-        
-        # Broadcast frame to WebSocket clients (every 5th frame to reduce bandwidth)
-        if fps_counter % 5 == 0:
-            broadcast_frame(img_frame)
-            
-        frame_copy = np.copy(img_frame)
-        frame_gray = cv2.cvtColor(frame_copy, cv2.COLOR_RGB2GRAY)
-        
-        if check_timer(face_start, timer_face):
-            # Search for Face
-            face_data = face_detect(frame_gray)
-            
-            if validate_face(face_data, CAMERA_WIDTH, CAMERA_HEIGHT):
-                if is_scanning:
-                    is_scanning = False
-                    time.sleep(0.05)
+            if validate_face(face_data, frame_width, frame_height):
+                if ctx.scanning:
+                    ctx.scanning = False
+                    if drive:
+                        time.sleep(0.05)
 
-                smoothed_face, face_history = smooth_face_detection(face_data, face_history)
-                
+                smoothed_face, ctx.face_history = smooth_face_detection(face_data, ctx.face_history)
+            
                 if smoothed_face is not None:
                     # FACE FOUND - STOP SCANNING
-                    # is_scanning = False 
-                    face_found = True
-                    
+                    ctx.last_face_time = time.time()
+                    if ctx.servo:
+                        # Servo angles that would centre the face, where a later search starts looking
+                        searcher.face_seen(current_pan + get_servo_offset(smoothed_face[0], cam_cx, FOV_H, frame_width),
+                                           current_tilt - get_servo_offset(smoothed_face[1], cam_cy, FOV_V, frame_height))
+                
                     (cx, cy, fw, fh) = smoothed_face
-                    
+                    face_box = (max(0, int(cx - fw/2)), max(0, int(cy - fh/2)), int(fw), int(fh))
+                
                     # Initialize stabilization timer on first face detection
-                    if face_detected_time is None:
-                        face_detected_time = time.time()
-                        is_stabilizing = True
-                        face_locked = False
-                    
+                    if ctx.face_detected_time is None:
+                        ctx.face_id += 1
+                        ctx.face_detected_time = time.time()
+                        ctx.is_stabilizing = True
+                        ctx.face_locked = False
+                
                     # Only move servos DURING stabilization phase (before it's locked)
-                    if is_stabilizing and not face_locked:
-                        if should_move_servo(cx, cy, last_valid_cx, last_valid_cy):
-                            pan_offset = get_servo_offset(cx, cam_cx, FOV_H, CAMERA_WIDTH)
-                            tilt_offset = get_servo_offset(cy, cam_cy, FOV_V, CAMERA_HEIGHT)
-                            
-                            # Apply offset to CURRENT servo position
-                            # Note: If face is to the LEFT (cx < cam_cx), offset is positive.
-                            # We need to turn LEFT (increase angle? depends on servo mount)
-                            # Usually: Left pixels require increasing Pan Angle (if 180 is left)
+                    if ctx.is_stabilizing and not ctx.face_locked:
+                        if should_move_servo(cx, cy, ctx.last_valid_cx, ctx.last_valid_cy):
+                            if drive:
+                                pan_offset = get_servo_offset(cx, cam_cx, FOV_H, frame_width)
+                                tilt_offset = get_servo_offset(cy, cam_cy, FOV_V, frame_height)
                             
-                            new_pan = current_pan + pan_offset
-                            new_tilt = current_tilt - tilt_offset # Tilt usually inverted
+                                # Apply offset to CURRENT servo position
+                                # Note: If face is to the LEFT (cx < cam_cx), offset is positive.
+                                # We need to turn LEFT (increase angle? depends on servo mount)
+                                # Usually: Left pixels require increasing Pan Angle (if 180 is left)
                             
-                            pan_goto(new_pan, new_tilt)
+                                new_pan = current_pan + pan_offset
+                                new_tilt = current_tilt - tilt_offset # Tilt usually inverted
                             
-                            last_valid_cx = cx
-                            last_valid_cy = cy
-                    
-                    # Check if stabilization delay has passed
-                    if time.time() - face_detected_time > stabilization_delay:
-                        is_stabilizing = False
-                        face_locked = True  # Lock servos after stabilization
+                                pan_goto(new_pan, new_tilt)
+                                broadcast_servo_position(frame_seq, capture_ts)
                         
+                            ctx.last_valid_cx = cx
+                            ctx.last_valid_cy = cy
+                
+                    # Check if stabilization delay has passed
+                    if time.time() - ctx.face_detected_time > stabilization_delay:
+                        ctx.is_stabilizing = False
+                        ctx.face_locked = True  # Lock servos after stabilization
+                    
                         # Extract face ROI for emotion detection
                         fx = int(cx - fw/2)
                         fy = int(cy - fh/2)
                         fx = max(0, fx)
                         fy = max(0, fy)
-                        fx_end = min(CAMERA_WIDTH, fx + fw)
-                        fy_end = min(CAMERA_HEIGHT, fy + fh)
-                        
-                        face_roi = frame_copy[fy:fy_end, fx:fx_end]
-                        
+                        fx_end = min(frame_width, fx + fw)
+                        fy_end = min(frame_height, fy + fh)
+                    
+                        face_roi = source.roi_image(img_frame)[fy:fy_end, fx:fx_end]
+                    
                         if face_roi.size > 0:
                             # Detect emotion
                             emotion_idx, confidence = detect_emotion(face_roi)
-                            current_emotion_text = f"{emotion_mapper[emotion_idx]} ({confidence:.1f}%)"
-                            
+                            frame_emotion = (emotion_idx, confidence)
+                            pan = current_pan if ctx.servo else None
+                            tilt = current_tilt if ctx.servo else None
+                            event_ts = capture_ts or time.time()
+                            emotion_history.append(emotion_idx, confidence, ctx.face_id, pan or 0.0, tilt or 0.0,
+                                                   capture_ts=event_ts, camera=ctx.index)
+                            if event_store is not None:
+                                event_store.record(event_ts, ctx.face_id, emotion_idx, confidence,
+                                                   pan, tilt, frame_seq, ctx.index)
+                            ctx.current_emotion_text = f"{emotion_mapper[emotion_idx]} ({confidence:.1f}%)"
+                        
                             # Emotion state machine
                             if confidence > confidence_threshold:
-                                update_leds(emotion_idx)
-                                anim_controller.set_emotion(emotion_idx)
-                                music.play_emotion(emotion_mapper[emotion_idx], confidence/100.0)
-                                print(f"CURRENT EMOTION: {emotion_mapper[emotion_idx]} with {confidence:.1f}% confidence")
-                                
+                                if drive:
+                                    update_leds(emotion_idx)
+                                    hardware.anim.set_emotion(emotion_idx)
+                                    hardware.show_expression(emotion_mapper[emotion_idx])
+                                    hardware.music.play_emotion(emotion_mapper[emotion_idx], confidence/100.0)
+                                ctx.emotion_result = (int(emotion_idx), float(confidence), frame_seq, capture_ts)
+                                print(f"CURRENT EMOTION [{ctx.camera_id}]: {emotion_mapper[emotion_idx]} with {confidence:.1f}% confidence")
+                            
                                 # Broadcast emotion to WebSocket clients
                                 broadcast_emotion_update(
                                     emotion_mapper[emotion_idx],
                                     confidence,
-                                    current_pan
+                                    current_pan if ctx.servo else None,
+                                    frame_seq,
+                                    capture_ts,
+                                    ctx.camera_id
                                 )
-                                
-                                if emotion_idx == prev_emotion_idx:
-                                    emotion_repeats += 1
+                            
+                                if emotion_idx == ctx.prev_emotion_idx:
+                                    ctx.emotion_repeats += 1
                                 else:
-                                    if emotion_repeats >= repeat_threshold:
+                                    if ctx.emotion_repeats >= repeat_threshold:
                                         print(f"STABLE EMOTION CHANGED TO: {emotion_mapper[emotion_idx]}")
-                                        prev_emotion_idx = emotion_idx
-                                        emotion_repeats = 1
-                                    
+                                        ctx.prev_emotion_idx = emotion_idx
+                                        ctx.emotion_repeats = 1
                                 
-                    face_start = time.time()
+                            
+                    ctx.face_start = time.time()
             else:
                 # FACE LOST - RESUME SCANNING
-                if not is_scanning:
+                if not ctx.scanning:
                     # Only print once when switching mode
-                    if debug: print("Face Lost - Resuming Sweep")
-                    anim_controller.set_emotion(6)  # Neutral
-                    
-                is_scanning = True
+                    if debug: print(f"Face Lost [{ctx.camera_id}] - Resuming Sweep")
+                    if drive:
+                        hardware.anim.set_emotion(6)  # Neutral
+                        hardware.show_expression('scanning')
                 
-                face_history = []
-                face_detected_time = None
-                is_stabilizing = False
-                face_locked = False
-                emotion_repeats = 0
-                current_emotion_text = "Analyzing..."
-                face_start = time.time()
-
-        if window_on:
-            if face_found:
-                fx = int(last_valid_cx - fw/2)
-                fy = int(last_valid_cy - fh/2)
-                cv2.rectangle(frame_copy, (fx, fy), (fx+fw, fy+fh), blue, 2)
-                cv2.putText(frame_copy, current_emotion_text, (fx, fy - 10), 
-                           font, 0.7, white, 2, cv2.LINE_AA)
-                
-                if is_stabilizing:
-                    elapsed = time.time() - face_detected_time
-                    remaining = stabilization_delay - elapsed
-                    cv2.putText(frame_copy, f"STABILIZING... {remaining:.2f}s", (fx, fy + fh + 25), 
-                               font, 0.6, yellow, 2, cv2.LINE_AA)
-                elif face_locked:
-                    cv2.putText(frame_copy, "LOCKED", (fx, fy + fh + 25), 
-                               font, 0.7, green, 2, cv2.LINE_AA)
-                    cv2.putText(frame_copy, f"Stable: {emotion_mapper[prev_emotion_idx]} x{emotion_repeats}", 
-                               (10, CAMERA_HEIGHT - 10), font, 0.6, yellow, 2)
-            else:
-                cv2.putText(frame_copy, "SEARCHING...", (10, 30), font, 0.8, red, 2)
-
-            t2 = cv2.getTickCount()
-            time_diff = (t2 - t1) / freq
-            fps_calc = 1 / time_diff if time_diff > 0 else 0
-            cv2.putText(frame_copy, f"FPS: {fps_calc:.2f}", (10, 60), font, 0.7, yellow, 2)
+                ctx.scanning = True
+                face_lost = ctx.face_detected_time is not None
             
-            # Show servo status from Global Variables
-            servo_status = "SERVOS LOCKED" if face_locked else ("SCANNING" if is_scanning else "TRACKING")
-            servo_angles = f"Pan: {current_pan:.0f}° Tilt: {current_tilt:.0f}°"
-            cv2.putText(frame_copy, servo_status, (10, CAMERA_HEIGHT - 40), 
-                        font, 0.6, green if face_locked else yellow, 2, cv2.LINE_AA)
-            cv2.putText(frame_copy, servo_angles, (10, CAMERA_HEIGHT - 20), 
-                        font, 0.6, yellow, 2, cv2.LINE_AA)
+                ctx.face_history = []
+                ctx.face_detected_time = None
+                ctx.is_stabilizing = False
+                ctx.face_locked = False
+                ctx.emotion_repeats = 0
+                ctx.current_emotion_text = "Analyzing..."
+                ctx.face_start = time.time()
+
+        if ctx.servo and ctx.scanning and searcher.uses_motion:
+            searcher.observe_frame(frame_gray, capture_ts)
+
+        t_now = cv2.getTickCount()
+        loop_time = (t_now - t1) / freq
+        if loop_time > 0:
+            ctx.loop_fps = 1 / loop_time if ctx.loop_fps == 0 else 0.9 * ctx.loop_fps + 0.1 / loop_time
+        ctx.processed += 1
+        if ctx.tuner is not None and ctx.tuner.record(loop_time * 1000.0, detect_ms):
+            ctx.detect_params = ctx.tuner.params
+        if power_governor is not None:
+            settings = power_governor.update(ctx.camera_id, ctx.scanning, ctx.face_locked, ctx.last_face_time)
+            if settings is not None:
+                self._apply_power(ctx, settings)
+        if BLACKBOX:
+            self._record_blackbox(ctx, img_frame, frame_seq, capture_ts, face_box, frame_emotion,
+                                  loop_time * 1000.0, detect_ms)
+            if face_lost and BLACKBOX_ON_FACE_LOST and time.time() - ctx.last_freeze > BLACKBOX_TRIGGER_INTERVAL:
+                ctx.last_freeze = time.time()
+                # Exporting copies the whole ring; keep it off the vision thread
+                Thread(target=self.freeze_blackbox, args=(ctx.camera_id, 'face-lost'), daemon=True).start()
+        snapshot = EngineSnapshot(
+            camera_id=ctx.camera_id,
+            frame=img_frame,
+            to_color=source.color,
+            frame_seq=frame_seq,
+            capture_ts=capture_ts,
+            face=face_box,
+            emotion_result=ctx.emotion_result,
+            pan=current_pan if ctx.servo else None,
+            tilt=current_tilt if ctx.servo else None,
+            scanning=ctx.scanning,
+            locked=ctx.face_locked,
+            fps=ctx.loop_fps,
+            overlay=(ctx.current_emotion_text, ctx.face_detected_time, ctx.is_stabilizing,
+                     ctx.prev_emotion_idx, ctx.emotion_repeats)
+        )
+        self._publish(ctx, snapshot)
 
-            if WINDOW_BIGGER > 1:
-                frame_copy = cv2.resize(frame_copy, (big_w, big_h))
+        # Broadcast frame to WebSocket clients (every 5th frame to reduce bandwidth)
+        if ctx.fps_counter % 5 == 0 and websocket_clients > 0:
+            broadcast_frame(snapshot.annotated() if STREAM_ANNOTATED else snapshot.image(),
+                            frame_seq, capture_ts, ctx.camera_id)
+
+def start_event_store():
+    """Open the SQLite event sink when EVENT_DB_PATH is configured"""
+    global event_store
+    if EVENT_DB_PATH and event_store is None:
+        with timed_phase('event_store'):
+            event_store = EventStore(EVENT_DB_PATH, retention_days=EVENT_DB_RETENTION_DAYS).start()
+        print(f"Persisting emotion events to {EVENT_DB_PATH}")
+    return event_store
+
+engine = None
+
+def get_engine(**kwargs):
+    """Return the process-wide EmotionEngine, creating it on first call"""
+    global engine
+    if engine is None:
+        engine = EmotionEngine(**kwargs)
+    return engine
 
-            cv2.imshow('Emotion Track - q quits', frame_copy)
+#-----------------------------------------------------------------------------------------------
+def emotion_track():
+    # Start WebSocket server in background thread
+    websocket_thread = Thread(target=run_websocket_server, name='socketio', daemon=True)
+    websocket_thread.start()
+    
+    if window_on:
+        print("press q to quit opencv window display")
+    else:
+        print("press ctrl-c to quit SSH or terminal session")
+
+    tracker = get_engine()
+    tracker.prepare()
+
+    if wait_for_port(5000, server_start_timeout):
+        readiness['server'] = True
+        print("WebSocket server started on http://0.0.0.0:5000")
+    else:
+        print(f"WARNING: WebSocket server not accepting connections after {server_start_timeout}s")
 
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                vs.stop()
-                cv2.destroyAllWindows()
-                print("emotion_track - End Emotion Tracking")
-                still_scanning = False
+    tracker.run()
 
 #-----------------------------------------------------------------------------------------------
 if __name__ == '__main__':
+    print("===================================")
+    print("%s %s using python3 and OpenCV" % (progname, ver))
+    if not config_loaded:
+        print("ERROR - Missing config.py file")
+        sys.exit(1)
+    try:
+        with timed_phase('hardware'):
+            hardware.initialize()
+    except HardwareError as e:
+        print(f"ERROR: {e}")
+        print("Make sure pigpiod is running: sudo systemctl start pigpiod")
+        sys.exit(1)
     try:
         emotion_track()
     except KeyboardInterrupt:
         print("")
         print("User Pressed Keyboard ctrl-c")
+    except HardwareError as e:
+        print(f"ERROR: {e}")
     finally:
         print("Cleaning up GPIO and servos...")
         program_running = False # Kill the thread
         time.sleep(0.5)
-        pi.set_servo_pulsewidth(pan_pin, 0)
-        pi.set_servo_pulsewidth(tilt_pin, 0)
-        pi.stop()
-        GPIO.cleanup()
-        if oled_ready and oled is not None:
-            oled.clear()
+        hardware.cleanup()
+        if event_store is not None:
+            event_store.stop()
         print("")
-        print("%s %s Exiting Program" % (progName, ver))
\ No newline at end of file
+        print("%s %s Exiting Program" % (progName, ver))
@@ -0,0 +1,174 @@
+"""
+event_store - optional durable SQLite sink for emotion events
+
+The vision loop only calls record(), which enqueues without ever blocking.
+A writer thread drains the queue on a timer and inserts each batch with a
+single executemany transaction (WAL mode, synchronous=NORMAL), prunes rows
+past the retention window, and range queries use the timestamp index.
+"""
+
+import os
+import queue
+import sqlite3
+import time
+from threading import Thread, Event
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS emotion_events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    face_id INTEGER NOT NULL,
+    emotion_idx INTEGER NOT NULL,
+    confidence REAL NOT NULL,
+    pan REAL,
+    tilt REAL,
+    frame_seq INTEGER,
+    camera INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_emotion_events_ts ON emotion_events (ts);
+"""
+
+MAX_QUERY_ROWS = 1000      # query() never returns more rows than this, whatever the client asks for
+
+# Output keys match EmotionHistory.query() raw records, without capture_ts (timestamp here is the capture time)
+COLUMNS = ('timestamp', 'face_id', 'emotion_idx', 'confidence', 'pan', 'tilt', 'frame_seq', 'camera')
+
+
+#-----------------------------------------------------------------------------------------------
+class EventStore:
+    """Queue-fed, batch-committing SQLite writer with retention pruning"""
+    def __init__(self, path, flush_interval=2.0, batch_size=1000, retention_days=30,
+                 prune_interval=3600, queue_size=20000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.retention_s = retention_days * 86400 if retention_days else None
+        self.prune_interval = prune_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.pruned = 0
+        self.last_flush_ms = 0.0
+        self.last_error = None
+        self._stop = Event()
+        self._thread = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def start(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(emotion_events)")]
+        if 'camera' not in columns:
+            # Databases written before multi-camera support
+            conn.execute("ALTER TABLE emotion_events ADD COLUMN camera INTEGER NOT NULL DEFAULT 0")
+            conn.commit()
+        conn.close()
+        self._thread = Thread(target=self._run, name='event-store', daemon=True)
+        self._thread.start()
+        return self
+
+    def record(self, ts, face_id, emotion_idx, confidence, pan=None, tilt=None, frame_seq=None, camera=0):
+        """Enqueue one event; drops (and counts) it rather than block when the queue is full"""
+        try:
+            self.queue.put_nowait((ts, int(face_id), int(emotion_idx), float(confidence),
+                                   None if pan is None else float(pan),
+                                   None if tilt is None else float(tilt), frame_seq, int(camera)))
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self):
+        rows = []
+        try:
+            while len(rows) < self.batch_size:
+                rows.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return rows
+
+    def _flush(self, conn):
+        while True:
+            rows = self._drain()
+            if not rows:
+                return
+            t0 = time.perf_counter()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO emotion_events (ts, face_id, emotion_idx, confidence, pan, tilt, frame_seq, camera) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self.written += len(rows)
+                self.batches += 1
+            except sqlite3.Error as e:
+                self.dropped += len(rows)
+                self.last_error = str(e)
+            self.last_flush_ms = (time.perf_counter() - t0) * 1000.0
+            if len(rows) < self.batch_size:
+                return
+
+    def _prune(self, conn):
+        if self.retention_s is None:
+            return
+        try:
+            with conn:
+                cur = conn.execute("DELETE FROM emotion_events WHERE ts < ?", (time.time() - self.retention_s,))
+            self.pruned += cur.rowcount
+        except sqlite3.Error as e:
+            self.last_error = str(e)
+
+    def _run(self):
+        conn = self._connect()
+        next_prune = time.time()
+        try:
+            while not self._stop.wait(self.flush_interval):
+                self._flush(conn)
+                if time.time() >= next_prune:
+                    self._prune(conn)
+                    next_prune = time.time() + self.prune_interval
+            self._flush(conn)
+        finally:
+            conn.close()
+
+    def stop(self, timeout=5.0):
+        """Flush what is queued and stop the writer thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def query(self, since=0.0, until=None, limit=1000):
+        """Events in [since, until) oldest first (newest limit kept, at most MAX_QUERY_ROWS), as columnar lists"""
+        limit = max(1, min(int(limit), MAX_QUERY_ROWS))
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            sql = ("SELECT ts, face_id, emotion_idx, confidence, pan, tilt, frame_seq, camera "
+                   "FROM emotion_events WHERE ts >= ?")
+            params = [since]
+            if until is not None:
+                sql += " AND ts < ?"
+                params.append(until)
+            sql += " ORDER BY ts DESC LIMIT ?"
+            params.append(limit)
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        rows.reverse()
+        return {name: [row[i] for row in rows] for i, name in enumerate(COLUMNS)}
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'queued': self.queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'pruned': self.pruned,
+            'lastFlushMs': round(self.last_flush_ms, 2),
+            'lastError': self.last_error,
+        }
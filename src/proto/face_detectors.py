@@ -0,0 +1,372 @@
+#!/usr/bin/env python
+"""
+face_detectors - interchangeable face detection backends for emoweb.py
+
+Every backend takes a gray image and returns all faces as (x, y, w, h, score)
+tuples in image coordinates:
+
+    haar    the original Haar chain: frontalface_default -> profileface -> frontalface_alt2
+            (score = neighbour count, faces in cascade order)
+    lbp     LBP frontal cascade, faster and steadier than Haar on a Pi
+    yunet   OpenCV DNN FaceDetectorYN with the YuNet ONNX model
+    tflite  MediaPipe BlazeFace short-range TFLite model
+
+Run as a script to benchmark the available backends on a clip and record the
+chosen one as FACE_DETECTOR in config.py:
+
+    python face_detectors.py session.mp4 --write-config config.py
+    python face_detectors.py session.mp4 --truth labels.csv --frames 300
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from threading import Lock
+
+import cv2
+import numpy as np
+
+_haar_dir = getattr(getattr(cv2, 'data', None), 'haarcascades', '/usr/share/opencv4/haarcascades/')
+_here = os.path.dirname(os.path.abspath(__file__))
+
+# pip's opencv-python ships no LBP cascades: look next to its Haar ones, then in the system data dirs
+LBP_CASCADE = 'lbpcascade_frontalface_improved.xml'
+LBP_SEARCH_DIRS = (
+    os.path.join(os.path.dirname(os.path.normpath(_haar_dir)), 'lbpcascades'),
+    '/usr/share/opencv4/lbpcascades',
+    '/usr/share/opencv/lbpcascades',
+    '/usr/local/share/opencv4/lbpcascades',
+)
+
+
+def find_lbp_cascade():
+    """First LBP frontal cascade found in LBP_SEARCH_DIRS, else the usual system path"""
+    for directory in LBP_SEARCH_DIRS:
+        path = os.path.join(directory, LBP_CASCADE)
+        if os.path.exists(path):
+            return path
+    return os.path.join(LBP_SEARCH_DIRS[1], LBP_CASCADE)
+
+DEFAULT_PATHS = {
+    'haar': (os.path.join(_haar_dir, 'haarcascade_frontalface_default.xml'),
+             os.path.join(_haar_dir, 'haarcascade_profileface.xml'),
+             os.path.join(_haar_dir, 'haarcascade_frontalface_alt2.xml')),
+    'lbp': find_lbp_cascade(),
+    'yunet': os.path.join(_here, 'models', 'face_detection_yunet_2023mar.onnx'),
+    'tflite': os.path.join(_here, 'models', 'face_detection_short_range.tflite'),
+}
+
+
+#-----------------------------------------------------------------------------------------------
+class FaceDetector:
+    """
+    Backend interface: detect(gray) -> [(x, y, w, h, score), ...]
+    scale_factor, min_neighbors and min_size override the cascade settings for one call
+    (the auto-tuner uses them); backends without those knobs only apply min_size.
+    """
+    name = 'base'
+
+    def detect(self, gray, scale_factor=None, min_neighbors=None, min_size=None):
+        raise NotImplementedError
+
+
+def _drop_small(found, min_size):
+    if not min_size:
+        return found
+    return [f for f in found if f[2] >= min_size and f[3] >= min_size]
+
+
+class HaarChainDetector(FaceDetector):
+    """The original three-cascade chain; the first cascade that finds anything wins"""
+    name = 'haar'
+
+    def __init__(self, paths=DEFAULT_PATHS['haar'], scale_factor=1.1, min_neighbors=5):
+        self.cascades = []
+        for path in paths:
+            cascade = cv2.CascadeClassifier(path)
+            if cascade.empty():
+                raise IOError(f"Cannot load cascade {path}")
+            self.cascades.append(cascade)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.lock = Lock()      # the cascades are shared by the vision workers and the batch endpoint
+
+    def detect(self, gray, scale_factor=None, min_neighbors=None, min_size=None):
+        scale_factor = scale_factor or self.scale_factor
+        min_neighbors = min_neighbors or self.min_neighbors
+        min_size = (min_size, min_size) if min_size else (0, 0)
+        with self.lock:
+            for cascade in self.cascades:
+                faces, neighbours = cascade.detectMultiScale2(gray, scale_factor, min_neighbors, minSize=min_size)
+                if len(faces) > 0:
+                    return [(int(x), int(y), int(w), int(h), float(n)) for (x, y, w, h), n in zip(faces, neighbours)]
+        return []
+
+
+class LbpDetector(FaceDetector):
+    name = 'lbp'
+
+    def __init__(self, path=DEFAULT_PATHS['lbp'], scale_factor=1.1, min_neighbors=4):
+        if not os.path.exists(path):
+            raise IOError(f"LBP cascade not found at {path}; pip's opencv-python has none, install the "
+                          f"system OpenCV data (apt install opencv-data) or give the path in FACE_DETECTOR_PATHS")
+        self.cascade = cv2.CascadeClassifier(path)
+        if self.cascade.empty():
+            raise IOError(f"Cannot load LBP cascade {path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.lock = Lock()
+
+    def detect(self, gray, scale_factor=None, min_neighbors=None, min_size=None):
+        with self.lock:
+            faces, neighbours = self.cascade.detectMultiScale2(gray, scale_factor or self.scale_factor,
+                                                               min_neighbors or self.min_neighbors,
+                                                               minSize=(min_size, min_size) if min_size else (0, 0))
+        found = [(int(x), int(y), int(w), int(h), float(n)) for (x, y, w, h), n in zip(faces, neighbours)]
+        return sorted(found, key=lambda f: f[4], reverse=True)
+
+
+class YuNetDetector(FaceDetector):
+    name = 'yunet'
+
+    def __init__(self, path=DEFAULT_PATHS['yunet'], score_threshold=0.6, nms_threshold=0.3, top_k=50):
+        if not hasattr(cv2, 'FaceDetectorYN'):
+            raise IOError("YuNet needs OpenCV 4.5.4 or newer")
+        if not os.path.exists(path):
+            raise IOError(f"YuNet model not found at {path}")
+        self.net = cv2.FaceDetectorYN.create(path, "", (320, 320), score_threshold, nms_threshold, top_k)
+        self.size = None
+        self.lock = Lock()      # one net shared by the vision workers; the input size is per call
+
+    def detect(self, gray, scale_factor=None, min_neighbors=None, min_size=None):
+        image = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR) if gray.ndim == 2 else gray
+        height, width = image.shape[:2]
+        with self.lock:
+            if self.size != (width, height):
+                self.net.setInputSize((width, height))
+                self.size = (width, height)
+            _, faces = self.net.detect(image)
+        if faces is None:
+            return []
+        found = [(int(f[0]), int(f[1]), int(f[2]), int(f[3]), float(f[14])) for f in faces]
+        return sorted(_drop_small(found, min_size), key=lambda f: f[4], reverse=True)
+
+
+class TFLiteFaceDetector(FaceDetector):
+    """BlazeFace short-range (128x128 input, 896 SSD anchors)"""
+    name = 'tflite'
+    input_size = 128
+
+    def __init__(self, path=DEFAULT_PATHS['tflite'], score_threshold=0.6, nms_threshold=0.3, tflite=None):
+        if not os.path.exists(path):
+            raise IOError(f"Face detection model not found at {path}")
+        if tflite is None:
+            try:
+                import tflite_runtime.interpreter as tflite #type: ignore
+            except ImportError:
+                from tensorflow import lite as tflite #type: ignore
+        self.interpreter = tflite.Interpreter(model_path=path)
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        outputs = self.interpreter.get_output_details()
+        # Regressors have 16 values per anchor, classificators one
+        self.box_index = next(o['index'] for o in outputs if o['shape'][-1] == 16)
+        self.score_index = next(o['index'] for o in outputs if o['shape'][-1] == 1)
+        self.anchors = self.make_anchors()
+        self.score_threshold = score_threshold
+        self.nms_threshold = nms_threshold
+        self.lock = Lock()      # the interpreter is not thread-safe
+
+    @classmethod
+    def make_anchors(cls):
+        """(896, 2) anchor centres: 16x16 grid x 2 at stride 8, 8x8 grid x 6 at stride 16"""
+        anchors = []
+        for stride, per_cell in ((8, 2), (16, 6)):
+            cells = cls.input_size // stride
+            ys, xs = np.mgrid[0:cells, 0:cells]
+            centres = np.stack([(xs + 0.5) / cells, (ys + 0.5) / cells], axis=-1).reshape(-1, 2)
+            anchors.append(np.repeat(centres, per_cell, axis=0))
+        return np.concatenate(anchors).astype(np.float32)
+
+    def detect(self, gray, scale_factor=None, min_neighbors=None, min_size=None):
+        height, width = gray.shape[:2]
+        image = cv2.resize(gray, (self.input_size, self.input_size), interpolation=cv2.INTER_AREA)
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB) if image.ndim == 2 else image
+        tensor = (image.astype(np.float32) * np.float32(2.0 / 255.0) - 1.0)[np.newaxis]
+        with self.lock:
+            self.interpreter.set_tensor(self.input_index, tensor)
+            self.interpreter.invoke()
+            raw_boxes = self.interpreter.get_tensor(self.box_index)[0]
+            raw_scores = self.interpreter.get_tensor(self.score_index)[0, :, 0]
+        scores = 1.0 / (1.0 + np.exp(-np.clip(raw_scores, -100, 100)))
+        keep = np.flatnonzero(scores >= self.score_threshold)
+        if keep.size == 0:
+            return []
+        centres = raw_boxes[keep, :2] / self.input_size + self.anchors[keep]
+        sizes = raw_boxes[keep, 2:4] / self.input_size
+        boxes = []
+        for (cx, cy), (bw, bh) in zip(centres, sizes):
+            boxes.append([int((cx - bw / 2) * width), int((cy - bh / 2) * height), int(bw * width), int(bh * height)])
+        picked = cv2.dnn.NMSBoxes(boxes, scores[keep].tolist(), self.score_threshold, self.nms_threshold)
+        found = [tuple(boxes[i]) + (float(scores[keep][i]),) for i in np.array(picked).flatten()]
+        return sorted(_drop_small(found, min_size), key=lambda f: f[4], reverse=True)
+
+
+BACKENDS = {
+    'haar': HaarChainDetector,
+    'lbp': LbpDetector,
+    'yunet': YuNetDetector,
+    'tflite': TFLiteFaceDetector,
+}
+
+def create_detector(name, path=None, **options):
+    """Build a backend by name; path overrides its default model or cascade location"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown face detector {name!r}, choose from {', '.join(BACKENDS)}")
+    if path is not None:
+        if name == 'haar':
+            # One cascade file (--model haar=PATH) is a chain of one
+            options['paths'] = (path,) if isinstance(path, str) else tuple(path)
+        else:
+            options['path'] = path
+    return BACKENDS[name](**options)
+
+
+#-----------------------------------------------------------------------------------------------
+# Selection benchmark
+#-----------------------------------------------------------------------------------------------
+def iou(a, b):
+    ax, ay, aw, ah = a[:4]
+    bx, by, bw, bh = b[:4]
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def load_truth(path):
+    """frame -> [(x, y, w, h)] from a CSV with frame,x,y,w,h columns (analyze_video.py output works)"""
+    truth = {}
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            boxes = truth.setdefault(int(row['frame']), [])
+            if row.get('x') not in (None, ''):
+                boxes.append(tuple(int(float(row[k])) for k in ('x', 'y', 'w', 'h')))
+    return truth
+
+
+def consensus(detections):
+    """Faces that a majority of backends agree on (IoU >= 0.3), used when no labels are given"""
+    needed = len(detections) // 2 + 1
+    agreed = []
+    for faces in detections:
+        for face in faces:
+            votes = sum(1 for other in detections if any(iou(face, o) >= 0.3 for o in other))
+            if votes >= needed and not any(iou(face, a) >= 0.3 for a in agreed):
+                agreed.append(face[:4])
+    return agreed
+
+
+def benchmark(path, names, frames=300, stride=1, truth=None, paths=None):
+    """Per-backend latency percentiles and recall against labels (or the backends' consensus)"""
+    detectors, errors = {}, {}
+    for name in names:
+        try:
+            detectors[name] = create_detector(name, (paths or {}).get(name))
+        except (IOError, ImportError, ValueError, cv2.error) as e:
+            errors[name] = str(e)
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video {path}")
+    timings = {name: [] for name in detectors}
+    found = {name: 0 for name in detectors}
+    expected = 0
+    index = analyzed = 0
+    while analyzed < frames:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        if index % stride:
+            index += 1
+            continue
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        results = {}
+        for name, detector in detectors.items():
+            t0 = time.perf_counter()
+            results[name] = detector.detect(gray)
+            timings[name].append((time.perf_counter() - t0) * 1000.0)
+        targets = truth.get(index, []) if truth is not None else consensus(list(results.values()))
+        expected += len(targets)
+        for name, faces in results.items():
+            found[name] += sum(1 for t in targets if any(iou(t, f) >= 0.3 for f in faces))
+        index += 1
+        analyzed += 1
+    cap.release()
+
+    report = {'frames': analyzed, 'faces': expected, 'truth': 'labels' if truth is not None else 'consensus',
+              'backends': {}, 'unavailable': errors}
+    for name, samples in timings.items():
+        if not samples:
+            continue
+        p50, p95 = np.percentile(samples, [50, 95])
+        report['backends'][name] = {
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'recall': round(found[name] / expected, 4) if expected else None,
+        }
+    return report
+
+
+def choose(report, recall_tolerance=0.05):
+    """Fastest (p95) backend whose recall is within recall_tolerance of the best"""
+    backends = report['backends']
+    if not backends:
+        return None
+    best_recall = max((b['recall'] or 0.0) for b in backends.values())
+    eligible = [name for name, b in backends.items() if (b['recall'] or 0.0) >= best_recall - recall_tolerance]
+    return min(eligible, key=lambda name: backends[name]['p95_ms'])
+
+
+def write_config(path, name):
+    """Set FACE_DETECTOR in a config.py, replacing an existing assignment"""
+    line = f"FACE_DETECTOR = '{name}'"
+    text = open(path).read() if os.path.exists(path) else ''
+    if re.search(r'^FACE_DETECTOR\s*=.*$', text, flags=re.M):
+        text = re.sub(r'^FACE_DETECTOR\s*=.*$', line, text, flags=re.M)
+    else:
+        text = text + ('' if text.endswith('\n') or not text else '\n') + line + '\n'
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark face detector backends and pick one')
+    parser.add_argument('video', help='sample clip')
+    parser.add_argument('--backends', default=','.join(BACKENDS), help='comma separated backends to try')
+    parser.add_argument('--frames', type=int, default=300, help='frames to analyze')
+    parser.add_argument('--stride', type=int, default=1, help='analyze every Nth frame')
+    parser.add_argument('--truth', help='CSV of labelled faces (frame,x,y,w,h); default is backend consensus')
+    parser.add_argument('--model', action='append', default=[], metavar='NAME=PATH',
+                        help='model or cascade path for a backend, repeatable')
+    parser.add_argument('--recall-tolerance', type=float, default=0.05)
+    parser.add_argument('--write-config', metavar='CONFIG_PY', help='record the choice as FACE_DETECTOR here')
+    args = parser.parse_args(argv)
+
+    paths = dict(item.split('=', 1) for item in args.model)
+    truth = load_truth(args.truth) if args.truth else None
+    report = benchmark(args.video, args.backends.split(','), args.frames, args.stride, truth, paths)
+    report['chosen'] = choose(report, args.recall_tolerance)
+    print(json.dumps(report, indent=2))
+    if args.write_config and report['chosen']:
+        write_config(args.write_config, report['chosen'])
+        print(f"FACE_DETECTOR = '{report['chosen']}' written to {args.write_config}", file=sys.stderr)
+    return 0 if report['chosen'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
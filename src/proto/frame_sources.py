@@ -0,0 +1,369 @@
+"""
+frame_sources - threaded camera and replay sources for emoweb.py
+
+Every source captures on its own thread and exposes the same interface:
+start(), read(), read_stamped() -> (frame, frame_seq, capture_ts),
+wait_for_frame() and stop(). Frames are published in the source's capture
+format and consumers go through gray() for detection, roi_image() for crops
+and color() for encoding or display:
+
+    RGB888  HxWx3, Picamera2's RGB888 channel order (what cv2 calls BGR)
+    YUV420  planar I420, (H*3/2)xW; gray() is a zero-copy view of the Y plane
+            and color() converts only when a consumer actually needs colour
+
+A dual-stream source (lores=(w, h)) publishes (main, lores) pairs captured
+together: gray() is the small lores Y plane used for detection, roi_image()
+and color() use the main stream, and to_main() maps detection boxes back to
+main-stream coordinates.
+"""
+
+import time
+from threading import Thread, Event
+
+import cv2
+import numpy as np
+
+FORMATS = ('RGB888', 'YUV420')
+
+
+#-------------------------------------------------------------------------------------------
+class FrameSource:
+    """Capture thread base class; subclasses implement _grab() and _close()"""
+    kind = 'source'
+    format = 'RGB888'
+
+    def __init__(self, rotation=0, hflip=False, vflip=False):
+        self.rotation = rotation
+        self.hflip = hflip
+        self.vflip = vflip
+
+        self.frame = None
+        self.frame_seq = 0
+        self.capture_ts = None
+        # (frame, frame_seq, capture_ts) swapped in as one tuple so readers never mix frames
+        self.stamped = (None, 0, None)
+        self.first_frame = Event()
+        self.frame_event = None   # optional shared Event set on every new frame (engine scheduler)
+        self.finished = False     # replay sources set this at end of input
+        self.stopped = False
+        self.lores = None         # (w, h) of the detection stream for dual-stream sources
+        self.scale = (1.0, 1.0)   # main / lores size ratio
+        self.framerate = None     # configured capture rate (set_framerate() changes the live one only)
+
+    def _set_lores(self, resolution, lores):
+        if lores:
+            self.lores = tuple(int(v) for v in lores)
+            self.scale = (resolution[0] / self.lores[0], resolution[1] / self.lores[1])
+
+    def start(self):
+        t = Thread(target=self.update, args=(), name=f"capture-{self.kind}")
+        t.daemon = True
+        t.start()
+        return self
+
+    def _grab(self):
+        """Return the next frame, or None at end of input"""
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def _next_seq(self):
+        """Sequence number for the frame just grabbed (replay sources keep the recorded one)"""
+        return self.frame_seq + 1
+
+    def _orient(self, frame):
+        if self.rotation != 0:
+            frame = cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE if self.rotation == 90 else cv2.ROTATE_180)
+        if self.hflip:
+            frame = cv2.flip(frame, 1)
+        if self.vflip:
+            frame = cv2.flip(frame, 0)
+        return frame
+
+    def update(self):
+        while not self.stopped:
+            frame = self._grab()
+            capture_ts = time.time()
+            if frame is None:
+                self.finished = True
+                break
+
+            frame = self._orient(frame)
+            # Readers share this buffer; anything that draws must work on a copy
+            for array in (frame if isinstance(frame, tuple) else (frame,)):
+                array.flags.writeable = False
+
+            self.frame_seq = self._next_seq()
+            self.capture_ts = capture_ts
+            self.frame = frame
+            self.stamped = (frame, self.frame_seq, capture_ts)
+            self.first_frame.set()
+            if self.frame_event is not None:
+                self.frame_event.set()
+
+        self._close()
+
+    def read(self):
+        return self.frame
+
+    def gray(self, frame):
+        """Single-channel detection image; a view into frame for YUV420 and dual-stream sources"""
+        if self.lores is not None:
+            lores = frame[1]
+            return lores[:lores.shape[0] * 2 // 3]
+        if self.format == 'YUV420':
+            return frame[:frame.shape[0] * 2 // 3]
+        return cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+
+    def roi_image(self, frame):
+        """Full-resolution image face crops are sliced from (gray for YUV420, no conversion)"""
+        if self.lores is not None:
+            frame = frame[0]
+        if self.format == 'YUV420':
+            return frame[:frame.shape[0] * 2 // 3]
+        return frame
+
+    def color(self, frame):
+        """3-channel image for encoding and display; the frame itself for RGB888"""
+        if self.lores is not None:
+            frame = frame[0]
+        if self.format == 'YUV420':
+            return cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420)
+        return frame
+
+    def to_main(self, box):
+        """Map an (x, y, w, h) box from the gray() image to roi_image() coordinates"""
+        if self.lores is None or len(box) == 0:
+            return box
+        sx, sy = self.scale
+        x, y, w, h = box
+        return (int(x * sx), int(y * sy), int(w * sx), int(h * sy))
+
+    def set_framerate(self, fps):
+        """Change the capture rate while running; False when the source cannot"""
+        return False
+
+    def read_stamped(self):
+        """Return (frame, frame_seq, capture_ts) for the latest captured frame"""
+        return self.stamped
+
+    def wait_for_frame(self, timeout=None):
+        """Block until the first frame has been captured, return False on timeout"""
+        return self.first_frame.wait(timeout)
+
+    def stop(self):
+        self.stopped = True
+        time.sleep(0.1)
+
+
+#-------------------------------------------------------------------------------------------
+class PiVideoStream(FrameSource):
+    """
+    Picamera2 capture. format='YUV420' captures planar YUV so detection reads the Y plane
+    directly; lores=(w, h) adds a camera-scaled YUV420 detection stream next to main.
+    Either way flips and 180 degree rotation are done by the camera (libcamera Transform).
+    """
+    kind = 'picamera2'
+
+    def __init__(self, resolution=(640, 480), framerate=30, rotation=0, hflip=False, vflip=False,
+                 camera_num=0, format='RGB888', lores=None):
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        self.format = format
+        from picamera2 import Picamera2 #type: ignore
+        self.picam2 = Picamera2(camera_num) if camera_num else Picamera2()
+
+        kwargs = {}
+        if lores:
+            # The ISP only produces YUV420 for the lores stream
+            kwargs['lores'] = {"format": "YUV420", "size": tuple(lores)}
+        if format == 'YUV420' or lores:
+            if rotation not in (0, 180):
+                raise ValueError("YUV420 and dual-stream capture support rotation 0 or 180 only")
+            from libcamera import Transform #type: ignore
+            flip = rotation == 180
+            kwargs['transform'] = Transform(hflip=int(hflip != flip), vflip=int(vflip != flip))
+            # Orientation is applied by the camera, not per frame
+            rotation, hflip, vflip = 0, False, False
+        super().__init__(rotation, hflip, vflip)
+        self._set_lores(resolution, lores)
+        self.framerate = framerate
+
+        config = self.picam2.create_video_configuration(
+            main={"format": format, "size": resolution}, **kwargs
+        )
+        self.picam2.configure(config)
+        self.picam2.start()
+
+    def _grab(self):
+        if self.lores is not None:
+            # Both streams come from the same request, so they show the same instant
+            (main, lores), _ = self.picam2.capture_arrays(["main", "lores"])
+            return main, lores
+        return self.picam2.capture_array()
+
+    def set_framerate(self, fps):
+        # Fixed frame duration: the sensor itself slows down, not just the readers
+        duration = int(1000000 / fps)
+        self.picam2.set_controls({"FrameDurationLimits": (duration, duration)})
+        return True
+
+    def _close(self):
+        self.picam2.stop()
+
+
+class UsbVideoStream(FrameSource):
+    """USB/V4L2 camera through cv2.VideoCapture"""
+    kind = 'usb'
+
+    def __init__(self, device=0, resolution=(640, 480), framerate=30, rotation=0, hflip=False, vflip=False):
+        super().__init__(rotation, hflip, vflip)
+        self.cap = cv2.VideoCapture(device)
+        if not self.cap.isOpened():
+            raise IOError(f"Cannot open USB camera {device}")
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, resolution[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution[1])
+        self.cap.set(cv2.CAP_PROP_FPS, framerate)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.framerate = framerate
+
+    def _grab(self):
+        ok, frame = self.cap.read()
+        return frame if ok else None
+
+    def set_framerate(self, fps):
+        return bool(self.cap.set(cv2.CAP_PROP_FPS, fps))
+
+    def _close(self):
+        self.cap.release()
+
+
+class FileReplayStream(FrameSource):
+    """Replays a video file, paced at its own (or a given) frame rate unless realtime is False"""
+    kind = 'file'
+
+    def __init__(self, path, resolution=None, framerate=None, loop=False, realtime=True,
+                 rotation=0, hflip=False, vflip=False):
+        super().__init__(rotation, hflip, vflip)
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"Cannot open video {path}")
+        self.resolution = tuple(resolution) if resolution else None
+        native_fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+        self.framerate = framerate or native_fps
+        self.interval = 1.0 / self.framerate
+        self.loop = loop
+        self.realtime = realtime
+        self._next = None
+
+    def _grab(self):
+        ok, frame = self.cap.read()
+        if not ok and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.cap.read()
+        if not ok:
+            return None
+        if self.realtime:
+            now = time.perf_counter()
+            self._next = now if self._next is None else self._next + self.interval
+            if self._next > now:
+                time.sleep(self._next - now)
+        if self.resolution and (frame.shape[1], frame.shape[0]) != self.resolution:
+            frame = cv2.resize(frame, self.resolution)
+        return frame
+
+    def set_framerate(self, fps):
+        self.interval = 1.0 / fps
+        return self.realtime
+
+    def _close(self):
+        self.cap.release()
+
+
+class SyntheticStream(FrameSource):
+    """
+    Paced generated frames (a drifting face-coloured blob on noise) in RGB888 or YUV420,
+    optionally with a YUV420 lores stream, for testing without a camera
+    """
+    kind = 'synthetic'
+
+    def __init__(self, resolution=(640, 480), framerate=30, format='RGB888', seed=0, limit=None, lores=None):
+        super().__init__()
+        self._set_lores(resolution, lores)
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        self.format = format
+        self.resolution = tuple(resolution)
+        self.framerate = framerate
+        self.interval = 1.0 / framerate
+        self.limit = limit
+        self.index = 0
+        self._next = None
+        width, height = self.resolution
+        self._base = np.random.default_rng(seed).integers(40, 120, size=(height, width, 3), dtype=np.uint8)
+
+    def set_framerate(self, fps):
+        self.interval = 1.0 / fps
+        return True
+
+    def render(self, index):
+        """RGB888 frame number index"""
+        width, height = self.resolution
+        frame = self._base.copy()
+        cx = int(width / 2 + (width / 4) * np.sin(index / 15.0))
+        cy = int(height / 2 + (height / 6) * np.cos(index / 20.0))
+        cv2.ellipse(frame, (cx, cy), (width // 10, height // 7), 0, 0, 360, (200, 170, 150), -1)
+        cv2.circle(frame, (cx - width // 30, cy - height // 30), width // 80, (30, 30, 30), -1)
+        cv2.circle(frame, (cx + width // 30, cy - height // 30), width // 80, (30, 30, 30), -1)
+        return frame
+
+    def _grab(self):
+        if self.limit is not None and self.index >= self.limit:
+            return None
+        now = time.perf_counter()
+        self._next = now if self._next is None else self._next + self.interval
+        if self._next > now:
+            time.sleep(self._next - now)
+        frame = self.render(self.index)
+        self.index += 1
+        main = cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420) if self.format == 'YUV420' else frame
+        if self.lores is not None:
+            small = cv2.resize(frame, self.lores, interpolation=cv2.INTER_AREA)
+            return main, cv2.cvtColor(small, cv2.COLOR_BGR2YUV_I420)
+        return main
+
+
+#-------------------------------------------------------------------------------------------
+SOURCE_TYPES = {
+    'picamera2': PiVideoStream,
+    'usb': UsbVideoStream,
+    'file': FileReplayStream,
+    'synthetic': SyntheticStream,
+}
+
+def _blackbox_source(**kwargs):
+    # black_box imports this module, so it is loaded on first use
+    from black_box import BlackBoxReplay
+    return BlackBoxReplay(**kwargs)
+
+SOURCE_TYPES['blackbox'] = _blackbox_source
+
+def create_source(spec, resolution=(640, 480), framerate=30):
+    """
+    Build a source from a config dict such as
+    {'type': 'usb', 'device': 0}, {'type': 'picamera2', 'format': 'YUV420'},
+    {'type': 'file', 'path': 'clip.mp4', 'loop': True} or {'type': 'blackbox', 'path': 'cam0.bbx'}.
+    Keys other than type/id/servo/fps are passed to the source constructor.
+    """
+    spec = dict(spec)
+    kind = spec.pop('type', 'picamera2')
+    for key in ('id', 'servo', 'fps'):
+        spec.pop(key, None)
+    if kind not in SOURCE_TYPES:
+        raise ValueError(f"Unknown frame source type {kind!r}")
+    if kind not in ('file', 'blackbox'):
+        spec.setdefault('resolution', resolution)
+        spec.setdefault('framerate', framerate)
+    return SOURCE_TYPES[kind](**spec)
@@ -0,0 +1,323 @@
+"""
+hw_stubs - hardware-free stand-ins for emoweb.py
+
+Installs fake RPi.GPIO, pigpio, luma, picamera2, libcamera, tflite_runtime, Arduino/music
+controller and config modules into sys.modules so emoweb.py can be imported and its real
+vision functions driven on any machine that has OpenCV and NumPy.
+Used by the offline tools (bench_pipeline.py); never imported by emoweb.py itself.
+"""
+
+import os
+import sys
+import time
+import types
+from unittest import mock
+
+import cv2
+import numpy as np
+
+# Default stub configuration, mirrors the names emoweb.py reads from config.py
+DEFAULT_CONFIG = {
+    'CAMERA_WIDTH': 640,
+    'CAMERA_HEIGHT': 480,
+    'CAMERA_FRAMERATE': 30,
+    'CAMERA_ROTATION': 0,
+    'CAMERA_HFLIP': False,
+    'CAMERA_VFLIP': False,
+    'GPIOZERO_PAN_PIN': 17,
+    'GPIOZERO_TILT_PIN': 18,
+    'WINDOW_BIGGER': 1,
+    'window_on': False,
+    'debug': False,
+    'verbose': False,
+    'timer_face': 1.0,
+    'fface1_haar_path': os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_default.xml'),
+    'fface2_haar_path': os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_alt2.xml'),
+    'pface1_haar_path': os.path.join(cv2.data.haarcascades, 'haarcascade_profileface.xml'),
+}
+
+NUM_EMOTIONS = 7
+
+
+#-----------------------------------------------------------------------------------------------
+class FakePi:
+    """pigpio.pi() stand-in that records the last pulse width per pin"""
+    def __init__(self, *args, **kwargs):
+        self.connected = True
+        self.pulses = {}
+
+    def set_servo_pulsewidth(self, pin, pulse):
+        self.pulses[pin] = pulse
+
+    def stop(self):
+        self.connected = False
+
+
+class FakeInterpreter:
+    """
+    tflite_runtime Interpreter stand-in.
+    Produces a deterministic softmax from the input mean and can burn
+    invoke_ms of wall time per call to model the real model's cost.
+    """
+    invoke_ms = 0.0
+
+    def __init__(self, model_path=None, input_shape=(1, 48, 48, 1), num_threads=None, **kwargs):
+        self.model_path = model_path
+        self.input_shape = np.array(input_shape, dtype=np.int32)
+        self.input_tensor = np.zeros(tuple(input_shape), dtype=np.float32)
+        self.output_tensor = np.zeros((input_shape[0], NUM_EMOTIONS), dtype=np.float32)
+        self.invokes = 0
+
+    def allocate_tensors(self):
+        self.input_tensor = np.zeros(tuple(self.input_shape), dtype=np.float32)
+        self.output_tensor = np.zeros((int(self.input_shape[0]), NUM_EMOTIONS), dtype=np.float32)
+
+    def resize_tensor_input(self, index, shape, strict=False):
+        self.input_shape = np.array(shape, dtype=np.int32)
+
+    def get_input_details(self):
+        return [{'index': 0, 'shape': self.input_shape.copy(), 'dtype': np.float32}]
+
+    def get_output_details(self):
+        return [{'index': 1, 'shape': np.array(self.output_tensor.shape, dtype=np.int32), 'dtype': np.float32}]
+
+    def set_tensor(self, index, value):
+        self.input_tensor = value
+
+    def invoke(self):
+        self.invokes += 1
+        if self.invoke_ms > 0:
+            end = time.perf_counter() + self.invoke_ms / 1000.0
+            while time.perf_counter() < end:
+                pass
+        batch = self.input_tensor.reshape(self.input_tensor.shape[0], -1)
+        means = batch.mean(axis=1, keepdims=True)
+        logits = np.cos(means * np.arange(1, NUM_EMOTIONS + 1, dtype=np.float32) * 7.0) * 4.0
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        self.output_tensor = (exp / exp.sum(axis=1, keepdims=True)).astype(np.float32)
+
+    def get_tensor(self, index):
+        return self.output_tensor
+
+
+class FakeAnimController:
+    """ArduinoAnimController stand-in"""
+    def __init__(self, port=None, baud=None):
+        self.emotion = None
+        self.scan_anim = None
+
+    def connect(self):
+        return True
+
+    def set_emotion(self, emotion_idx):
+        self.emotion = emotion_idx
+
+    def set_scan_anim(self, name):
+        self.scan_anim = name
+
+
+class FakeMusicController:
+    """MusicController stand-in"""
+    def __init__(self, music_dir=None):
+        self.current = None
+
+    def play_emotion(self, emotion, intensity=1.0):
+        self.current = emotion
+
+    def stop(self):
+        self.current = None
+
+
+class FakePicamera2:
+    """
+    picamera2.Picamera2 stand-in that paces synthetic frames at the configured rate.
+    frame_fn(index, (width, height)) may supply frames; the default is a drifting blob on noise.
+    A main stream configured as YUV420 is delivered as planar I420, like the real camera,
+    and a configured lores stream is the same frame scaled down, as I420.
+    """
+    framerate = 30
+    frame_fn = None
+
+    def __init__(self, camera_num=0):
+        self.size = (DEFAULT_CONFIG['CAMERA_WIDTH'], DEFAULT_CONFIG['CAMERA_HEIGHT'])
+        self.index = 0
+        self.format = 'RGB888'
+        self.transform = None
+        self.lores_size = None
+        self.started = False
+        self._next = 0.0
+        rng = np.random.default_rng(camera_num)
+        self._noise = rng.integers(40, 120, size=(self.size[1], self.size[0], 3), dtype=np.uint8)
+
+    def create_video_configuration(self, main=None, **kwargs):
+        return {'main': dict(main or {}), **kwargs}
+
+    def configure(self, config):
+        self.size = tuple(config['main'].get('size', self.size))
+        self.format = config['main'].get('format', 'RGB888')
+        self.transform = config.get('transform')
+        lores = config.get('lores')
+        self.lores_size = tuple(lores['size']) if lores else None
+        rng = np.random.default_rng(0)
+        self._noise = rng.integers(40, 120, size=(self.size[1], self.size[0], 3), dtype=np.uint8)
+
+    def start(self):
+        self.started = True
+        self._next = time.perf_counter()
+
+    def stop(self):
+        self.started = False
+
+    def set_controls(self, controls):
+        if 'FrameDurationLimits' in controls:
+            self.framerate = 1000000.0 / controls['FrameDurationLimits'][0]
+
+    def capture_arrays(self, names=("main",)):
+        frame = self._render()
+        arrays = []
+        for name in names:
+            if name == 'lores':
+                small = cv2.resize(frame, self.lores_size, interpolation=cv2.INTER_AREA)
+                arrays.append(cv2.cvtColor(small, cv2.COLOR_BGR2YUV_I420))
+            else:
+                arrays.append(self._main(frame))
+        return arrays, {}
+
+    def capture_array(self, name='main'):
+        return self._main(self._render())
+
+    def _main(self, frame):
+        if self.format == 'YUV420':
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420)
+        return frame
+
+    def _render(self):
+        self._next += 1.0 / self.framerate
+        delay = self._next - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self.index += 1
+        if self.frame_fn is not None:
+            frame = self.frame_fn(self.index, self.size)
+        else:
+            w, h = self.size
+            frame = self._noise.copy()
+            cx = int(w / 2 + (w / 4) * np.sin(self.index / 15.0))
+            cy = int(h / 2 + (h / 6) * np.cos(self.index / 20.0))
+            cv2.ellipse(frame, (cx, cy), (w // 10, h // 7), 0, 0, 360, (200, 170, 150), -1)
+        return frame
+
+
+class FakeOled:
+    """luma sh1106 stand-in"""
+    def __init__(self, serial=None, rotate=0, width=128, height=64, **kwargs):
+        self.width = width
+        self.height = height
+        self.mode = '1'
+        self.size = (width, height)
+        self.last_image = None
+
+    def contrast(self, level):
+        pass
+
+    def display(self, image):
+        self.last_image = image
+
+    def clear(self):
+        self.last_image = None
+
+
+#-----------------------------------------------------------------------------------------------
+def _module(name, **attrs):
+    mod = types.ModuleType(name)
+    mod.__dict__.update(attrs)
+    return mod
+
+
+def _try_import(name):
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+
+def install(config=None, invoke_ms=0.0, stub_interpreter=True):
+    """
+    Put hardware stand-ins into sys.modules.
+    config overrides DEFAULT_CONFIG keys; invoke_ms sets FakeInterpreter cost.
+    Returns the config dict that was installed.
+    """
+    cfg = dict(DEFAULT_CONFIG)
+    if config:
+        cfg.update(config)
+
+    noop = lambda *args, **kwargs: None
+    gpio = _module('RPi.GPIO', BCM=11, BOARD=10, OUT=0, IN=1, LOW=0, HIGH=1,
+                   setmode=noop, setup=noop, output=noop, cleanup=noop, setwarnings=noop)
+    sys.modules['RPi'] = _module('RPi', GPIO=gpio)
+    sys.modules['RPi.GPIO'] = gpio
+    sys.modules['pigpio'] = _module('pigpio', pi=FakePi)
+
+    serial_mod = _module('luma.core.interface.serial', i2c=lambda *args, **kwargs: object())
+    device_mod = _module('luma.oled.device', sh1106=FakeOled)
+    sys.modules['luma'] = _module('luma')
+    sys.modules['luma.core'] = _module('luma.core')
+    sys.modules['luma.core.interface'] = _module('luma.core.interface', serial=serial_mod)
+    sys.modules['luma.core.interface.serial'] = serial_mod
+    sys.modules['luma.oled'] = _module('luma.oled', device=device_mod)
+    sys.modules['luma.oled.device'] = device_mod
+
+    if stub_interpreter:
+        FakeInterpreter.invoke_ms = invoke_ms
+        interp_mod = _module('tflite_runtime.interpreter', Interpreter=FakeInterpreter)
+        sys.modules['tflite_runtime'] = _module('tflite_runtime', interpreter=interp_mod)
+        sys.modules['tflite_runtime.interpreter'] = interp_mod
+
+    sys.modules['arduino_anim_controller'] = _module('arduino_anim_controller',
+                                                     ArduinoAnimController=FakeAnimController)
+    sys.modules['music_controller'] = _module('music_controller', MusicController=FakeMusicController)
+    sys.modules['picamera2'] = _module('picamera2', Picamera2=FakePicamera2)
+    sys.modules['libcamera'] = _module('libcamera', Transform=lambda hflip=0, vflip=0: {'hflip': hflip, 'vflip': vflip})
+
+    # Web layers are real when installed; the vision functions never touch them
+    if not _try_import('flask_socketio'):
+        class _SocketIO:
+            def __init__(self, *args, **kwargs):
+                pass
+            def on(self, *args, **kwargs):
+                return lambda f: f
+            def emit(self, *args, **kwargs):
+                pass
+            def run(self, *args, **kwargs):
+                pass
+        sys.modules['flask_socketio'] = _module('flask_socketio', SocketIO=_SocketIO, emit=noop)
+
+    config_mod = _module('config', **cfg)
+    config_mod.__all__ = list(cfg)
+    sys.modules['config'] = config_mod
+    return cfg
+
+
+def load_emoweb(config=None, invoke_ms=0.0, model_path=None):
+    """
+    Import emoweb.py against the stand-ins, load its vision models and return the module.
+    When model_path is given the real TFLite interpreter is used with that model.
+    """
+    install(config, invoke_ms=invoke_ms, stub_interpreter=model_path is None)
+    sys.modules.pop('emoweb', None)
+    proto_dir = os.path.dirname(os.path.abspath(__file__))
+    if proto_dir not in sys.path:
+        sys.path.insert(0, proto_dir)
+
+    import emoweb
+    if model_path is not None:
+        emoweb.vision.model_path = model_path
+        emoweb.vision.load()
+    else:
+        # FakeInterpreter never opens the file; only the existence check needs satisfying
+        stub_model = emoweb.vision.model_path
+        real_exists = os.path.exists
+        with mock.patch('os.path.exists', lambda path: path == stub_model or real_exists(path)):
+            emoweb.vision.load()
+    return emoweb
@@ -0,0 +1,438 @@
+#!/usr/bin/env python
+"""
+load_test - dashboard fan-out load generator for the emoweb servers
+
+Connects N simulated SocketIO dashboards and M HTTP pollers to emoweb.py's
+WebSocket server or raspberry_pi/emotion_flask_server.py, either one already
+running (--url) or one started here in a child process with the hardware
+stubbed out and synthetic cameras (--serve, see hw_stubs.py). SocketIO
+clients send request_frame / get_status and time the reply while receiving
+the broadcast events; pollers mix the REST endpoints of the target. Vision-loop
+FPS is sampled from /api/cameras with no load first and then under load.
+
+Reports throughput, per-operation latency percentiles, errors, broadcast
+delivery lag and the FPS drop as JSON, and can compare a run against a
+saved report and fail when it regressed.
+
+Examples:
+    python load_test.py --serve emoweb --clients 20 --pollers 5 --duration 30
+    python load_test.py --serve flask --pollers 20 --output flask-20.json
+    python load_test.py --url http://pi.local:5000 --clients 40 --baseline base.json --max-regression 25
+    python load_test.py --serve emoweb --serve-only --port 5000     # just the stubbed server
+
+SocketIO replies are matched to requests by event name: a request_frame is timed
+to the next camera_frame the client receives, broadcast or not. Delivery lag
+compares the event's server timestamp with the local clock, so it is only
+meaningful when both run on the same machine.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from bench_pipeline import summarize
+
+# (method, path) -> weight; emoweb.py's own server has no frame or detection endpoints
+DEFAULT_HTTP_MIX = {
+    'emoweb': {('GET', '/api/status'): 3, ('GET', '/api/cameras'): 1},
+    'flask': {('GET', '/api/camera_frame'): 2, ('POST', '/api/detect_emotion'): 2,
+              ('GET', '/api/current_emotion'): 1, ('GET', '/api/status'): 1},
+}
+DEFAULT_SOCKET_MIX = {'request_frame': 1, 'get_status': 1}
+SOCKET_REPLIES = {'request_frame': 'camera_frame', 'get_status': 'status'}
+BROADCAST_EVENTS = ('emotion_update', 'camera_frame', 'servo_position')
+
+
+def parse_mix(text, http=False):
+    """'GET /api/status=3,POST /api/detect_emotion=1' or 'get_status=2,request_frame=1' -> {op: weight}"""
+    mix = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        op, _, weight = item.rpartition('=')
+        if not op:
+            op, weight = weight, '1'
+        if http:
+            method, _, path = op.strip().rpartition(' ')
+            op = ((method or 'GET').upper(), path)
+        elif op not in SOCKET_REPLIES:
+            raise ValueError(f"Unknown SocketIO operation {op}, expected one of {', '.join(SOCKET_REPLIES)}")
+        mix[op] = float(weight)
+    return mix
+
+
+def op_name(op):
+    return f"{op[0]} {op[1]}" if isinstance(op, tuple) else op
+
+
+#-----------------------------------------------------------------------------------------------
+# Stubbed server (child process)
+#-----------------------------------------------------------------------------------------------
+def serve(target, port, cameras=1, camera_fps=15, invoke_ms=0.0):
+    """Run emoweb's SocketIO server or the Flask server on port with stub hardware; blocks"""
+    import hw_stubs
+    specs = [{'id': f'cam{i}', 'type': 'synthetic', 'fps': camera_fps} for i in range(cameras)]
+    emoweb = hw_stubs.load_emoweb({'CAMERAS': specs, 'CAMERA_FRAMERATE': camera_fps}, invoke_ms=invoke_ms)
+    if target == 'emoweb':
+        emoweb.get_engine(show_window=False, actuators=False).start()
+        emoweb.readiness['server'] = True
+        emoweb.get_socketio().run(emoweb.app, host='127.0.0.1', port=port, debug=False,
+                                  use_reloader=False, allow_unsafe_werkzeug=True)
+    else:
+        server_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'raspberry_pi')
+        sys.path.insert(0, os.path.abspath(server_dir))
+        import emotion_flask_server as server
+        server.initialize_system()
+        server.app.run(host='127.0.0.1', port=port, debug=False, threaded=True)
+
+
+def spawn_server(args):
+    """Start this script with --serve-only in a child process, its output going to args.server_log"""
+    cmd = [sys.executable, os.path.abspath(__file__), '--serve', args.serve, '--serve-only',
+           '--port', str(args.port), '--cameras', str(args.cameras),
+           '--camera-fps', str(args.camera_fps), '--invoke-ms', str(args.invoke_ms)]
+    log = open(args.server_log, 'w') if args.server_log else subprocess.DEVNULL
+    return subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+#-----------------------------------------------------------------------------------------------
+# Load generator
+#-----------------------------------------------------------------------------------------------
+class Recorder:
+    """Latencies, errors and counts per operation, only while recording is on"""
+    def __init__(self):
+        self.recording = False
+        self.latency_ms = {}
+        self.errors = {}
+        self.events = {name: 0 for name in BROADCAST_EVENTS}
+        self.lag_ms = {name: [] for name in BROADCAST_EVENTS}
+        self.connect_errors = {}    # counted whether recording or not
+
+    def done(self, name, t0):
+        if self.recording:
+            self.latency_ms.setdefault(name, []).append((time.perf_counter() - t0) * 1000.0)
+
+    def error(self, name, reason):
+        if self.recording:
+            errors = self.errors.setdefault(name, {})
+            errors[reason] = errors.get(reason, 0) + 1
+
+    def event(self, name, data):
+        if self.recording and name in self.events:
+            self.events[name] += 1
+            if isinstance(data, dict) and isinstance(data.get('timestamp'), (int, float)):
+                self.lag_ms[name].append((time.time() - data['timestamp']) * 1000.0)
+
+
+async def wait_ready(session, url, timeout):
+    """Poll /api/health until it answers 200"""
+    import aiohttp #type: ignore
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(url + '/api/health') as response:
+                if response.status == 200:
+                    return True
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.5)
+    return False
+
+
+async def sample_cameras(session, url):
+    """(monotonic time, {camera id: (processed, fps)}) from /api/cameras, None if unavailable"""
+    try:
+        async with session.get(url + '/api/cameras') as response:
+            body = await response.json()
+        return time.monotonic(), {c['cameraId']: (c.get('processed', 0), c.get('fps', 0.0)) for c in body['cameras']}
+    except Exception:
+        return None
+
+
+async def measure_fps(session, url, seconds, samples):
+    """Sample /api/cameras once a second for seconds; processed-frame rate per camera"""
+    first = await sample_cameras(session, url)
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        await asyncio.sleep(min(1.0, max(0.0, end - time.monotonic())))
+        sample = await sample_cameras(session, url)
+        if sample is not None:
+            samples.append(sample)
+    last = samples[-1] if samples else None
+    if first is None or last is None or last[0] <= first[0]:
+        return {}
+    elapsed = last[0] - first[0]
+    return {camera_id: round((processed - first[1].get(camera_id, (0, 0))[0]) / elapsed, 2)
+            for camera_id, (processed, _) in last[1].items()}
+
+
+async def http_poller(session, url, mix, interval, rng, recorder, stop):
+    ops, weights = list(mix), list(mix.values())
+    while not stop.is_set():
+        op = rng.choices(ops, weights)[0]
+        name = op_name(op)
+        t0 = time.perf_counter()
+        try:
+            async with session.request(op[0], url + op[1]) as response:
+                await response.read()
+                if response.status < 400:
+                    recorder.done(name, t0)
+                else:
+                    recorder.error(name, f"http {response.status}")
+        except Exception as e:
+            recorder.error(name, type(e).__name__)
+        if interval:
+            await asyncio.sleep(interval * rng.uniform(0.5, 1.5))
+        else:
+            await asyncio.sleep(0)
+
+
+async def socket_client(url, transports, mix, interval, timeout, rng, recorder, stop, connected):
+    import socketio #type: ignore
+    client = socketio.AsyncClient(reconnection=False)
+    waiting = {}        # reply event -> future of the request waiting for it
+
+    def on_event(name):
+        async def handler(data=None):
+            recorder.event(name, data)
+            future = waiting.pop(name, None)
+            if future is not None and not future.done():
+                future.set_result(None)
+        return handler
+
+    for name in set(BROADCAST_EVENTS) | set(SOCKET_REPLIES.values()):
+        client.on(name, on_event(name))
+    try:
+        await client.connect(url, transports=transports, wait_timeout=timeout)
+    except Exception as e:
+        recorder.connect_errors[type(e).__name__] = recorder.connect_errors.get(type(e).__name__, 0) + 1
+        return
+    connected.append(client.transport())
+    ops, weights = list(mix), list(mix.values())
+    try:
+        while not stop.is_set():
+            op = rng.choices(ops, weights)[0]
+            reply = SOCKET_REPLIES[op]
+            future = asyncio.get_running_loop().create_future()
+            waiting[reply] = future
+            t0 = time.perf_counter()
+            try:
+                await client.emit(op)
+                await asyncio.wait_for(future, timeout)
+                recorder.done(op, t0)
+            except asyncio.TimeoutError:
+                waiting.pop(reply, None)
+                recorder.error(op, 'timeout')
+            except Exception as e:
+                recorder.error(op, type(e).__name__)
+            await asyncio.sleep(interval * rng.uniform(0.5, 1.5) if interval else 0)
+    finally:
+        await client.disconnect()
+
+
+async def run_load(args, http_mix, socket_mix):
+    import aiohttp #type: ignore
+    url = args.url.rstrip('/')
+    recorder = Recorder()
+    stop = asyncio.Event()
+    connected = []
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(timeout=timeout, connector=aiohttp.TCPConnector(limit=0)) as session:
+        if not await wait_ready(session, url, args.ready_timeout):
+            raise RuntimeError(f"{url}/api/health did not report ready within {args.ready_timeout}s")
+        # The vision loop needs a few seconds after warm-up to reach its steady rate
+        await asyncio.sleep(args.ramp_up)
+        idle_fps = await measure_fps(session, url, args.idle_seconds, []) if args.idle_seconds else {}
+
+        transports = ['websocket'] if args.transport == 'websocket' else ['polling'] if args.transport == 'polling' else None
+        tasks = []
+        for i in range(args.clients):
+            rng = random.Random(args.seed * 100003 + i)
+            tasks.append(asyncio.create_task(socket_client(url, transports, socket_mix, args.interval, args.timeout,
+                                                           rng, recorder, stop, connected)))
+        for i in range(args.pollers):
+            rng = random.Random(args.seed * 100003 + args.clients + i)
+            tasks.append(asyncio.create_task(http_poller(session, url, http_mix, args.interval, rng, recorder, stop)))
+
+        # Connections settle before anything is counted
+        await asyncio.sleep(args.ramp_up)
+        recorder.recording = True
+        t0 = time.monotonic()
+        fps_samples = []
+        load_fps = await measure_fps(session, url, args.duration, fps_samples)
+        elapsed = time.monotonic() - t0
+        recorder.recording = False
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return recorder, elapsed, idle_fps, load_fps, connected
+
+
+def build_report(args, recorder, elapsed, idle_fps, load_fps, connected, http_mix, socket_mix):
+    operations = {}
+    total = 0
+    for name in sorted(set(recorder.latency_ms) | set(recorder.errors)):
+        samples = recorder.latency_ms.get(name, [])
+        total += len(samples)
+        stats = summarize(samples)
+        stats['per_s'] = round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0
+        stats['errors'] = recorder.errors.get(name, {})
+        operations[name] = stats
+    clients = max(1, len(connected))
+    events = {name: {'count': count,
+                     'per_client_per_s': round(count / clients / elapsed, 2) if elapsed > 0 else 0.0,
+                     'lag': summarize(recorder.lag_ms[name])}
+              for name, count in recorder.events.items()}
+    vision = {'idle_fps': idle_fps, 'load_fps': load_fps, 'drop_pct': {}}
+    for camera_id, fps in load_fps.items():
+        idle = idle_fps.get(camera_id)
+        vision['drop_pct'][camera_id] = round((idle - fps) / idle * 100.0, 2) if idle else None
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_s': round(total / elapsed, 2) if elapsed > 0 else 0.0,
+        'events_per_s': round(sum(recorder.events.values()) / elapsed, 2) if elapsed > 0 else 0.0,
+        'operations': operations,
+        'events': events,
+        'connect_errors': recorder.connect_errors,
+        'vision': vision,
+        'meta': {
+            'label': args.label,
+            'url': args.url,
+            'target': args.target,
+            'served': bool(args.serve),
+            'clients': args.clients,
+            'clients_connected': len(connected),
+            'transports': sorted(set(connected)),
+            'pollers': args.pollers,
+            'interval_s': args.interval,
+            'duration_s': args.duration,
+            'http_mix': {op_name(op): weight for op, weight in http_mix.items()},
+            'socket_mix': socket_mix,
+            'cameras': args.cameras if args.serve else None,
+            'camera_fps': args.camera_fps if args.serve else None,
+            'invoke_ms': args.invoke_ms if args.serve else None,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'timestamp': time.time(),
+        },
+    }
+
+
+def compare(report, baseline):
+    """Percent change of throughput, p95 latency per operation and vision FPS against a baseline report"""
+    def delta(new, old):
+        if old in (None, 0) or new is None:
+            return None
+        return round((new - old) / old * 100.0, 2)
+
+    result = {'requests_per_s_pct': delta(report['requests_per_s'], baseline.get('requests_per_s')),
+              'p95_pct': {}, 'load_fps_pct': {}}
+    for name, stats in report['operations'].items():
+        result['p95_pct'][name] = delta(stats.get('p95_ms'), baseline.get('operations', {}).get(name, {}).get('p95_ms'))
+    for camera_id, fps in report['vision']['load_fps'].items():
+        result['load_fps_pct'][camera_id] = delta(fps, baseline.get('vision', {}).get('load_fps', {}).get(camera_id))
+    return result
+
+
+def regressions(comparison, limit_pct):
+    """Human-readable list of the numbers that got worse by more than limit_pct"""
+    found = []
+    throughput = comparison['requests_per_s_pct']
+    if throughput is not None and throughput < -limit_pct:
+        found.append(f"throughput {throughput:+.1f}%")
+    for name, pct in comparison['p95_pct'].items():
+        if pct is not None and pct > limit_pct:
+            found.append(f"{name} p95 {pct:+.1f}%")
+    for camera_id, pct in comparison['load_fps_pct'].items():
+        if pct is not None and pct < -limit_pct:
+            found.append(f"{camera_id} fps {pct:+.1f}%")
+    return found
+
+
+#-----------------------------------------------------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the emoweb SocketIO and REST APIs')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help='server to load, e.g. http://pi.local:5000')
+    target.add_argument('--serve', choices=('emoweb', 'flask'), help='start this server locally with stub hardware')
+    parser.add_argument('--target', choices=('emoweb', 'flask'), help="--url server kind, picks the default HTTP mix")
+    parser.add_argument('--serve-only', action='store_true', help='run the --serve server in the foreground and nothing else')
+    parser.add_argument('--port', type=int, default=5055, help='port for --serve')
+    parser.add_argument('--cameras', type=int, default=1, help='synthetic cameras for --serve')
+    parser.add_argument('--camera-fps', type=float, default=15, help='synthetic camera rate for --serve')
+    parser.add_argument('--invoke-ms', type=float, default=0.0, help='simulated interpreter cost for --serve')
+    parser.add_argument('--server-log', help='write the --serve server output here')
+    parser.add_argument('--clients', type=int, default=10, help='SocketIO clients (emoweb only)')
+    parser.add_argument('--pollers', type=int, default=5, help='HTTP pollers')
+    parser.add_argument('--interval', type=float, default=0.5, help='mean seconds between a client\'s requests (0 = back to back)')
+    parser.add_argument('--http-mix', help="e.g. 'GET /api/status=3,POST /api/detect_emotion=1'")
+    parser.add_argument('--socket-mix', help="e.g. 'request_frame=1,get_status=2'")
+    parser.add_argument('--transport', choices=('auto', 'websocket', 'polling'), default='auto')
+    parser.add_argument('--duration', type=float, default=30, help='seconds under load that are measured')
+    parser.add_argument('--ramp-up', type=float, default=3, help='settling seconds before the idle and the load measurement')
+    parser.add_argument('--idle-seconds', type=float, default=5, help='seconds of vision FPS measured before the load')
+    parser.add_argument('--timeout', type=float, default=10, help='per-request timeout in seconds')
+    parser.add_argument('--ready-timeout', type=float, default=60, help='seconds to wait for /api/health')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--label', default=None, help='free-form label stored in the report')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--max-regression', type=float, default=None,
+                        help='with --baseline, exit 1 when throughput, a p95 or the FPS is this many percent worse')
+    args = parser.parse_args(argv)
+    if not args.url and not args.serve:
+        parser.error('one of --url or --serve is required')
+    args.target = args.serve or args.target or 'emoweb'
+    if args.serve:
+        args.url = f"http://127.0.0.1:{args.port}"
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.serve_only:
+        serve(args.serve, args.port, args.cameras, args.camera_fps, args.invoke_ms)
+        return 0
+
+    http_mix = parse_mix(args.http_mix, http=True) if args.http_mix else DEFAULT_HTTP_MIX[args.target]
+    socket_mix = parse_mix(args.socket_mix) if args.socket_mix else dict(DEFAULT_SOCKET_MIX)
+    if args.target == 'flask' and args.clients:
+        print("emotion_flask_server.py has no SocketIO endpoint; running HTTP pollers only", file=sys.stderr)
+        args.clients = 0
+
+    server = spawn_server(args) if args.serve else None
+    try:
+        recorder, elapsed, idle_fps, load_fps, connected = asyncio.run(run_load(args, http_mix, socket_mix))
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    report = build_report(args, recorder, elapsed, idle_fps, load_fps, connected, http_mix, socket_mix)
+    failed = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['comparison'] = compare(report, json.load(f))
+        if args.max_regression is not None:
+            failed = regressions(report['comparison'], args.max_regression)
+            report['regressions'] = failed
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+    if failed:
+        print(f"Regressed beyond {args.max_regression}%: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+"""
+oled_display - pre-rendered expression frames and a background OLED updater
+
+Expression frames (one per emotion plus 'scanning') are drawn once at
+startup as 1-bit images sized for the panel, or cut from a sprite sheet
+with the frames side by side in FRAME_NAMES order. OledDisplay owns the
+device in its own thread: show() only records the wanted frame, and the
+thread pushes it over I2C when it differs from what is on the panel, at
+most max_fps times a second, so the vision loop never waits on the bus.
+
+    python oled_display.py --out frames/              # write the frames as PNGs
+    python oled_display.py --dummy                    # exercise the updater on luma's dummy device
+    python oled_display.py --dummy --sheet faces.png
+"""
+
+import argparse
+import os
+import sys
+import time
+from threading import Thread, Event
+
+from PIL import Image, ImageDraw
+
+EMOTIONS = ('anger', 'disgust', 'fear', 'happiness', 'sadness', 'surprise', 'neutral')
+FRAME_NAMES = EMOTIONS + ('scanning',)
+
+
+def _eyes(draw, w, h, style):
+    """Two eyes centred on the upper half of the panel"""
+    r = h // 8
+    for cx in (w * 3 // 10, w * 7 // 10):
+        cy = h * 3 // 8
+        if style == 'round':
+            draw.ellipse((cx - r, cy - r, cx + r, cy + r), fill=1)
+        elif style == 'wide':
+            draw.ellipse((cx - r - 3, cy - r - 3, cx + r + 3, cy + r + 3), outline=1, width=2)
+            draw.ellipse((cx - 3, cy - 3, cx + 3, cy + 3), fill=1)
+        elif style == 'happy':
+            draw.arc((cx - r, cy - r, cx + r, cy + r), 200, 340, fill=1, width=3)
+        elif style == 'squint':
+            draw.line((cx - r, cy, cx + r, cy), fill=1, width=3)
+        elif style == 'side':
+            draw.ellipse((cx - r, cy - r, cx + r, cy + r), outline=1, width=2)
+            draw.ellipse((cx + r // 3 - 3, cy - 3, cx + r // 3 + 3, cy + 3), fill=1)
+
+
+def _brows(draw, w, h, tilt):
+    """tilt > 0 slants the brows down towards the nose (anger), < 0 up (sadness, fear)"""
+    y = h // 6
+    for cx, side in ((w * 3 // 10, 1), (w * 7 // 10, -1)):
+        draw.line((cx - 10, y - tilt * side, cx + 10, y + tilt * side), fill=1, width=2)
+
+
+def render_frame(name, size=(128, 64)):
+    """1-bit expression image for one of FRAME_NAMES"""
+    w, h = size
+    image = Image.new('1', size, 0)
+    draw = ImageDraw.Draw(image)
+    mouth_y = h * 3 // 4
+    if name == 'anger':
+        _eyes(draw, w, h, 'round')
+        _brows(draw, w, h, 4)
+        draw.line((w * 2 // 5, mouth_y, w * 3 // 5, mouth_y), fill=1, width=3)
+    elif name == 'disgust':
+        _eyes(draw, w, h, 'squint')
+        draw.line((w * 2 // 5, mouth_y, w // 2, mouth_y - 4, w * 3 // 5, mouth_y), fill=1, width=2)
+    elif name == 'fear':
+        _eyes(draw, w, h, 'wide')
+        _brows(draw, w, h, -3)
+        draw.ellipse((w // 2 - 5, mouth_y - 4, w // 2 + 5, mouth_y + 4), outline=1, width=2)
+    elif name == 'happiness':
+        _eyes(draw, w, h, 'happy')
+        draw.arc((w * 3 // 8, mouth_y - 14, w * 5 // 8, mouth_y + 6), 20, 160, fill=1, width=3)
+    elif name == 'sadness':
+        _eyes(draw, w, h, 'round')
+        _brows(draw, w, h, -4)
+        draw.arc((w * 3 // 8, mouth_y - 2, w * 5 // 8, mouth_y + 18), 200, 340, fill=1, width=3)
+    elif name == 'surprise':
+        _eyes(draw, w, h, 'wide')
+        draw.ellipse((w // 2 - 8, mouth_y - 8, w // 2 + 8, mouth_y + 8), outline=1, width=3)
+    elif name == 'scanning':
+        _eyes(draw, w, h, 'side')
+        draw.line((w * 7 // 16, mouth_y, w * 9 // 16, mouth_y), fill=1, width=2)
+    else:   # neutral
+        _eyes(draw, w, h, 'round')
+        draw.line((w * 3 // 8, mouth_y, w * 5 // 8, mouth_y), fill=1, width=2)
+    return image
+
+
+def render_frames(size=(128, 64)):
+    return {name: render_frame(name, size) for name in FRAME_NAMES}
+
+
+def load_sprite_sheet(path, size=(128, 64)):
+    """Frames cut from a sheet of len(FRAME_NAMES) equal cells side by side, scaled to size"""
+    sheet = Image.open(path)
+    cell_w = sheet.width // len(FRAME_NAMES)
+    if cell_w == 0:
+        raise ValueError(f"{path} is narrower than {len(FRAME_NAMES)} frames")
+    frames = {}
+    for i, name in enumerate(FRAME_NAMES):
+        cell = sheet.crop((i * cell_w, 0, (i + 1) * cell_w, sheet.height))
+        if cell.size != tuple(size):
+            cell = cell.resize(size)
+        frames[name] = cell.convert('1')
+    return frames
+
+
+#-----------------------------------------------------------------------------------------------
+class OledDisplay:
+    """Pushes the latest wanted frame to a luma device from its own thread, rate-limited"""
+    def __init__(self, device, frames, max_fps=8.0):
+        self.device = device
+        self.frames = frames
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.wanted = None
+        self.shown = None
+        self.requests = 0       # show() calls that changed the wanted frame
+        self.pushes = 0         # frames actually sent to the panel
+        self.errors = 0
+        self._last_push = 0.0
+        self._event = Event()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = Thread(target=self._run, name='oled', daemon=True)
+            self._thread.start()
+        return self
+
+    def show(self, name):
+        """Request a frame by name; returns immediately"""
+        if name != self.wanted:
+            self.wanted = name
+            self.requests += 1
+            self._event.set()
+
+    def stop(self):
+        self._stopped = True
+        self._event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def _run(self):
+        while not self._stopped:
+            self._event.wait()
+            self._event.clear()
+            # Changes arriving faster than the panel refresh collapse into the newest one
+            wait = self._last_push + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            name = self.wanted
+            if self._stopped or name == self.shown or name not in self.frames:
+                continue
+            try:
+                self.device.display(self.frames[name])
+                self.shown = name
+                self.pushes += 1
+            except Exception as e:
+                self.errors += 1
+                if self.errors == 1:
+                    print(f"WARNING: OLED update failed: {e}")
+            self._last_push = time.monotonic()
+
+    def stats(self):
+        return {'shown': self.shown, 'requests': self.requests, 'pushes': self.pushes, 'errors': self.errors}
+
+
+#-----------------------------------------------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render OLED expression frames or exercise the updater')
+    parser.add_argument('--out', help='write every frame as a PNG into this directory')
+    parser.add_argument('--sheet', help='sprite sheet instead of the drawn frames')
+    parser.add_argument('--size', default='128x64', help='panel size WxH')
+    parser.add_argument('--dummy', action='store_true', help="drive luma's dummy device with a burst of changes")
+    parser.add_argument('--max-fps', type=float, default=8.0)
+    args = parser.parse_args(argv)
+
+    size = tuple(int(v) for v in args.size.lower().split('x'))
+    t0 = time.perf_counter()
+    frames = load_sprite_sheet(args.sheet, size) if args.sheet else render_frames(size)
+    print(f"{len(frames)} frames {size[0]}x{size[1]} ready in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        for name, image in frames.items():
+            image.save(os.path.join(args.out, f"{name}.png"))
+        print(f"Wrote {len(frames)} PNGs to {args.out}")
+    if args.dummy:
+        from luma.core.device import dummy #type: ignore
+        display = OledDisplay(dummy(width=size[0], height=size[1], mode='1'), frames, args.max_fps).start()
+        # 2 s of a loop announcing a state on every frame at 30 fps
+        t0 = time.perf_counter()
+        for i in range(60):
+            display.show(FRAME_NAMES[(i // 4) % len(FRAME_NAMES)])
+            time.sleep(1 / 30.0)
+        time.sleep(0.5)
+        display.stop()
+        print(f"show() calls: 60 in {time.perf_counter() - t0:.1f}s, {display.stats()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
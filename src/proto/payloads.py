@@ -0,0 +1,252 @@
+"""
+payloads - event and status payloads built once and encoded once
+
+Every state change (a new emotion result, a servo move, a broadcast frame)
+becomes one small __slots__ object. Its dict view is built on first use
+and its JSON (orjson when installed, else the standard library) and
+MessagePack (when msgpack is installed) encodings at most once, so the
+same bytes go to every SocketIO client and every REST read until the
+state changes again.
+
+SocketIO gets the cached text through SocketIOJSON, a drop-in json module
+for SocketIO(json=...): packets whose arguments are Payload objects are
+spliced together from the cached text instead of being encoded again,
+anything else goes through the normal encoder. payload_response() answers
+a Flask request with the cached bytes, as MessagePack when the client
+asks for application/msgpack.
+"""
+
+import json
+import time
+
+try:
+    import orjson #type: ignore
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack #type: ignore
+except ImportError:
+    msgpack = None
+
+try:
+    from engineio.json import loads as _loads #type: ignore
+except ImportError:
+    _loads = json.loads
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+
+def _default(obj):
+    """numpy scalars and arrays, tuples from stats dicts"""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def encode_json(obj):
+    """Compact JSON bytes, with orjson when it can handle the object"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(obj, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def encode_msgpack(obj):
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+
+#-----------------------------------------------------------------------------------------------
+class Payload:
+    """
+    A payload whose dict, JSON and MessagePack forms are each produced at most once.
+    Payload(data) wraps a ready dict; subclasses keep their fields in slots and build it in _build().
+    The dict is shared by every reader: treat it as read-only.
+    """
+    __slots__ = ('_dict', '_json', '_text', '_msgpack')
+
+    def __init__(self, data=None):
+        self._dict = data
+        self._json = None
+        self._text = None
+        self._msgpack = None
+
+    def _build(self):
+        raise NotImplementedError
+
+    def to_dict(self):
+        if self._dict is None:
+            self._dict = self._build()
+        return self._dict
+
+    def get(self, key, default=None):
+        return self.to_dict().get(key, default)
+
+    def json(self):
+        if self._json is None:
+            self._json = encode_json(self.to_dict())
+        return self._json
+
+    def json_text(self):
+        if self._text is None:
+            self._text = self.json().decode('utf-8')
+        return self._text
+
+    def msgpack(self):
+        if self._msgpack is None:
+            self._msgpack = encode_msgpack(self.to_dict())
+        return self._msgpack
+
+
+def _ms(value):
+    return round(value, 2) if value is not None else None
+
+
+class EmotionUpdate(Payload):
+    """'emotion_update' event; servo_angle, pan and tilt are None for cameras without a pan/tilt head"""
+    __slots__ = ('camera_id', 'emotion', 'confidence', 'servo_angle', 'timestamp', 'pan', 'tilt',
+                 'frame_seq', 'capture_ts', 'latency_ms')
+
+    def __init__(self, camera_id, emotion, confidence, servo_angle=None, pan=None, tilt=None,
+                 frame_seq=None, capture_ts=None, latency_ms=None, timestamp=None):
+        Payload.__init__(self)
+        has_servo = servo_angle is not None
+        self.camera_id = camera_id
+        self.emotion = emotion
+        self.confidence = round(float(confidence), 2)
+        self.servo_angle = int(servo_angle) if has_servo else None
+        self.pan = round(float(pan), 1) if has_servo and pan is not None else None
+        self.tilt = round(float(tilt), 1) if has_servo and tilt is not None else None
+        self.frame_seq = frame_seq
+        self.capture_ts = capture_ts
+        self.latency_ms = _ms(latency_ms)
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def _build(self):
+        return {
+            'cameraId': self.camera_id,
+            'emotion': self.emotion,
+            'confidence': self.confidence,
+            'servoAngle': self.servo_angle,
+            'timestamp': self.timestamp,
+            'panAngle': self.pan,
+            'tiltAngle': self.tilt,
+            'frameSeq': self.frame_seq,
+            'captureTs': self.capture_ts,
+            'latencyMs': self.latency_ms
+        }
+
+
+class ServoPosition(Payload):
+    """'servo_position' event"""
+    __slots__ = ('pan', 'tilt', 'frame_seq', 'capture_ts', 'timestamp', 'latency_ms')
+
+    def __init__(self, pan, tilt, frame_seq=None, capture_ts=None, latency_ms=None, timestamp=None):
+        Payload.__init__(self)
+        self.pan = round(float(pan), 1)
+        self.tilt = round(float(tilt), 1)
+        self.frame_seq = frame_seq
+        self.capture_ts = capture_ts
+        self.latency_ms = _ms(latency_ms)
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def _build(self):
+        return {
+            'pan': self.pan,
+            'tilt': self.tilt,
+            'frameSeq': self.frame_seq,
+            'captureTs': self.capture_ts,
+            'timestamp': self.timestamp,
+            'latencyMs': self.latency_ms
+        }
+
+
+class CameraFrame(Payload):
+    """'camera_frame' event with the JPEG as base64 text"""
+    __slots__ = ('camera_id', 'frame', 'frame_seq', 'capture_ts', 'timestamp', 'latency_ms')
+
+    def __init__(self, camera_id, frame_base64, frame_seq=None, capture_ts=None, latency_ms=None, timestamp=None):
+        Payload.__init__(self)
+        self.camera_id = camera_id
+        self.frame = frame_base64
+        self.frame_seq = frame_seq
+        self.capture_ts = capture_ts
+        self.latency_ms = _ms(latency_ms)
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def _build(self):
+        return {
+            'cameraId': self.camera_id,
+            'frame': self.frame,
+            'frameSeq': self.frame_seq,
+            'captureTs': self.capture_ts,
+            'timestamp': self.timestamp,
+            'latencyMs': self.latency_ms
+        }
+
+
+#-----------------------------------------------------------------------------------------------
+class PayloadCache:
+    """
+    Latest Payload per key, rebuilt only when its version (compared with ==, e.g. the engine
+    snapshot it came from) changes, or once it is older than max_age seconds when given.
+    Concurrent misses may both build; the last one wins, which is harmless.
+    """
+    def __init__(self, max_age=None):
+        self.max_age = max_age
+        self._entries = {}      # key -> (version, built at, Payload)
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, key, version, build):
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and entry[0] == version and (self.max_age is None or now - entry[1] < self.max_age):
+            self.hits += 1
+            return entry[2]
+        payload = build()
+        if not isinstance(payload, Payload):
+            payload = Payload(payload)
+        self._entries[key] = (version, now, payload)
+        self.builds += 1
+        return payload
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'builds': self.builds}
+
+
+#-----------------------------------------------------------------------------------------------
+class SocketIOJSON:
+    """json module for SocketIO(json=...) that reuses the text cached on Payload arguments"""
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        # Event packets carry [event name, arg, ...]
+        if isinstance(obj, list) and any(isinstance(item, Payload) for item in obj):
+            return '[' + ','.join(item.json_text() if isinstance(item, Payload)
+                                  else json.dumps(item, separators=(',', ':'), default=_default)
+                                  for item in obj) + ']'
+        kwargs.setdefault('default', _default)
+        return json.dumps(obj, *args, **kwargs)
+
+    @staticmethod
+    def loads(*args, **kwargs):
+        return _loads(*args, **kwargs)
+
+
+def payload_response(payload, status=200, headers=None):
+    """Flask response with the payload's cached bytes, MessagePack if the client prefers it"""
+    from flask import Response, request
+    if not isinstance(payload, Payload):
+        payload = Payload(payload)
+    mimetype = JSON_MIMETYPE
+    if msgpack is not None:
+        mimetype = request.accept_mimetypes.best_match([JSON_MIMETYPE, MSGPACK_MIMETYPE], JSON_MIMETYPE)
+    body = payload.msgpack() if mimetype == MSGPACK_MIMETYPE else payload.json()
+    return Response(body, status=status, mimetype=mimetype, headers=headers)
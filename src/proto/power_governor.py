@@ -0,0 +1,179 @@
+"""
+power_governor - state- and temperature-aware work limits for the vision loop
+
+Each camera runs in one of three profiles:
+    idle-scan   scanning with no face seen for idle_after seconds: low camera FPS,
+                sparse face searches, slow servo sweep
+    acquiring   scanning recently active or a face being stabilized: full rate
+    locked      face locked: moderate rate, emotion crops only
+
+On top of the profile, a thermal level (0 normal, 1 warm, 2 hot) derates FPS,
+search interval and servo write rate. The search interval is capped so that
+searches stay at most max_search_gap seconds apart at the derated FPS. The level is read from the kernel
+thermal zone and the firmware throttle flags, and is raised at configurable
+temperatures below the firmware's own soft limit so the loop sheds work in
+steps instead of having the CPU clock cut underneath it.
+"""
+
+import time
+from threading import Lock
+
+
+# Camera FPS (None = as configured), face search every Nth frame, seconds between scanner servo writes
+DEFAULT_PROFILES = {
+    'idle-scan': {'fps': 5, 'detect_every': 3, 'scan_interval': 0.1},
+    'acquiring': {'fps': None, 'detect_every': 1, 'scan_interval': 0.02},
+    'locked': {'fps': 15, 'detect_every': 2, 'scan_interval': 0.1},
+}
+
+# Per thermal level: (FPS factor, search interval multiplier, scan interval multiplier)
+THERMAL_DERATE = (
+    (1.0, 1, 1),
+    (0.7, 2, 2),
+    (0.5, 3, 4),
+)
+
+# get_throttled bits: 2 = currently throttled, 3 = soft temperature limit active
+THROTTLED_NOW = 0x4
+SOFT_TEMP_LIMIT_NOW = 0x8
+
+
+def clamp_detect_every(detect_every, fps, max_gap):
+    """detect_every, lowered so that searches at fps are at most max_gap seconds apart"""
+    if not fps or not max_gap:
+        return detect_every
+    return max(1, min(detect_every, int(fps * max_gap)))
+
+
+def read_cpu_temp(path):
+    """CPU temperature in degrees C from a thermal zone file (millidegrees), None if unreadable"""
+    try:
+        with open(path) as f:
+            return int(f.read().strip()) / 1000.0
+    except (OSError, ValueError):
+        return None
+
+
+def read_throttled(path):
+    """Firmware throttle flags (get_throttled, hex or decimal), None if unreadable"""
+    if not path:
+        return None
+    try:
+        with open(path) as f:
+            return int(f.read().strip(), 0)
+    except (OSError, ValueError):
+        return None
+
+
+#-----------------------------------------------------------------------------------------------
+class PowerGovernor:
+    """
+    Picks a profile per camera from its tracking state and a shared thermal level.
+    update(...) returns the settings to apply, or None while nothing changed for that camera.
+    """
+    def __init__(self, temp_path='/sys/class/thermal/thermal_zone0/temp',
+                 throttle_path='/sys/devices/platform/soc/soc:firmware/get_throttled',
+                 warm_c=68.0, hot_c=75.0, hysteresis_c=3.0, idle_after=120.0, poll_interval=2.0,
+                 profiles=None, max_search_gap=0.75, verbose=True):
+        self.temp_path = temp_path
+        self.throttle_path = throttle_path
+        self.warm_c = warm_c
+        self.hot_c = hot_c
+        self.hysteresis_c = hysteresis_c
+        self.idle_after = idle_after
+        self.poll_interval = poll_interval
+        self.max_search_gap = max_search_gap    # seconds between face searches at most
+        self.profiles = {name: dict(values) for name, values in DEFAULT_PROFILES.items()}
+        for name, values in (profiles or {}).items():
+            self.profiles.setdefault(name, {}).update(values)
+        self.verbose = verbose
+
+        self.temperature = None
+        self.throttled = None
+        self.thermal_level = 0
+        self.last_poll = 0.0
+        self.current = {}           # camera id -> (profile, thermal level)
+        self.switches = 0
+        self._lock = Lock()
+
+    def poll_thermal(self, now=None):
+        """Re-read temperature and throttle flags at most every poll_interval seconds"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if now - self.last_poll < self.poll_interval:
+                return self.thermal_level
+            self.last_poll = now
+            self.temperature = read_cpu_temp(self.temp_path)
+            self.throttled = read_throttled(self.throttle_path)
+            level = self.thermal_level
+            temp = self.temperature
+            if temp is None and self.throttled is None:
+                return level
+            if self.throttled is not None and self.throttled & (THROTTLED_NOW | SOFT_TEMP_LIMIT_NOW):
+                # Firmware is already limiting the clock: shed as much as we can
+                level = 2
+            elif temp is not None:
+                # Step up at the thresholds, step down only once clearly below them
+                if temp >= self.hot_c:
+                    level = 2
+                elif level == 2 and temp > self.hot_c - self.hysteresis_c:
+                    pass
+                elif temp >= self.warm_c:
+                    level = 1
+                elif level >= 1 and temp > self.warm_c - self.hysteresis_c:
+                    level = 1
+                else:
+                    level = 0
+            if level != self.thermal_level:
+                if self.verbose:
+                    print(f"power_governor: thermal level {self.thermal_level} -> {level} "
+                          f"(temp {temp if temp is not None else '?'} C, throttled {self.throttled})")
+                self.thermal_level = level
+            return level
+
+    def profile_name(self, scanning, face_locked, last_face_time, now):
+        if face_locked:
+            return 'locked'
+        if scanning and (last_face_time is None or now - last_face_time > self.idle_after):
+            return 'idle-scan'
+        return 'acquiring'
+
+    def update(self, camera_id, scanning, face_locked, last_face_time, now=None):
+        """New settings for a camera when its profile or the thermal level changed, else None"""
+        now = time.time() if now is None else now
+        level = self.poll_thermal()
+        name = self.profile_name(scanning, face_locked, last_face_time, now)
+        if self.current.get(camera_id) == (name, level):
+            return None
+        previous = self.current.get(camera_id)
+        self.current[camera_id] = (name, level)
+        self.switches += 1
+        settings = self.settings(name, level)
+        if self.verbose:
+            print(f"power_governor {camera_id}: {previous[0] if previous else 'start'} -> {name} "
+                  f"(thermal {level}): {settings}")
+        return settings
+
+    def settings(self, name, level):
+        profile = self.profiles[name]
+        fps_factor, detect_mult, scan_mult = THERMAL_DERATE[level]
+        fps = profile['fps'] * fps_factor if profile['fps'] else None
+        return {
+            'profile': name,
+            'thermalLevel': level,
+            'fps': fps,
+            'fpsFactor': fps_factor,
+            'detectEvery': clamp_detect_every(profile['detect_every'] * detect_mult, fps, self.max_search_gap),
+            'scanInterval': profile['scan_interval'] * scan_mult,
+        }
+
+    def stats(self):
+        return {
+            'temperature': self.temperature,
+            'throttled': hex(self.throttled) if self.throttled is not None else None,
+            'thermalLevel': self.thermal_level,
+            'warmC': self.warm_c,
+            'hotC': self.hot_c,
+            'profiles': {camera_id: name for camera_id, (name, _) in self.current.items()},
+            'switches': self.switches,
+        }
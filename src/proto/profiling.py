@@ -0,0 +1,251 @@
+"""
+profiling - on-demand CPU and memory diagnostics for a running server
+
+SamplingProfiler walks sys._current_frames() at a fixed interval for a
+bounded time, so it sees every thread (capture, scanner, vision workers,
+SocketIO, request handlers) without instrumenting any of them. Nothing
+runs between profiles. Results come out as collapsed stacks (flamegraph.pl,
+speedscope), a top-functions table, or a pstats file built from the
+samples (pstats, snakeviz).
+
+MemoryTracker wraps tracemalloc: start it, take snapshots, and each
+snapshot is diffed against the previous one to show what keeps growing.
+tracemalloc is off until started and stopped again afterwards.
+
+register_debug_routes(app, token) adds the /debug/* endpoints to a Flask
+app. Without a token they answer only requests from localhost; with one
+they need an X-Debug-Token header (or ?token=). The tracemalloc actions that
+change state (start, snapshot, stop) only accept POST, so a crawler or link
+prefetch cannot toggle them.
+"""
+
+import marshal
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+MAX_PROFILE_SECONDS = 60
+
+
+def _location(code):
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def _label(func):
+    filename, lineno, name = func
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+#-----------------------------------------------------------------------------------------------
+class SamplingProfiler:
+    """Time-boxed stack sampler across all threads"""
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = Counter()        # (thread name, stack outermost first) -> count
+        self.ticks = 0
+        self.elapsed = 0.0
+
+    def run(self, seconds):
+        me = threading.get_ident()
+        start = time.perf_counter()
+        end = start + min(seconds, MAX_PROFILE_SECONDS)
+        while time.perf_counter() < end:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(_location(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples[(names.get(ident, str(ident)), tuple(stack))] += 1
+            self.ticks += 1
+            time.sleep(self.interval)
+        self.elapsed = time.perf_counter() - start
+        return self
+
+    def collapsed(self):
+        """One 'thread;outer;...;inner count' line per distinct stack"""
+        lines = []
+        for (thread, stack), count in self.samples.most_common():
+            lines.append(';'.join([thread] + [_label(f) for f in stack]) + f" {count}")
+        return '\n'.join(lines) + '\n'
+
+    def top(self, limit=30):
+        """Functions by samples where they were running (self) and on the stack (total)"""
+        own, total = Counter(), Counter()
+        for (_, stack), count in self.samples.items():
+            if not stack:
+                continue
+            own[stack[-1]] += count
+            for func in set(stack):
+                total[func] += count
+        ticks = max(1, self.ticks)
+        lines = [f"{self.ticks} samples over {self.elapsed:.1f}s every {self.interval * 1000:.1f} ms, "
+                 f"{len({thread for thread, _ in self.samples})} threads (percent of ticks, summed over threads)",
+                 f"{'self%':>7} {'total%':>7}  function"]
+        for func, count in own.most_common(limit):
+            lines.append(f"{100.0 * count / ticks:7.1f} {100.0 * total[func] / ticks:7.1f}  {_label(func)}")
+        return '\n'.join(lines) + '\n'
+
+    def pstats_bytes(self):
+        """Samples as a marshalled pstats table (times are samples x interval); pstats.Stats(path) reads it"""
+        stats = {}
+        for (_, stack), count in self.samples.items():
+            if not stack:
+                continue
+            seconds = count * self.interval
+            seen = set()
+            for depth, func in enumerate(stack):
+                cc, nc, tt, ct, callers = stats.get(func, (0, 0, 0.0, 0.0, {}))
+                if func not in seen:
+                    # Cumulative time once per stack, however deep the recursion
+                    seen.add(func)
+                    cc += count
+                    ct += seconds
+                nc += count
+                if depth == len(stack) - 1:
+                    tt += seconds
+                if depth > 0:
+                    caller = stack[depth - 1]
+                    c_cc, c_nc, c_tt, c_ct = callers.get(caller, (0, 0, 0.0, 0.0))
+                    callers[caller] = (c_cc + count, c_nc + count,
+                                       c_tt + (seconds if depth == len(stack) - 1 else 0.0), c_ct + seconds)
+                stats[func] = (cc, nc, tt, ct, callers)
+        return marshal.dumps(stats)
+
+
+def _take_snapshot():
+    """tracemalloc snapshot without tracemalloc's own and the import machinery's traces"""
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+
+
+class MemoryTracker:
+    """tracemalloc snapshots, each diffed against the one before"""
+    def __init__(self):
+        self.previous = None
+        self.started_at = None
+
+    @property
+    def active(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=10):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self.started_at = time.time()
+        self.previous = _take_snapshot()
+        return self.status()
+
+    def snapshot(self, key_type='lineno', limit=25):
+        """Top allocation sites now and their growth since the previous snapshot"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running; start it first")
+        snapshot = _take_snapshot()
+        previous, self.previous = self.previous, snapshot
+        stats = snapshot.compare_to(previous, key_type) if previous is not None else snapshot.statistics(key_type)
+        top = []
+        for stat in stats[:limit]:
+            frame = stat.traceback[0]
+            top.append({
+                'location': f"{frame.filename}:{frame.lineno}",
+                'sizeKB': round(stat.size / 1024, 1),
+                'sizeDiffKB': round(getattr(stat, 'size_diff', 0) / 1024, 1),
+                'count': stat.count,
+                'countDiff': getattr(stat, 'count_diff', 0),
+            })
+        result = self.status()
+        result['top'] = top
+        result['diffed'] = previous is not None
+        return result
+
+    def stop(self):
+        tracemalloc.stop()
+        self.previous = None
+        self.started_at = None
+        return self.status()
+
+    def status(self):
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            'active': tracemalloc.is_tracing(),
+            'startedAt': self.started_at,
+            'tracedKB': round(current / 1024, 1),
+            'peakKB': round(peak / 1024, 1),
+        }
+
+
+#-----------------------------------------------------------------------------------------------
+# Flask routes
+#-----------------------------------------------------------------------------------------------
+_profile_lock = threading.Lock()
+memory_tracker = MemoryTracker()
+
+
+def register_debug_routes(app, token=None):
+    """Add /debug/profile and /debug/tracemalloc/<start|snapshot|stop> to a Flask app"""
+    from flask import jsonify, request, Response
+
+    def allowed():
+        if token:
+            return request.headers.get('X-Debug-Token', request.args.get('token')) == token
+        return request.remote_addr in ('127.0.0.1', '::1')
+
+    def forbidden():
+        return jsonify({'error': 'Debug endpoints need the debug token or a request from localhost'}), 403
+
+    def debug_profile():
+        """Sample all threads for ?seconds=N (default 10) every ?interval=ms; ?format=collapsed|top|pstats"""
+        if not allowed():
+            return forbidden()
+        try:
+            seconds = float(request.args.get('seconds', 10))
+            interval = float(request.args.get('interval', 5)) / 1000.0
+        except ValueError:
+            return jsonify({'error': 'seconds and interval must be numbers'}), 400
+        if not 0 < seconds <= MAX_PROFILE_SECONDS or not 0.001 <= interval <= 1.0:
+            return jsonify({'error': f'seconds must be in (0, {MAX_PROFILE_SECONDS}], interval in [1, 1000] ms'}), 400
+        fmt = request.args.get('format', 'collapsed')
+        if fmt not in ('collapsed', 'top', 'pstats'):
+            return jsonify({'error': 'format must be collapsed, top or pstats'}), 400
+        if not _profile_lock.acquire(blocking=False):
+            return jsonify({'error': 'A profile is already running'}), 409
+        try:
+            profiler = SamplingProfiler(interval).run(seconds)
+        finally:
+            _profile_lock.release()
+        if fmt == 'pstats':
+            return Response(profiler.pstats_bytes(), mimetype='application/octet-stream',
+                            headers={'Content-Disposition': 'attachment; filename=profile.pstats'})
+        return Response(profiler.collapsed() if fmt == 'collapsed' else profiler.top(), mimetype='text/plain')
+
+    def debug_tracemalloc(action):
+        """POST start (?frames=N), snapshot (?limit=N, ?key=lineno|filename|traceback) or stop; GET status"""
+        if not allowed():
+            return forbidden()
+        if action in ('start', 'snapshot', 'stop') and request.method != 'POST':
+            return jsonify({'error': f'tracemalloc {action} changes state, use POST'}), 405
+        try:
+            if action == 'start':
+                return jsonify(memory_tracker.start(int(request.args.get('frames', 10))))
+            if action == 'snapshot':
+                return jsonify(memory_tracker.snapshot(request.args.get('key', 'lineno'),
+                                                       int(request.args.get('limit', 25))))
+            if action == 'stop':
+                return jsonify(memory_tracker.stop())
+            if action == 'status':
+                return jsonify(memory_tracker.status())
+        except (RuntimeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'error': f'Unknown action {action}'}), 404
+
+    app.add_url_rule('/debug/profile', 'debug_profile', debug_profile, methods=['GET', 'POST'])
+    app.add_url_rule('/debug/tracemalloc/<action>', 'debug_tracemalloc', debug_tracemalloc, methods=['GET', 'POST'])
@@ -0,0 +1,440 @@
+#!/usr/bin/env python
+"""
+search_strategies - where the pan/tilt head looks while no face is tracked
+
+The scanning thread asks a strategy for one servo target at a time and how
+long to hold it:
+    raster     the original sweep: 0.5 deg pan steps, a 5 deg tilt bump at each edge
+    grid       coarse-to-fine views one field of view apart (less an overlap), visited
+               in a serpentine from the row nearest the current tilt; every other pass
+               is offset by half a view to cover the seams between views
+    last-seen  the ring of views around where the face was last seen, in its direction
+               of travel first, then the grid; straight to the grid once the memory is stale
+    motion     the grid, but frames taken while the head holds still are differenced
+               and the head steers to the centre of any change before moving on
+
+Every strategy measures time-to-acquire: from the moment a search starts (startup
+or a lost face) to the first valid detection. The simulation compares them on a
+head, camera and person model:
+
+    python search_strategies.py                          # all strategies, person stepped out of view
+    python search_strategies.py --scenario random --trials 500
+    python search_strategies.py --strategies raster,last-seen --output search.json
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from collections import deque
+from threading import Event
+
+import numpy as np
+
+
+def _linspace(lo, hi, step):
+    """Evenly spaced centres from lo to hi, at most step apart"""
+    count = max(1, int(math.ceil((hi - lo) / step - 1e-9)) + 1) if hi > lo else 1
+    if count == 1:
+        return [(lo + hi) / 2.0]
+    return [lo + (hi - lo) * i / (count - 1) for i in range(count)]
+
+
+def _midpoints(values):
+    return [(a + b) / 2.0 for a, b in zip(values, values[1:])] or list(values)
+
+
+#-----------------------------------------------------------------------------------------------
+class SearchStrategy:
+    """
+    Base strategy: next() returns (pan, tilt, hold seconds). start() begins a search and
+    acquired() ends it, recording the time-to-acquire.
+    """
+    name = 'base'
+    uses_motion = False
+
+    def __init__(self, pan_range=(0, 180), tilt_range=(20, 90), fov=(62.2, 48.8), overlap=0.15,
+                 dwell=0.4, servo_speed=300.0, window=200):
+        self.pan_min, self.pan_max = pan_range
+        self.tilt_min, self.tilt_max = tilt_range
+        self.fov_h, self.fov_v = fov
+        self.overlap = overlap
+        self.dwell = dwell                  # seconds to hold a view once the servos got there
+        self.servo_speed = servo_speed      # degrees per second, for the travel part of a hold
+        self.search_started = None
+        self.reason = None
+        self.searches = 0
+        self.acquire_times = deque(maxlen=window)     # (reason, seconds)
+        self._wake = Event()
+
+    def clamp(self, pan, tilt):
+        return (max(self.pan_min, min(self.pan_max, pan)), max(self.tilt_min, min(self.tilt_max, tilt)))
+
+    def start(self, pan, tilt, reason='lost', now=None):
+        """A search begins at the current head position"""
+        self.search_started = time.time() if now is None else now
+        self.reason = reason
+        self.searches += 1
+        self._plan(pan, tilt, self.search_started)
+
+    def acquired(self, now=None):
+        """A face was found: returns the seconds the search took (None when no search was running)"""
+        if self.search_started is None:
+            return None
+        seconds = (time.time() if now is None else now) - self.search_started
+        self.acquire_times.append((self.reason, seconds))
+        self.search_started = None
+        return seconds
+
+    def next(self, pan, tilt, now=None):
+        raise NotImplementedError
+
+    def face_seen(self, pan, tilt, now=None):
+        """Angular position of a tracked face (servo angles that would centre it)"""
+
+    def observe_frame(self, gray, capture_ts):
+        """Grayscale frame taken while searching, for strategies that use motion"""
+
+    def wait(self, seconds):
+        """Sleep for a hold; returns early when the strategy has a more urgent target"""
+        if self._wake.wait(seconds):
+            self._wake.clear()
+
+    def _plan(self, pan, tilt, now):
+        pass
+
+    def _hold(self, pan, tilt, to_pan, to_tilt):
+        return self.dwell + max(abs(to_pan - pan), abs(to_tilt - tilt)) / self.servo_speed
+
+    def stats(self):
+        times = [seconds for _, seconds in self.acquire_times]
+        result = {
+            'strategy': self.name,
+            'searches': self.searches,
+            'searching': self.search_started is not None,
+            'searchingFor': round(time.time() - self.search_started, 2) if self.search_started is not None else None,
+            'acquired': len(times),
+        }
+        if times:
+            p50, p95 = np.percentile(times, [50, 95])
+            result.update({'meanS': round(float(np.mean(times)), 2), 'p50S': round(float(p50), 2),
+                           'p95S': round(float(p95), 2), 'maxS': round(max(times), 2)})
+            by_reason = {}
+            for reason, seconds in self.acquire_times:
+                by_reason.setdefault(reason, []).append(seconds)
+            result['byReason'] = {reason: {'count': len(values), 'meanS': round(float(np.mean(values)), 2)}
+                                  for reason, values in by_reason.items()}
+        return result
+
+
+class RasterSearch(SearchStrategy):
+    """The original sweep, kept as the default"""
+    name = 'raster'
+
+    def __init__(self, pan_step=0.5, tilt_step=5.0, **kwargs):
+        SearchStrategy.__init__(self, **kwargs)
+        self.pan_step = pan_step
+        self.tilt_step = tilt_step
+        self.pan_direction = 1
+
+    def next(self, pan, tilt, now=None):
+        pan += self.pan_step * self.pan_direction
+        if pan >= self.pan_max or pan <= self.pan_min:
+            pan = self.pan_max if pan >= self.pan_max else self.pan_min
+            self.pan_direction = -self.pan_direction
+            tilt += self.tilt_step
+            if tilt > self.tilt_max:
+                tilt = self.tilt_min
+        return pan, tilt, 0.0
+
+
+class GridSearch(SearchStrategy):
+    """Views one field of view apart; alternate passes offset by half a view"""
+    name = 'grid'
+
+    def __init__(self, **kwargs):
+        SearchStrategy.__init__(self, **kwargs)
+        pan_step = self.fov_h * (1.0 - self.overlap)
+        tilt_step = self.fov_v * (1.0 - self.overlap)
+        pans = _linspace(self.pan_min, self.pan_max, pan_step)
+        tilts = _linspace(self.tilt_min, self.tilt_max, tilt_step)
+        self.passes = [(pans, tilts), (_midpoints(pans), _midpoints(tilts))]
+        self.pass_index = 0
+        self.queue = deque()
+
+    def _grid_pass(self, pan, tilt):
+        """One serpentine pass, starting with the row and end nearest (pan, tilt)"""
+        pans, tilts = self.passes[self.pass_index % len(self.passes)]
+        self.pass_index += 1
+        views = []
+        for row in sorted(tilts, key=lambda t: abs(t - tilt)):
+            # Sweep each row from the end nearer the previous view
+            views.extend((p, row) for p in sorted(pans, reverse=abs(pans[-1] - pan) < abs(pans[0] - pan)))
+            pan = views[-1][0]
+        return views
+
+    def _plan(self, pan, tilt, now):
+        self.pass_index = 0
+        self.queue = deque(self._grid_pass(pan, tilt))
+
+    def next(self, pan, tilt, now=None):
+        if not self.queue:
+            self.queue.extend(self._grid_pass(pan, tilt))
+        to_pan, to_tilt = self.clamp(*self.queue.popleft())
+        return to_pan, to_tilt, self._hold(pan, tilt, to_pan, to_tilt)
+
+
+class LastSeenSearch(GridSearch):
+    """Where the face was last seen, then the views around it, then the grid"""
+    name = 'last-seen'
+
+    def __init__(self, memory=30.0, rings=1, **kwargs):
+        GridSearch.__init__(self, **kwargs)
+        self.memory = memory            # seconds a last sighting is worth searching around
+        self.rings = rings
+        self.last_seen = None           # (pan, tilt, time)
+        self.velocity = (0.0, 0.0)      # degrees per second, smoothed
+
+    def face_seen(self, pan, tilt, now=None):
+        now = time.time() if now is None else now
+        if self.last_seen is not None:
+            dt = now - self.last_seen[2]
+            if 0 < dt < 1.0:
+                vp = (pan - self.last_seen[0]) / dt
+                vt = (tilt - self.last_seen[1]) / dt
+                self.velocity = (0.7 * self.velocity[0] + 0.3 * vp, 0.7 * self.velocity[1] + 0.3 * vt)
+            elif dt >= 1.0:
+                self.velocity = (0.0, 0.0)
+        self.last_seen = (pan, tilt, now)
+
+    def _plan(self, pan, tilt, now):
+        GridSearch._plan(self, pan, tilt, now)
+        if self.last_seen is None or now - self.last_seen[2] > self.memory:
+            return
+        base_pan, base_tilt, _ = self.last_seen
+        step_p = self.fov_h * (1.0 - self.overlap)
+        step_t = self.fov_v * (1.0 - self.overlap)
+        vp, vt = self.velocity
+        speed = math.hypot(vp, vt)
+
+        def priority(view):
+            dp, dt = view[0] - base_pan, view[1] - base_tilt
+            # Along the direction of travel first; without one, sideways before up and down
+            along = (dp * vp + dt * vt) / (math.hypot(dp, dt) * speed) if speed > 2.0 else 0.0
+            return (-along, abs(dt) > 0, math.hypot(dp, dt))
+
+        views = [self.clamp(base_pan, base_tilt)]
+        for ring in range(1, self.rings + 1):
+            ring_views = [(base_pan + i * step_p, base_tilt + j * step_t)
+                          for i in range(-ring, ring + 1) for j in range(-ring, ring + 1)
+                          if max(abs(i), abs(j)) == ring]
+            for view in sorted(ring_views, key=priority):
+                view = self.clamp(*view)
+                if view not in views:
+                    views.append(view)
+        self.queue.extendleft(reversed(views))
+
+
+class MotionSearch(GridSearch):
+    """The grid, steered towards changes seen while the head holds still"""
+    name = 'motion'
+    uses_motion = True
+
+    def __init__(self, threshold=25, min_fraction=0.003, settle=0.15, max_steers=3,
+                 thumb_size=(64, 48), **kwargs):
+        GridSearch.__init__(self, **kwargs)
+        self.threshold = threshold          # gray-level change counted as motion
+        self.min_fraction = min_fraction    # share of the thumbnail that has to change
+        self.settle = settle                # seconds after arriving before frames are trusted
+        self.max_steers = max_steers        # steers in a row before the grid takes over again
+        self.thumb_size = thumb_size
+        self.view = None                    # (pan, tilt) currently held
+        self.settled_at = float('inf')
+        self.steers = 0
+        self.pending = None
+        self._thumb = None
+
+    def _plan(self, pan, tilt, now):
+        GridSearch._plan(self, pan, tilt, now)
+        self.view = (pan, tilt)
+        self.settled_at = now + self.settle
+        self.steers = 0
+        self.pending = None
+        self._thumb = None
+
+    def next(self, pan, tilt, now=None):
+        now = time.time() if now is None else now
+        if self.pending is not None:
+            to_pan, to_tilt = self.pending
+            self.pending = None
+            hold = self._hold(pan, tilt, to_pan, to_tilt)
+        else:
+            self.steers = 0
+            to_pan, to_tilt, hold = GridSearch.next(self, pan, tilt, now)
+        self.view = (to_pan, to_tilt)
+        self.settled_at = now + hold - self.dwell + self.settle
+        self._thumb = None
+        return to_pan, to_tilt, hold
+
+    def observe_frame(self, gray, capture_ts):
+        import cv2
+        if capture_ts is None or capture_ts < self.settled_at or self.pending is not None:
+            return
+        thumb = cv2.resize(gray, self.thumb_size, interpolation=cv2.INTER_AREA)
+        previous, self._thumb = self._thumb, thumb
+        if previous is None:
+            return
+        mask = cv2.absdiff(thumb, previous) > self.threshold
+        fraction = float(mask.mean())
+        if fraction < self.min_fraction:
+            return
+        ys, xs = np.nonzero(mask)
+        self.observe_motion(xs.mean() / mask.shape[1], ys.mean() / mask.shape[0], fraction)
+
+    def observe_motion(self, x, y, strength=1.0):
+        """Change centred at (x, y), fractions of the frame, in the view being held"""
+        if self.view is None or self.steers >= self.max_steers:
+            return
+        pan, tilt = self.view
+        # Same sign conventions as the tracking code: left of centre is a larger pan angle
+        target = self.clamp(pan + (0.5 - x) * self.fov_h, tilt - (0.5 - y) * self.fov_v)
+        self.steers += 1
+        self.pending = target
+        self._wake.set()
+
+
+STRATEGIES = {cls.name: cls for cls in (RasterSearch, GridSearch, LastSeenSearch, MotionSearch)}
+
+
+def create_strategy(name, **kwargs):
+    """Strategy by name ('raster', 'grid', 'last-seen', 'motion'); unknown options are rejected"""
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown search strategy {name}, expected one of {', '.join(STRATEGIES)}")
+    return STRATEGIES[name](**kwargs)
+
+
+#-----------------------------------------------------------------------------------------------
+# Simulation
+#-----------------------------------------------------------------------------------------------
+def simulate(strategy, scenario, rng, fps=10.0, scan_interval=0.02, detect_prob=0.8, blur_limit=90.0,
+             margin=0.8, timeout=120.0, tick=0.01):
+    """
+    One search on a simulated head: the scanning thread asks for targets as emoweb's does, the
+    servos slew at the strategy's servo_speed, and on every camera frame a face inside margin of
+    the view is detected with probability detect_prob unless the head turns faster than
+    blur_limit deg/s. Returns the time-to-acquire, None on timeout.
+    """
+    pan_lo, pan_hi, tilt_lo, tilt_hi = strategy.pan_min, strategy.pan_max, strategy.tilt_min, strategy.tilt_max
+    half_h, half_v = strategy.fov_h / 2.0 * margin, strategy.fov_v / 2.0 * margin
+    if scenario == 'random':
+        # Someone anywhere the head can see, sitting still, when tracking starts
+        face = [rng.uniform(pan_lo, pan_hi), rng.uniform(tilt_lo, tilt_hi)]
+        velocity, walk_until = (0.0, 0.0), 0.0
+        pan, tilt = rng.uniform(pan_lo, pan_hi), rng.uniform(tilt_lo, tilt_hi)
+        reason = 'startup'
+    else:
+        # A tracked person walks out of view, mostly sideways, and keeps walking for a while
+        pan, tilt = rng.uniform(pan_lo + 30, pan_hi - 30), rng.uniform(tilt_lo, tilt_hi)
+        angle = rng.gauss(0.0, 0.35) + (math.pi if rng.random() < 0.5 else 0.0)
+        speed = rng.uniform(10.0, 40.0)
+        velocity = (speed * math.cos(angle), speed * math.sin(angle))
+        for i in range(3, -1, -1):
+            strategy.face_seen(pan - velocity[0] * 0.1 * i, tilt - velocity[1] * 0.1 * i, -0.1 * i)
+        exit_t = 1.05 * min(half_h / max(abs(velocity[0]), 1e-6), half_v / max(abs(velocity[1]), 1e-6))
+        face = [pan + velocity[0] * exit_t, tilt + velocity[1] * exit_t]
+        walk_until = rng.uniform(0.5, 3.0)
+        reason = 'lost'
+
+    strategy.start(pan, tilt, reason, now=0.0)
+    target = (pan, tilt)
+    next_step = 0.0
+    next_frame = 1.0 / fps
+    t = 0.0
+    while t < timeout:
+        if t >= next_step:
+            to_pan, to_tilt, hold = strategy.next(pan, tilt, now=t)
+            target = (to_pan, to_tilt)
+            next_step = t + max(scan_interval, hold)
+        distance = max(abs(target[0] - pan), abs(target[1] - tilt))
+        step = min(1.0, strategy.servo_speed * tick / distance) if distance > 0 else 1.0
+        pan += (target[0] - pan) * step
+        tilt += (target[1] - tilt) * step
+        turn_rate = distance * step / tick
+        if t < walk_until:
+            face[0] = min(pan_hi + strategy.fov_h / 2, max(pan_lo - strategy.fov_h / 2, face[0] + velocity[0] * tick))
+            face[1] = min(tilt_hi + strategy.fov_v / 2, max(tilt_lo - strategy.fov_v / 2, face[1] + velocity[1] * tick))
+        t += tick
+        if t < next_frame:
+            continue
+        next_frame += 1.0 / fps
+        dx, dy = face[0] - pan, face[1] - tilt
+        if abs(dx) <= half_h and abs(dy) <= half_v and turn_rate <= blur_limit and rng.random() < detect_prob:
+            return strategy.acquired(now=t)
+        if strategy.uses_motion and t < walk_until and t >= strategy.settled_at \
+                and abs(dx) <= strategy.fov_h / 2 and abs(dy) <= strategy.fov_v / 2:
+            # A walking person is the change a frame difference would find
+            strategy.observe_motion(0.5 - dx / strategy.fov_h, 0.5 + dy / strategy.fov_v)
+            if strategy.pending is not None:
+                next_step = t       # the scanning thread is woken early
+    strategy.search_started = None
+    return None
+
+
+def summarize_seconds(values, trials):
+    if not values:
+        return {'trials': trials, 'acquired': 0}
+    arr = np.asarray(values)
+    p50, p95 = np.percentile(arr, [50, 95])
+    return {
+        'trials': trials,
+        'acquired': int(arr.size),
+        'timeouts': trials - int(arr.size),
+        'mean_s': round(float(arr.mean()), 3),
+        'p50_s': round(float(p50), 3),
+        'p95_s': round(float(p95), 3),
+        'max_s': round(float(arr.max()), 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare face search strategies by simulated time-to-acquire')
+    parser.add_argument('--strategies', default=','.join(STRATEGIES))
+    parser.add_argument('--scenario', choices=('lost', 'random'), default='lost',
+                        help='lost: a tracked person walked out of view; random: someone anywhere at startup')
+    parser.add_argument('--trials', type=int, default=200)
+    parser.add_argument('--fps', type=float, default=10.0, help='vision loop rate')
+    parser.add_argument('--fov', default='62.2x48.8', help='camera field of view HxV in degrees')
+    parser.add_argument('--overlap', type=float, default=0.15, help='share of a view repeated by its neighbour')
+    parser.add_argument('--dwell', type=float, default=0.4, help='seconds a view is held')
+    parser.add_argument('--timeout', type=float, default=120.0, help='seconds before a search counts as failed')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    fov = tuple(float(v) for v in args.fov.lower().split('x'))
+    report = {'scenario': args.scenario, 'fps': args.fps, 'fov': list(fov), 'strategies': {}}
+    for name in args.strategies.split(','):
+        rng = random.Random(args.seed)
+        times = []
+        for _ in range(args.trials):
+            options = {'fov': fov}
+            if name != 'raster':
+                options.update(overlap=args.overlap, dwell=args.dwell)
+            seconds = simulate(create_strategy(name, **options), args.scenario, rng, fps=args.fps,
+                               timeout=args.timeout)
+            if seconds is not None:
+                times.append(seconds)
+        report['strategies'][name] = summarize_seconds(times, args.trials)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Shared fixtures: the prototype modules are flat scripts, so their directory goes on sys.path,
+and emoweb.py is imported once against the hw_stubs stand-ins.
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+PROTO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROTO_DIR not in sys.path:
+    sys.path.insert(0, PROTO_DIR)
+
+
+class FakeClock:
+    """time module stand-in whose time() only moves when advance() is called"""
+    def __init__(self, start=1_000_000.0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+class CountingDetector:
+    """face detector stand-in: counts searches and returns the faces it is told to"""
+    name = 'counting'
+
+    def __init__(self):
+        self.calls = 0
+        self.faces = []
+
+    def detect(self, gray, scale_factor=None, min_neighbors=None, min_size=None):
+        self.calls += 1
+        return list(self.faces)
+
+
+@pytest.fixture(scope='session')
+def emoweb_module():
+    import hw_stubs
+    return hw_stubs.load_emoweb()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def detector():
+    return CountingDetector()
+
+
+@pytest.fixture
+def emoweb(emoweb_module, clock, detector, monkeypatch):
+    """emoweb on a fake clock, with the counting face detector and no power governor or event store"""
+    monkeypatch.setattr(emoweb_module, 'time', clock)
+    monkeypatch.setattr(emoweb_module.vision, 'detector', detector)
+    monkeypatch.setattr(emoweb_module, 'power_governor', None)
+    monkeypatch.setattr(emoweb_module, 'event_store', None)
+    return emoweb_module
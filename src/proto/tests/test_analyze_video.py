@@ -0,0 +1,20 @@
+"""Offline video analysis: shard planning"""
+
+from analyze_video import plan_shards
+
+
+def test_shards_cover_range_contiguously():
+    shards = plan_shards(10, 1000, 300, 1)
+    assert shards[0][0] == 10 and shards[-1][1] == 1000
+    assert all(a[1] == b[0] for a, b in zip(shards, shards[1:]))
+
+
+def test_shard_length_is_a_multiple_of_stride():
+    shards = plan_shards(0, 1000, 250, 3)
+    assert all((end - start) % 3 == 0 for start, end in shards[:-1])
+    sampled = [i for start, end in shards for i in range(start, end) if (i - start) % 3 == 0]
+    assert sampled == list(range(0, 1000, 3))
+
+
+def test_shard_never_shorter_than_stride():
+    assert plan_shards(0, 20, 2, 5) == [(0, 5), (5, 10), (10, 15), (15, 20)]
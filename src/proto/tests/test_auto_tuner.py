@@ -0,0 +1,65 @@
+"""Auto-tuner ladder and its steps against the FPS budget"""
+
+from auto_tuner import DEFAULT_BOUNDS, AutoTuner, DetectionParams, build_ladder
+
+
+def feed(tuner, loop_ms, frames=None):
+    changed = False
+    for _ in range(frames or tuner.window):
+        changed = tuner.record(loop_ms, loop_ms / 2) or changed
+    return changed
+
+
+def test_ladder_runs_from_accurate_to_cheap():
+    ladder = build_ladder(levels=8)
+    assert len(ladder) == 8
+    for key in DEFAULT_BOUNDS:
+        assert (getattr(ladder[0], key), getattr(ladder[-1], key)) == DEFAULT_BOUNDS[key]
+    assert [p.detect_every for p in ladder] == sorted(p.detect_every for p in ladder)
+
+
+def test_starts_at_level_nearest_configured_scale_factor():
+    tuner = AutoTuner(10, start_params=DetectionParams(scale_factor=1.3), verbose=False)
+    assert tuner.level == len(tuner.ladder) - 1
+
+
+def test_steps_cheaper_when_slow_and_waits_a_window():
+    tuner = AutoTuner(10, verbose=False)
+    start = tuner.level
+    assert feed(tuner, 200.0)                   # 5 fps against 10
+    assert tuner.level == start + 1
+    assert not feed(tuner, 200.0, tuner.window - 1)
+    assert feed(tuner, 200.0, 1)
+    assert tuner.level == start + 2
+    assert tuner.stats()['log'][-1]['reason'] == 'below target'
+
+
+def test_stops_at_cheapest_level():
+    tuner = AutoTuner(10, verbose=False)
+    for _ in range(len(tuner.ladder) + 2):
+        feed(tuner, 1000.0)
+    assert tuner.level == len(tuner.ladder) - 1
+    assert tuner.params.detect_every == DEFAULT_BOUNDS['detect_every'][1]
+
+
+def test_steps_finer_with_headroom():
+    tuner = AutoTuner(10, start_params=DetectionParams(scale_factor=1.3), verbose=False)
+    assert feed(tuner, 20.0)                    # 50 fps against 10
+    assert tuner.level == len(tuner.ladder) - 2
+
+
+def test_does_not_retry_a_level_measured_too_slow():
+    tuner = AutoTuner(10, retry_after=60.0, verbose=False)
+    start = tuner.level
+    feed(tuner, 200.0)
+    assert tuner.level == start + 1
+    # Plenty of headroom now, but start was too slow a moment ago
+    assert not feed(tuner, 20.0)
+    assert tuner.level == start + 1
+
+
+def test_holds_within_tolerance():
+    tuner = AutoTuner(10, verbose=False)
+    start = tuner.level
+    assert not feed(tuner, 1000.0 / 10.5, tuner.window * 3)
+    assert tuner.level == start
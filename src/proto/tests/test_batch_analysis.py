@@ -0,0 +1,46 @@
+"""Still-image analysis: decoded uploads are BGR, like every other colour frame"""
+
+import cv2
+import numpy as np
+
+from emotion_cache import dhash
+
+
+def blue_red_crop():
+    """Left half pure blue, right half pure red, in cv2's BGR order"""
+    crop = np.zeros((64, 64, 3), dtype=np.uint8)
+    crop[:, :32] = (255, 0, 0)
+    crop[:, 32:] = (0, 0, 255)
+    return crop
+
+
+def test_preprocess_faces_reads_bgr(emoweb):
+    crop = blue_red_crop()
+    stack = emoweb.preprocess_faces([crop], (48, 48))
+    expected = cv2.resize(cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY), (48, 48)).astype(np.float32) / 255.0
+    np.testing.assert_allclose(stack[0, ..., 0], expected, atol=1e-6)
+    # Red is brighter than blue in gray, not the other way round
+    assert stack[0, 24, 40, 0] > stack[0, 24, 8, 0]
+
+
+def test_dhash_of_colour_crop_matches_its_gray():
+    crop = blue_red_crop()
+    assert dhash(crop) == dhash(cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY))
+
+
+def test_batch_and_single_crop_classification_agree(emoweb, monkeypatch):
+    monkeypatch.setattr(emoweb, 'emotion_cache', None)
+    rng = np.random.default_rng(1)
+    crops = [rng.integers(0, 256, size=(60, 50, 3), dtype=np.uint8) for _ in range(5)] + [blue_red_crop()]
+    single = [emoweb.detect_emotion(crop) for crop in crops]
+    batch = emoweb.detect_emotions_batch(crops)
+    assert [idx for idx, _ in batch] == [int(idx) for idx, _ in single]
+    # The single-crop path resizes before converting to gray, the batch path after
+    np.testing.assert_allclose([conf for _, conf in batch], [conf for _, conf in single], atol=0.5)
+
+
+def test_analyze_images_decodes_uploads(emoweb):
+    ok, png = cv2.imencode('.png', blue_red_crop())
+    results = list(emoweb.analyze_images([('a.png', png.tobytes()), ('bad.jpg', b'not an image')]))
+    assert results[0] == {'name': 'a.png', 'width': 64, 'height': 64, 'faces': []}
+    assert results[1]['error'] == 'Cannot decode image'
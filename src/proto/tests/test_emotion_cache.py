@@ -0,0 +1,43 @@
+"""dHash emotion cache: near matches, expiry and LRU eviction"""
+
+import numpy as np
+
+from emotion_cache import EmotionCache, dhash, hamming
+
+
+def face(seed=0):
+    return np.random.default_rng(seed).integers(0, 256, size=(48, 48), dtype=np.uint8)
+
+
+def test_dhash_stable_under_small_noise():
+    crop = face()
+    noisy = np.clip(crop.astype(int) + np.random.default_rng(1).integers(-2, 3, crop.shape), 0, 255).astype(np.uint8)
+    assert hamming(dhash(crop), dhash(noisy)) <= 4
+    assert hamming(dhash(crop), dhash(face(2))) > 4
+
+
+def test_near_hit_and_miss():
+    cache = EmotionCache(max_distance=2)
+    cache.store(0b1111, 3, 80.0, now=0.0)
+    assert cache.lookup(0b1111, now=0.1) == (3, 80.0)
+    assert cache.lookup(0b1101, now=0.1) == (3, 80.0)
+    assert cache.lookup(0b0000, now=0.1) is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['nearHits'], stats['misses']) == (2, 1, 1)
+
+
+def test_entries_expire():
+    cache = EmotionCache(max_age=2.0)
+    cache.store(1, 3, 80.0, now=0.0)
+    assert cache.lookup(1, now=2.5) is None
+    assert cache.stats()['expired'] == 1 and cache.stats()['size'] == 0
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = EmotionCache(capacity=2, max_distance=0)
+    cache.store(1, 0, 10.0, now=0.0)
+    cache.store(2, 0, 10.0, now=0.0)
+    cache.lookup(1, now=0.1)
+    cache.store(3, 0, 10.0, now=0.2)
+    assert cache.lookup(2, now=0.3) is None
+    assert cache.lookup(1, now=0.3) is not None
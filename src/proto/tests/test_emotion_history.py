@@ -0,0 +1,66 @@
+"""In-memory emotion history ring, histograms and request parsing"""
+
+import time
+
+import pytest
+
+from emotion_history import MAX_LIMIT, EmotionHistory, parse_history_args
+
+
+@pytest.mark.parametrize('raw, expected', [('50', 50), ('999999', MAX_LIMIT), ('-5', 1), ('', MAX_LIMIT)])
+def test_parse_history_limit_is_clamped(raw, expected):
+    assert parse_history_args({'limit': raw})[2] == expected
+
+
+def make_history(capacity=8):
+    return EmotionHistory(capacity=capacity, num_emotions=7, second_buckets=120, minute_buckets=10)
+
+
+def test_ring_keeps_newest_capacity_records():
+    history = make_history(capacity=8)
+    for i in range(20):
+        history.append(i % 7, 50.0, face_id=i, capture_ts=1000.0 + i)
+    rows = history.since(0)
+    assert list(rows['face_id']) == list(range(12, 20))
+    assert history.stats()['stored'] == 8 and history.stats()['total'] == 20
+    assert history.oldest_timestamp() == rows['timestamp'][0]
+
+
+def test_out_of_order_captures_still_slice_correctly():
+    history = make_history(capacity=8)
+    now = time.time()
+    # Cameras on the worker pool finish out of capture order, and the ring wraps
+    for i, lag in enumerate([0.0, 0.3, 0.1, 0.5, 0.2, 0.0, 0.4, 0.1, 0.3, 0.2, 0.0]):
+        history.append(i % 7, 50.0, face_id=i, capture_ts=now - lag, camera=i % 2)
+    rows = history.since(0)
+    assert all(rows['timestamp'][1:] >= rows['timestamp'][:-1])
+    cut = rows['timestamp'][4]
+    assert list(history.since(cut)['face_id']) == list(rows['face_id'][4:])
+    assert len(history.since(0, limit=3)) == 3
+
+
+def test_histograms_bucket_by_capture_time():
+    history = make_history()
+    for ts, emotion in [(60.0, 0), (60.5, 0), (61.2, 3), (125.0, 3)]:
+        history.append(emotion, 50.0, capture_ts=ts)
+    starts, counts = history.histogram('second', 0)
+    assert list(starts) == [60, 61, 125]
+    assert counts[0][0] == 2 and counts[1][3] == 1
+    starts, counts = history.histogram('minute', 0)
+    assert list(starts) == [60, 120]
+    assert list(counts.sum(axis=1)) == [3, 1]
+
+
+def test_query_shapes():
+    history = make_history()
+    history.append(2, 75.0, capture_ts=100.0)
+    raw = history.query(resolution='raw', labels=['a'] * 7)
+    assert raw['records']['emotion_idx'] == [2] and raw['records']['capture_ts'] == [100.0]
+    assert history.query(resolution='minute')['buckets']['start'] == [60]
+    with pytest.raises(ValueError):
+        history.query(resolution='hour')
+
+
+def test_relative_since():
+    since = parse_history_args({'since': '-300'})[0]
+    assert abs(since - (time.time() - 300)) < 1.0
@@ -0,0 +1,58 @@
+"""SQLite event store: batched writes, range queries, row cap and retention"""
+
+import time
+
+import pytest
+
+from event_store import COLUMNS, MAX_QUERY_ROWS, EventStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(str(tmp_path / 'events.db'), flush_interval=0.01, retention_days=None).start()
+    yield store
+    store.stop()
+
+
+def fill(store, count, start=1000.0):
+    for i in range(count):
+        store.record(start + i, face_id=i % 3, emotion_idx=i % 7, confidence=50.0, pan=90.0, tilt=None,
+                     frame_seq=i, camera=0)
+    store.stop()
+
+
+def test_query_returns_columns_oldest_first(store):
+    fill(store, 10)
+    rows = store.query(since=1003.0, until=1007.0)
+    assert set(rows) == set(COLUMNS)
+    assert rows['timestamp'] == [1003.0, 1004.0, 1005.0, 1006.0]
+    assert rows['tilt'] == [None] * 4
+    assert store.stats()['written'] == 10
+
+
+def test_query_limit_keeps_newest(store):
+    fill(store, 10)
+    assert store.query(limit=3)['frame_seq'] == [7, 8, 9]
+
+
+@pytest.mark.parametrize('limit, expected', [(10 ** 9, MAX_QUERY_ROWS), (0, 1), (-1, 1)])
+def test_query_limit_is_clamped(store, limit, expected):
+    fill(store, MAX_QUERY_ROWS + 50)
+    rows = store.query(limit=limit)
+    assert len(rows['timestamp']) == expected
+    assert rows['frame_seq'][-1] == MAX_QUERY_ROWS + 49
+
+
+def test_prune_drops_rows_past_retention(tmp_path):
+    store = EventStore(str(tmp_path / 'events.db'), flush_interval=0.01, retention_days=1).start()
+    now = time.time()
+    store.record(now - 2 * 86400, 0, 0, 50.0)
+    store.record(now, 0, 1, 50.0)
+    store.stop()
+    conn = store._connect()
+    try:
+        store._prune(conn)
+    finally:
+        conn.close()
+    assert store.query()['emotion_idx'] == [1]
+    assert store.pruned == 1
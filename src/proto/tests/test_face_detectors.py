@@ -0,0 +1,40 @@
+"""Face detector backends: construction and sharing one instance between threads"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import pytest
+
+from face_detectors import DEFAULT_PATHS, HaarChainDetector, create_detector
+from frame_sources import SyntheticStream
+
+
+def test_haar_shared_between_threads_matches_serial():
+    detector = HaarChainDetector()
+    stream = SyntheticStream(resolution=(320, 240))
+    # Different sizes, as live frames and downscaled batch uploads interleave
+    images = [cv2.cvtColor(stream.render(i), cv2.COLOR_BGR2GRAY) for i in range(4)]
+    images += [cv2.resize(image, (160, 120)) for image in images]
+    serial = [detector.detect(image) for image in images]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert list(pool.map(detector.detect, images * 2)) == serial * 2
+
+
+def test_haar_detects_nothing_on_blank_image():
+    assert HaarChainDetector().detect(np.zeros((120, 160), dtype=np.uint8)) == []
+
+
+def test_create_haar_from_one_path():
+    detector = create_detector('haar', DEFAULT_PATHS['haar'][0])
+    assert len(detector.cascades) == 1
+
+
+def test_create_haar_from_path_list():
+    detector = create_detector('haar', list(DEFAULT_PATHS['haar'][:2]))
+    assert len(detector.cascades) == 2
+
+
+def test_missing_lbp_cascade_fails_clearly(tmp_path):
+    with pytest.raises(IOError, match='FACE_DETECTOR_PATHS'):
+        create_detector('lbp', str(tmp_path / 'missing.xml'))
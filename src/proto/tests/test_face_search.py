@@ -0,0 +1,82 @@
+"""Face search scheduling in EmotionEngine.process_frame: searches must never stop for good"""
+
+import numpy as np
+
+from auto_tuner import DEFAULT_BOUNDS
+from frame_sources import SyntheticStream
+
+
+def make_camera(emoweb, fps):
+    engine = emoweb.EmotionEngine(show_window=False, actuators=False, cameras=[])
+    ctx = emoweb.CameraContext('cam0', SyntheticStream(framerate=fps), servo=False)
+    return engine, ctx
+
+
+def run_frames(engine, ctx, clock, frames, fps, make_frame):
+    for i in range(frames):
+        clock.advance(1.0 / fps)
+        ctx.last_seq += 1
+        engine.process_frame(ctx, make_frame(i), ctx.last_seq, clock.time())
+
+
+def still_frame(i):
+    return np.full((480, 640, 3), 80, dtype=np.uint8)
+
+
+def changing_frame(i):
+    frame = still_frame(i)
+    frame[:, (i * 40) % 600:(i * 40) % 600 + 40] = 220
+    return frame
+
+
+def test_motion_gate_resumes_search_when_still_scene_changes(emoweb, clock, detector, monkeypatch):
+    monkeypatch.setattr(emoweb, 'MOTION_GATE_THRESHOLD', 2.0)
+    engine, ctx = make_camera(emoweb, fps=10)
+
+    # Still, empty scene for well over timer_face: one search, then gated
+    run_frames(engine, ctx, clock, 50, 10, still_frame)
+    assert detector.calls == 1
+    assert ctx.gated == 49
+
+    # Someone walks in: every changed frame is searched again
+    run_frames(engine, ctx, clock, 10, 10, changing_frame)
+    assert detector.calls == 11
+
+
+def test_search_continues_at_top_detect_every_and_low_fps(emoweb, clock, detector, monkeypatch):
+    monkeypatch.setattr(emoweb, 'AUTO_TUNE', True)
+    engine, ctx = make_camera(emoweb, fps=3)
+    ctx.tuner.verbose = False
+
+    # Far too slow for the target: the tuner walks to its cheapest level
+    while ctx.tuner.level < len(ctx.tuner.ladder) - 1:
+        ctx.tuner.record(1000.0)
+    ctx.detect_params = ctx.tuner.params
+    top = DEFAULT_BOUNDS['detect_every'][1]
+    assert ctx.detect_params.detect_every == top
+
+    # Searches are top / 3 s apart, more than timer_face, and must keep happening
+    run_frames(engine, ctx, clock, 60, 3, changing_frame)
+    assert ctx.detect_params.detect_every == top
+    assert detector.calls == 60 // top
+    assert ctx.detect_skipped == 60 - 60 // top
+
+
+def test_warm_idle_scan_keeps_searching(emoweb, clock, detector, monkeypatch, tmp_path):
+    temp = tmp_path / 'temp'
+    temp.write_text('70000')    # warm: thermal level 1
+    governor = emoweb.PowerGovernor(str(temp), None, idle_after=0.0, verbose=False,
+                                    max_search_gap=0.75 * emoweb.timer_face)
+    monkeypatch.setattr(emoweb, 'power_governor', governor)
+    engine, ctx = make_camera(emoweb, fps=15)
+
+    run_frames(engine, ctx, clock, 1, 15, changing_frame)
+    assert ctx.power['profile'] == 'idle-scan' and ctx.power['thermalLevel'] == 1
+    fps = ctx.power['fps']
+    assert ctx.power_detect_every / fps < emoweb.timer_face
+
+    # 10 s of the derated idle-scan rate: a search every power_detect_every frames throughout
+    calls = detector.calls
+    frames = int(10 * fps)
+    run_frames(engine, ctx, clock, frames, fps, changing_frame)
+    assert detector.calls - calls >= frames // ctx.power_detect_every
@@ -0,0 +1,36 @@
+"""Capture-to-emit latency tracking"""
+
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def tracker(emoweb):
+    return emoweb.LatencyTracker(window=100, stale_ms=50.0)
+
+
+def test_record_and_summary(tracker):
+    for ms in range(1, 101):
+        assert tracker.record(1000.0, frame_seq=ms, now=1000.0 + ms / 1000.0) == pytest.approx(ms)
+    assert tracker.record(None) is None
+    summary = tracker.summary()
+    assert (summary['count'], summary['total'], summary['stale']) == (100, 100, 50)
+    assert summary['p50Ms'] == pytest.approx(51.0) and summary['maxMs'] == pytest.approx(100.0)
+    assert summary['lastFrameSeq'] == 100
+
+
+def test_concurrent_records_are_all_counted(tracker):
+    def worker():
+        for i in range(5000):
+            tracker.record(1000.0, i, now=1000.01)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        tracker.summary()
+    for thread in threads:
+        thread.join()
+    summary = tracker.summary()
+    assert summary['total'] == 20000 and summary['count'] == 100
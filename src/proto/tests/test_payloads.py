@@ -0,0 +1,53 @@
+"""Payloads built and encoded once, the payload cache and the SocketIO json shim"""
+
+import json
+
+import numpy as np
+
+from payloads import CameraFrame, EmotionUpdate, Payload, PayloadCache, ServoPosition, SocketIOJSON, encode_json
+
+
+def test_emotion_update_dict_and_json_built_once():
+    payload = EmotionUpdate('front', 'happy', 87.456, servo_angle=120.7, pan=91.234, tilt=40.0,
+                            frame_seq=5, capture_ts=10.0, latency_ms=12.345, timestamp=11.0)
+    data = payload.to_dict()
+    assert data == {'cameraId': 'front', 'emotion': 'happy', 'confidence': 87.46, 'servoAngle': 120,
+                    'timestamp': 11.0, 'panAngle': 91.2, 'tiltAngle': 40.0, 'frameSeq': 5,
+                    'captureTs': 10.0, 'latencyMs': 12.35}
+    assert payload.to_dict() is data
+    assert payload.json() is payload.json()
+    assert json.loads(payload.json_text()) == data
+
+
+def test_emotion_update_without_servo_has_no_angles():
+    data = EmotionUpdate('door', 'sad', 50, pan=10, tilt=20).to_dict()
+    assert (data['servoAngle'], data['panAngle'], data['tiltAngle']) == (None, None, None)
+
+
+def test_encode_json_handles_numpy():
+    assert json.loads(encode_json({'a': np.float32(1.5), 'b': np.arange(3)})) == {'a': 1.5, 'b': [0, 1, 2]}
+
+
+def test_cache_rebuilds_on_new_version_or_age():
+    cache = PayloadCache(max_age=10.0)
+    builds = []
+    build = lambda: builds.append(1) or {'n': len(builds)}
+    first = cache.get('k', 1, build)
+    assert cache.get('k', 1, build) is first
+    assert cache.get('k', 2, build).get('n') == 2
+    cache.max_age = 0.0
+    assert cache.get('k', 2, build).get('n') == 3
+    assert cache.stats() == {'entries': 1, 'hits': 1, 'builds': 3}
+
+
+def test_socketio_json_splices_cached_text():
+    frame = CameraFrame('front', 'AAAA', frame_seq=1, timestamp=2.0)
+    servo = ServoPosition(90, 45, timestamp=3.0)
+    text = SocketIOJSON.dumps(['camera_frame', frame])
+    assert text == '["camera_frame",' + frame.json_text() + ']'
+    assert SocketIOJSON.loads(SocketIOJSON.dumps(['servo_position', servo])) == ['servo_position', servo.to_dict()]
+    assert json.loads(SocketIOJSON.dumps({'plain': (1, 2)})) == {'plain': [1, 2]}
+
+
+def test_plain_payload_wraps_a_dict():
+    assert Payload({'a': 1}).json() == b'{"a":1}'
@@ -0,0 +1,58 @@
+"""Power profiles, thermal derating and the search interval cap"""
+
+import pytest
+
+from power_governor import DEFAULT_PROFILES, THERMAL_DERATE, PowerGovernor, clamp_detect_every
+
+
+def make_governor(tmp_path, temp_c, **kwargs):
+    temp = tmp_path / 'temp'
+    temp.write_text(str(int(temp_c * 1000)))
+    return PowerGovernor(str(temp), None, verbose=False, **kwargs)
+
+
+@pytest.mark.parametrize('temp_c, level', [(50.0, 0), (70.0, 1), (80.0, 2)])
+def test_thermal_level_from_temperature(tmp_path, temp_c, level):
+    assert make_governor(tmp_path, temp_c).poll_thermal() == level
+
+
+def test_throttle_flags_force_hot(tmp_path):
+    governor = make_governor(tmp_path, 50.0)
+    flags = tmp_path / 'throttled'
+    flags.write_text('0x4')
+    governor.throttle_path = str(flags)
+    assert governor.poll_thermal() == 2
+
+
+def test_cools_down_only_past_hysteresis(tmp_path):
+    governor = make_governor(tmp_path, 70.0, poll_interval=0.0)
+    assert governor.poll_thermal() == 1
+    (tmp_path / 'temp').write_text('66000')
+    assert governor.poll_thermal() == 1
+    (tmp_path / 'temp').write_text('64000')
+    assert governor.poll_thermal() == 0
+
+
+def test_profile_switches_reported_once(tmp_path):
+    governor = make_governor(tmp_path, 50.0, idle_after=10.0)
+    assert governor.update('cam0', True, False, last_face_time=0.0, now=100.0)['profile'] == 'idle-scan'
+    assert governor.update('cam0', True, False, last_face_time=0.0, now=101.0) is None
+    assert governor.update('cam0', False, True, last_face_time=100.0, now=102.0)['profile'] == 'locked'
+    assert governor.switches == 2
+
+
+@pytest.mark.parametrize('level', range(len(THERMAL_DERATE)))
+def test_derated_idle_scan_searches_within_max_gap(tmp_path, level):
+    governor = make_governor(tmp_path, 50.0, max_search_gap=0.75)
+    settings = governor.settings('idle-scan', level)
+    assert settings['fps'] == DEFAULT_PROFILES['idle-scan']['fps'] * THERMAL_DERATE[level][0]
+    assert settings['detectEvery'] >= 1
+    assert settings['detectEvery'] / settings['fps'] <= 0.75
+
+
+def test_clamp_detect_every():
+    assert clamp_detect_every(6, 3.5, 0.75) == 2
+    assert clamp_detect_every(3, 5.0, 0.75) == 3
+    assert clamp_detect_every(9, 1.0, 0.75) == 1
+    assert clamp_detect_every(6, None, 0.75) == 6
+    assert clamp_detect_every(6, 3.5, None) == 6
@@ -0,0 +1,66 @@
+"""/debug endpoints: access control, POST-only tracemalloc actions, snapshot diffs"""
+
+import threading
+import tracemalloc
+
+import pytest
+from flask import Flask
+
+from profiling import MemoryTracker, SamplingProfiler, memory_tracker, register_debug_routes
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    register_debug_routes(app)
+    yield app.test_client()
+    if tracemalloc.is_tracing():
+        memory_tracker.stop()
+
+
+@pytest.mark.parametrize('action', ['start', 'snapshot', 'stop'])
+def test_tracemalloc_actions_refuse_get(client, action):
+    response = client.get(f'/debug/tracemalloc/{action}')
+    assert response.status_code == 405
+    assert not tracemalloc.is_tracing()
+
+
+def test_tracemalloc_start_snapshot_stop_over_post(client):
+    assert client.post('/debug/tracemalloc/start').get_json()['active']
+    assert client.get('/debug/tracemalloc/status').get_json()['active']
+    assert client.post('/debug/tracemalloc/snapshot?limit=5').get_json()['diffed']
+    assert not client.post('/debug/tracemalloc/stop').get_json()['active']
+
+
+def test_debug_routes_need_localhost(client):
+    response = client.post('/debug/tracemalloc/start', environ_base={'REMOTE_ADDR': '10.0.0.5'})
+    assert response.status_code == 403
+    assert not tracemalloc.is_tracing()
+
+
+def test_first_diff_has_no_negative_growth_from_filtered_sites():
+    tracker = MemoryTracker()
+    tracker.start()
+    try:
+        top = tracker.snapshot(limit=100)['top']
+    finally:
+        tracker.stop()
+    excluded = [t for t in top if t['location'].startswith((tracemalloc.__file__, '<frozen importlib._bootstrap>:'))]
+    assert excluded == []
+
+
+def test_sampling_profiler_sees_other_threads():
+    stop = threading.Event()
+
+    def busy_worker():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy_worker, name='busy')
+    worker.start()
+    try:
+        profiler = SamplingProfiler(0.002).run(0.1)
+    finally:
+        stop.set()
+        worker.join()
+    assert any(line.startswith('busy;') and 'busy_worker' in line for line in profiler.collapsed().splitlines())
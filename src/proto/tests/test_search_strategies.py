@@ -0,0 +1,107 @@
+"""Search strategies: the views they visit and the time-to-acquire they record"""
+
+import random
+
+import pytest
+
+from search_strategies import (STRATEGIES, GridSearch, LastSeenSearch, MotionSearch, RasterSearch,
+                               create_strategy, simulate)
+
+
+def test_create_strategy_by_name():
+    for name, cls in STRATEGIES.items():
+        assert isinstance(create_strategy(name), cls)
+    with pytest.raises(ValueError):
+        create_strategy('spiral')
+
+
+def test_raster_bounces_at_edges_and_bumps_tilt():
+    search = RasterSearch(pan_step=10.0, tilt_step=5.0, pan_range=(0, 30), tilt_range=(20, 30))
+    pan, tilt = 10.0, 20.0
+    path = []
+    for _ in range(8):
+        pan, tilt, hold = search.next(pan, tilt)
+        path.append((pan, tilt))
+        assert hold == 0.0
+    assert path[:4] == [(20.0, 20.0), (30.0, 25.0), (20.0, 25.0), (10.0, 25.0)]
+    assert path[4] == (0.0, 30.0)
+    assert path[5:7] == [(10.0, 30.0), (20.0, 30.0)]
+    assert path[7] == (30.0, 20.0)              # past the top tilt wraps to the bottom
+
+
+def test_grid_covers_range_and_starts_near_head():
+    search = GridSearch()
+    search.start(170.0, 85.0, now=0.0)
+    views = [search.next(170.0, 85.0, now=0.0)[:2] for _ in range(len(search.queue))]
+    pans, tilts = search.passes[0]
+    assert len(views) == len(pans) * len(tilts)
+    assert views[0] == (max(pans), max(tilts))
+    assert min(p for p, _ in views) == 0 and max(p for p, _ in views) == 180
+    # Neighbouring views overlap: no gap the camera cannot see
+    assert max(b - a for a, b in zip(pans, pans[1:])) <= search.fov_h
+
+
+def test_grid_hold_includes_servo_travel():
+    search = GridSearch(dwell=0.4, servo_speed=100.0)
+    search.start(0.0, 20.0, now=0.0)
+    pan, tilt, hold = search.next(90.0, 20.0, now=0.0)
+    assert hold == pytest.approx(0.4 + max(abs(pan - 90.0), abs(tilt - 20.0)) / 100.0)
+
+
+def test_last_seen_searches_where_the_face_went_first():
+    search = LastSeenSearch()
+    for i in range(4):
+        search.face_seen(100.0 + 3.0 * i, 50.0, now=0.1 * i)
+    search.start(110.0, 50.0, now=0.5)
+    first = search.next(110.0, 50.0, now=0.5)[:2]
+    second = search.next(*first, now=0.6)[:2]
+    assert first == (109.0, 50.0)
+    assert second[0] > first[0] and second[1] == 50.0     # moving right: look further right next
+
+
+def test_last_seen_forgets_stale_sightings():
+    search = LastSeenSearch(memory=5.0)
+    search.face_seen(100.0, 50.0, now=0.0)
+    search.start(100.0, 50.0, now=10.0)
+    grid = GridSearch()
+    grid.start(100.0, 50.0, now=10.0)
+    assert list(search.queue) == list(grid.queue)
+
+
+def test_motion_steers_to_change_and_wakes_scanner():
+    search = MotionSearch(settle=0.0)
+    search.start(90.0, 50.0, now=0.0)
+    view = search.next(90.0, 50.0, now=0.0)[:2]
+    search.observe_motion(0.0, 0.5)             # change at the left edge of the view
+    assert search._wake.is_set()
+    pan, tilt, _ = search.next(*view, now=0.5)
+    assert pan == pytest.approx(min(180.0, view[0] + search.fov_h / 2)) and tilt == view[1]
+
+
+def test_acquire_times_recorded_per_reason():
+    search = GridSearch()
+    search.start(0, 20, 'startup', now=0.0)
+    assert search.acquired(now=2.5) == 2.5
+    assert search.acquired(now=3.0) is None     # no search running
+    search.start(0, 20, 'lost', now=10.0)
+    search.acquired(now=11.0)
+    stats = search.stats()
+    assert stats['searches'] == 2 and stats['acquired'] == 2
+    assert stats['byReason'] == {'startup': {'count': 1, 'meanS': 2.5}, 'lost': {'count': 1, 'meanS': 1.0}}
+
+
+def simulated_times(name, trials=30, seed=0):
+    """Time-to-acquire per trial, inf for a timeout (a walker can end up beyond the head's reach)"""
+    rng = random.Random(seed)
+    times = (simulate(create_strategy(name), 'lost', rng) for _ in range(trials))
+    return sorted(float('inf') if t is None else t for t in times)
+
+
+@pytest.mark.parametrize('name', list(STRATEGIES))
+def test_simulated_lost_face_is_mostly_reacquired(name):
+    times = simulated_times(name)
+    assert sum(t != float('inf') for t in times) >= 0.7 * len(times)
+
+
+def test_last_seen_beats_raster_on_lost_face():
+    assert simulated_times('last-seen')[15] < simulated_times('raster')[15]
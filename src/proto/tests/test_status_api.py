@@ -0,0 +1,29 @@
+"""emoweb /api/status: per-camera status and the status payload cache"""
+
+import pytest
+
+from frame_sources import SyntheticStream
+
+
+@pytest.fixture
+def client(emoweb, monkeypatch):
+    engine = emoweb.EmotionEngine(show_window=False, actuators=False, cameras=[])
+    ctx = emoweb.CameraContext('front', SyntheticStream(), servo=False)
+    engine.cameras.append(ctx)
+    engine.primary = ctx
+    monkeypatch.setattr(emoweb, 'engine', engine)
+    monkeypatch.setattr(emoweb, 'status_payloads', emoweb.PayloadCache(max_age=emoweb.status_max_age))
+    return emoweb.app.test_client()
+
+
+def test_status_for_known_camera(client):
+    response = client.get('/api/status?camera=front')
+    assert response.status_code == 200
+    assert response.get_json()['cameraId'] == 'front'
+
+
+def test_unknown_camera_is_404_and_not_cached(emoweb, client):
+    response = client.get('/api/status?camera=nope')
+    assert response.status_code == 404
+    assert response.get_json() == {'error': 'Unknown camera nope'}
+    assert emoweb.status_payloads.stats()['entries'] == 0